@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for ``good-bot-runner``.
+
+These are not tests: they measure how fast keystrokes are planned and
+sent, how precisely they are scheduled, how long prompts take to be
+detected and how much memory a run uses. Run them from the root of
+the repository::
+
+    $ python -m benchmarks.run --mode patched
+
+See ``benchmarks/README.md``.
+"""
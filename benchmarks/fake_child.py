@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""An in-memory stand-in for `pexpect.spawn`.
+
+`FakeChild` behaves like a shell that answers every line with a new
+prompt, instantly. Nothing is spawned and nothing is read from a
+terminal, so benchmarks using it only measure `runner` itself. Every
+send is recorded with the time at which it happened.
+"""
+import re
+import time
+from typing import Any, List, Tuple, Union
+
+import pexpect
+
+from runner import classmodule
+
+
+class FakeChild:
+    """A fake shell, with the subset of `pexpect.spawn` used by `runner`.
+
+    Args:
+        prompt (str): What is printed when the shell is ready for the
+            next command.
+    """
+
+    encoding: str = "utf-8"
+
+    def __init__(self, prompt: str = "$ "):
+        self.prompt = prompt
+        # Every send, with `time.perf_counter()` when it happened.
+        self.sends: List[Tuple[float, str]] = []
+        self.buffer = ""
+        self.before = ""
+        self.after: Any = ""
+        self.match: Any = None
+        self.logfile: Any = None
+        self.logfile_read: Any = None
+        self.delaybeforesend: Union[float, None] = None
+        self.maxread = 2000
+        self.timeout = 30
+        self.closed = False
+        self.output(prompt)
+
+    def output(self, data: str) -> None:
+        """Makes the shell print something."""
+        self.buffer += data
+        if self.logfile is not None:
+            self.logfile.write(data)
+            self.logfile.flush()
+
+    def send(self, data: str) -> int:
+        self.sends.append((time.perf_counter(), data))
+        if self.logfile is not None:
+            self.logfile.write(data)
+            self.logfile.flush()
+        for _ in range(data.count("\n")):
+            self.output(self.prompt)
+        return len(data)
+
+    def sendline(self, data: str = "") -> int:
+        return self.send(data + "\n")
+
+    def expect(
+        self, pattern: Any, timeout: Any = -1, async_: bool = False, **kw: Any
+    ) -> Any:
+        return self.matched(re.search(pattern, self.buffer), async_)
+
+    def expect_exact(
+        self, pattern: Any, timeout: Any = -1, async_: bool = False, **kw: Any
+    ) -> Any:
+        return self.matched(re.search(re.escape(pattern), self.buffer), async_)
+
+    def matched(self, found: Any, async_: bool) -> Any:
+        if found is None:
+            # Nothing more will ever be printed.
+            raise pexpect.TIMEOUT(f"Nothing matched in {self.buffer!r}.")
+        self.before = self.buffer[: found.start()]
+        self.after = found.group()
+        self.match = found
+        self.buffer = self.buffer[found.end() :]
+        if async_:
+            return self.done()
+        return 0
+
+    async def done(self) -> int:
+        return 0
+
+    def read_nonblocking(self, size: int = 1, timeout: Any = -1) -> str:
+        raise pexpect.TIMEOUT("Nothing to read.")
+
+    def isalive(self) -> bool:
+        return not self.closed
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeCommands(classmodule.Commands):
+    """`Commands` typing to a `FakeChild` instead of `bash`.
+
+    The last child is kept in `child`, to look at what was sent.
+    """
+
+    child: FakeChild
+
+    def spawn(self) -> Any:
+        self.child = FakeChild()
+        self.child.logfile = self.sink
+        return self.child
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""A scripted interactive program, standing in for `ssh` and the like.
+
+It asks for a password without echoing it, greets the user and then
+reads commands at its own prompt until ``exit``. Nothing is checked
+or run: it only has to behave like a remote login for `runner`.
+
+    $ python -m benchmarks.password_prompt
+"""
+import getpass
+import sys
+
+PASSWORD_PROMPT = "Password: "
+PROMPT = "remote$ "
+
+
+def main() -> None:
+    getpass.getpass(PASSWORD_PROMPT)
+    print("Welcome to the benchmark host.")
+    while True:
+        try:
+            line = input(PROMPT)
+        except EOFError:
+            break
+        if line.strip() == "exit":
+            break
+        print(line)
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
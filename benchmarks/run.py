@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""Runs the benchmarks and keeps their results over time.
+
+Four modes are available:
+
+* ``patched``: sleeps are skipped and keystrokes go to a `FakeChild`.
+  Only `runner`'s own cost is measured: keystroke throughput of
+  `type_sentence()`, `type_letters()` and `Commands.run()`, how long
+  expecting a prompt takes and how much memory a run allocates.
+* ``real``: sleeps are real, keystrokes still go to a `FakeChild`.
+  Measures scheduling jitter, how late keystrokes are sent compared to
+  their plan.
+* ``pty``: a real `bash` is spawned in a pseudo-terminal, and logs in
+  to `password_prompt.py`. Sleeps are skipped with a `VirtualClock`, so
+  the time is spent waiting on the terminal. Every session backend is
+  measured, side by side, along with how fast each sends keystrokes.
+* ``startup``: new Python processes import the CLI, or print its help.
+  Catches imports that make every invocation slower.
+
+Every run is appended as a JSON line to the output file, and compared
+to the previous run of the same mode.
+
+    $ python -m benchmarks.run --mode patched --mode real
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+from unittest import mock
+
+from benchmarks.fake_child import FakeChild, FakeCommands
+from runner import classmodule, human_typing
+from runner.clock import Clock, VirtualClock
+from runner.metrics import Metrics
+
+MODES = ("patched", "real", "pty", "startup")
+DEFAULT_OUTPUT = pathlib.Path(__file__).with_name("results.jsonl")
+SENTENCE = "git commit -am 'Fix the typing benchmarks'"
+PASSWORD_PROMPT = pathlib.Path(__file__).with_name("password_prompt.py")
+# The environment variable holding the password typed in ``pty`` mode.
+PASSWORD_VARIABLE = "GOOD_BOT_BENCH_PASSWORD"
+# What is run in new processes in ``startup`` mode, by name.
+STARTUP_PROGRAMS = {
+    "import": "import runner.cli",
+    "run_help": (
+        "import sys; from runner.cli import main; sys.argv[1:] = ['--help']; "
+        "main()"
+    ),
+    "check_help": (
+        "import sys; from runner.cli import check_main; sys.argv[1:] = ['--help']; "
+        "check_main()"
+    ),
+}
+
+Results = Dict[str, float]
+
+
+def keystrokes(child: FakeChild) -> int:
+    """Counts the keystrokes a `FakeChild` received."""
+    return sum(len(data) for _, data in child.sends)
+
+
+def throughput(run: Callable[[], FakeChild], repeat: int) -> float:
+    """Measures keystrokes per second, **in real time**.
+
+    Args:
+        run (Callable): Types something and returns the child it typed to.
+        repeat (int): How many times `run` is called.
+
+    Returns:
+        float: Keystrokes sent per second.
+    """
+    sent = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sent += keystrokes(run())
+    return sent / (time.perf_counter() - start)
+
+
+def bench_patched(size: int) -> Results:
+    """Measures `runner`'s own cost, without any sleep or terminal.
+
+    Args:
+        size (int): How many sentences are typed by each benchmark.
+
+    Returns:
+        Results: The measurements, by name.
+    """
+
+    def sentence() -> FakeChild:
+        child = FakeChild()
+        human_typing.type_sentence(child, SENTENCE)
+        return child
+
+    def letters() -> FakeChild:
+        child = FakeChild()
+        previous = SENTENCE[0]
+        for letter in SENTENCE:
+            human_typing.type_letters(child, previous, letter)
+            previous = letter
+        return child
+
+    metrics = Metrics()
+    commands = FakeCommands(
+        [SENTENCE] * size,
+        ["prompt"] * size,
+        sink=classmodule.NullSink(),
+        metrics=metrics,
+    )
+
+    def run() -> FakeChild:
+        commands.run()
+        return commands.child
+
+    skip = mock.patch.multiple(
+        Clock, sleep=lambda self, seconds: None, sleep_until=lambda self, deadline: None
+    )
+    with skip:
+        results = {
+            "type_sentence_keystrokes_per_second": throughput(sentence, size),
+            "type_letters_keystrokes_per_second": throughput(letters, size),
+            "commands_run_keystrokes_per_second": throughput(run, 1),
+        }
+        expect = metrics.histograms["expect"]
+        results["expect_latency_mean_seconds"] = expect.sum / expect.count
+
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    results["commands_run_peak_memory_bytes"] = float(peak)
+    return results
+
+
+def bench_real(size: int) -> Results:
+    """Measures scheduling jitter, with real sleeps.
+
+    Args:
+        size (int): How many sentences are typed.
+
+    Returns:
+        Results: Statistics on how late bursts of keystrokes were sent
+            compared to their planned offset, **in seconds**.
+    """
+    late: List[float] = []
+    drift: List[float] = []
+    for _ in range(size):
+        child = FakeChild()
+        timeline = human_typing.plan_sentence(SENTENCE)
+        start = time.perf_counter()
+        human_typing.play_timeline(child, timeline)
+        for (sent, _), (offset, _) in zip(child.sends, timeline.bursts()):
+            late.append(sent - start - offset)
+        drift.append(time.perf_counter() - start - timeline.offsets[-1])
+
+    late.sort()
+    return {
+        "jitter_mean_seconds": statistics.mean(late),
+        "jitter_p50_seconds": late[len(late) // 2],
+        "jitter_p95_seconds": late[int(len(late) * 0.95)],
+        "jitter_p99_seconds": late[int(len(late) * 0.99)],
+        "jitter_max_seconds": late[-1],
+        # How much longer than planned typing took, per sentence.
+        "drift_mean_seconds": statistics.mean(drift),
+    }
+
+
+def bench_pty(size: int) -> Results:
+    """Measures expect latency against real pseudo-terminals.
+
+    Every session backend is measured, side by side. With each, a `bash`
+    shell types `size` commands, then logs in to `password_prompt.py`
+    and types one more command there. Then `size` sentences are sent to
+    a program that reads and discards them.
+
+    Args:
+        size (int): How many commands are typed in `bash`.
+
+    Returns:
+        Results: Timings **in seconds**, the peak memory and the send
+            throughput, prefixed by the name of the backend.
+    """
+    results: Results = {}
+    environment = {PASSWORD_VARIABLE: "hunter2"}
+    with tempfile.TemporaryDirectory() as home:
+        # An empty home directory keeps the user's rc files from
+        # slowing down, or changing, the shell.
+        environment["HOME"] = home
+        with mock.patch.dict(os.environ, environment):
+            for backend in classmodule.BACKENDS:
+                # The first run imports the backend and fills its caches.
+                bench_backend(backend, 1)
+                for name, value in bench_backend(backend, size).items():
+                    results[f"{backend}_{name}"] = value
+    return results
+
+
+def bench_backend(backend: str, size: int) -> Results:
+    """Runs the ``pty`` mode with one session backend."""
+    commands: list = ["echo benchmark"] * size
+    expect = ["prompt"] * size
+    commands += [
+        f"{sys.executable} {PASSWORD_PROMPT}",
+        {"password": PASSWORD_VARIABLE},
+        "echo logged in",
+        "exit",
+    ]
+    expect += ["Password: ", r"remote\$ ", r"remote\$ ", "prompt"]
+
+    metrics = Metrics()
+    runner = classmodule.Commands(
+        commands,
+        expect,
+        sink=classmodule.NullSink(),
+        clock=VirtualClock(),
+        metrics=metrics,
+        backend=backend,
+    )
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        runner.run()
+        total = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # The terminal's echo is off, so that only sending is measured.
+    child = classmodule.BACKENDS[backend](
+        "sh", ["-c", "stty -echo; cat > /dev/null"], dict(os.environ)
+    )
+    child.delaybeforesend = None
+    timelines = [human_typing.plan_sentence(SENTENCE + "\n") for _ in range(size)]
+    clock = VirtualClock()
+    start = time.perf_counter()
+    for timeline in timelines:
+        human_typing.play_timeline(child, timeline, clock)
+    sending = time.perf_counter() - start
+    child.close()
+    sent = sum(len(data) for timeline in timelines for _, data in timeline.bursts())
+
+    expect_histogram = metrics.histograms["expect"]
+    return {
+        "spawn_seconds": metrics.histograms["spawn"].sum,
+        "expect_latency_mean_seconds": expect_histogram.sum / expect_histogram.count,
+        "run_seconds": total,
+        "peak_memory_bytes": float(peak),
+        "send_bytes_per_second": sent / sending,
+    }
+
+
+def bench_startup(size: int) -> Results:
+    """Measures how long new processes take to start the CLI.
+
+    Args:
+        size (int): How many times each program is started. The fastest
+            start is kept, as the others were slowed down by something
+            else.
+
+    Returns:
+        Results: The fastest start of each program, **in seconds**.
+    """
+    results = {}
+    for name, program in STARTUP_PROGRAMS.items():
+        fastest = float("inf")
+        for _ in range(size):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-c", program],
+                cwd=pathlib.Path(__file__).parent.parent,
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+            fastest = min(fastest, time.perf_counter() - start)
+        results[f"startup_{name}_seconds"] = fastest
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[int], Results]] = {
+    "patched": bench_patched,
+    "real": bench_real,
+    "pty": bench_pty,
+    "startup": bench_startup,
+}
+
+
+def revision() -> str:
+    """Returns the current git commit, or an empty string outside of git."""
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=pathlib.Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return output.stdout.strip()
+
+
+def previous_run(output: pathlib.Path, mode: str) -> Optional[dict]:
+    """Finds the last run of a mode in the output file, if any."""
+    if not output.exists():
+        return None
+    last = None
+    with open(output) as stream:
+        for line in stream:
+            run = json.loads(line)
+            if run.get("mode") == mode:
+                last = run
+    return last
+
+
+def report(results: Results, previous: Optional[dict]) -> str:
+    """Formats results, with their change since the previous run."""
+    before: Results = previous["results"] if previous else {}
+    lines = []
+    for name, value in results.items():
+        line = f"  {name:<40} {value:>14.6g}"
+        if before.get(name):
+            line += f"  ({(value - before[name]) / before[name]:+.1%})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--mode",
+        action="append",
+        choices=MODES,
+        help="Which benchmarks to run. Can be repeated. Defaults to `patched`.",
+    )
+    parser.add_argument(
+        "--size", type=int, default=20, help="How much work each benchmark does."
+    )
+    parser.add_argument(
+        "--output",
+        type=pathlib.Path,
+        default=DEFAULT_OUTPUT,
+        help="JSON lines file where results are kept.",
+    )
+    options = parser.parse_args(arguments)
+
+    for mode in options.mode or ["patched"]:
+        results = BENCHMARKS[mode](options.size)
+        previous = previous_run(options.output, mode)
+        print(f"{mode}:")
+        print(report(results, previous))
+
+        run = {
+            "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "revision": revision(),
+            "python": platform.python_version(),
+            "mode": mode,
+            "size": options.size,
+            "results": results,
+        }
+        with open(options.output, "a") as stream:
+            stream.write(json.dumps(run) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""Running many scripts at once.
+
+This module is used by the ``runner-batch`` command. It finds every
+script matching a list of paths, directories or globs, and runs them
+in parallel using a pool of worker processes. Each script logs its
+output to its own file.
+
+## Example
+
+```python
+from runner import batch
+results = batch.run_batch(batch.expand_paths(["scripts/"]), jobs=4)
+print(batch.format_summary(results))
+```
+"""
+import functools
+import glob
+import os
+import pathlib
+import time
+import traceback
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Union
+
+if TYPE_CHECKING:
+    from runner.shell_pool import ShellPool
+    from runner.typing_profile import TypingProfile
+
+# Modules needed to run scripts are imported by the functions running
+# them. `runner-check` uses this module to find scripts, and does not
+# have to import `pexpect` for that.
+
+# The shells of the current worker process, if `warm_shells` was given.
+_POOL: Union["ShellPool", None] = None
+
+# Extensions of the files picked up when a directory is given.
+SCRIPT_EXTENSIONS = (".yaml", ".yml")
+
+
+class BatchResult(NamedTuple):
+    """The outcome of running one script."""
+
+    path: pathlib.Path
+    log_path: pathlib.Path
+    duration: float
+    error: Union[str, None] = None
+
+    @property
+    def ok(self) -> bool:
+        """bool: Whether or not the script ran without errors."""
+        return self.error is None
+
+
+def expand_paths(patterns: Iterable[str]) -> List[pathlib.Path]:
+    """Finds every script matching a list of paths, directories or globs.
+
+    Directories are searched recursively for files ending with one of
+    `SCRIPT_EXTENSIONS`. Every script is only returned once, in the
+    order in which it was first found.
+
+    Args:
+        patterns (Iterable[str]): Paths, directories or glob patterns.
+
+    Raises:
+        FileNotFoundError: If a pattern does not match anything.
+
+    Returns:
+        List[pathlib.Path]: The scripts.
+    """
+    found: Dict[pathlib.Path, None] = {}
+
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            raise FileNotFoundError(pattern)
+        for match in map(pathlib.Path, matches):
+            if match.is_dir():
+                for extension in SCRIPT_EXTENSIONS:
+                    for script in sorted(match.rglob(f"*{extension}")):
+                        found.setdefault(script, None)
+            else:
+                found.setdefault(match, None)
+
+    return list(found)
+
+
+def log_paths(
+    scripts: List[pathlib.Path], log_dir: pathlib.Path
+) -> List[pathlib.Path]:
+    """Chooses a log file for every script.
+
+    Log files are named after the scripts. A number is added when two
+    scripts have the same name.
+
+    Args:
+        scripts (List[pathlib.Path]): The scripts.
+        log_dir (pathlib.Path): Where the logs will be written.
+
+    Returns:
+        List[pathlib.Path]: One log file per script, in the same order.
+    """
+    used: Dict[str, int] = {}
+    paths = []
+    for script in scripts:
+        count = used.get(script.stem, 0)
+        used[script.stem] = count + 1
+        name = script.stem if not count else f"{script.stem}-{count}"
+        paths.append(log_dir / f"{name}.log")
+    return paths
+
+
+def run_script(
+    path: pathlib.Path,
+    log_path: pathlib.Path,
+    seed: Union[int, None] = None,
+    cache_dir: Union[pathlib.Path, None] = None,
+    use_cache: bool = True,
+    virtual_time: bool = False,
+    pool: Union["ShellPool", None] = None,
+    profile: bool = False,
+    profile_memory: bool = False,
+    typing_profile: Union["TypingProfile", None] = None,
+    background_reader: bool = False,
+    backend: str = "pexpect",
+    vectorized: bool = False,
+) -> BatchResult:
+    """Runs one script and logs its output to a file.
+
+    This is what every worker process runs. The script is checked
+    without any interaction, since nobody could answer a prompt.
+    Errors are reported in the result instead of being raised.
+
+    Args:
+        path (pathlib.Path): The script.
+        log_path (pathlib.Path): Where the output is logged.
+        seed (int, optional): Overrides the script's `seed`.
+        cache_dir (pathlib.Path, optional): Where typing plans and
+            checked scripts are cached.
+        use_cache (bool): Whether or not typing plans and checked
+            scripts are cached.
+        virtual_time (bool): Whether or not to skip waits between
+            keystrokes.
+        pool (ShellPool, optional): Where the shell comes from. Defaults
+            to the worker's pool, if it has one.
+        profile (bool): Whether or not the script is profiled. Reports
+            are written next to the log file.
+        profile_memory (bool): Whether or not allocations are profiled
+            too.
+        typing_profile (TypingProfile, optional): How commands are
+            typed, unless the script or its commands say otherwise.
+        background_reader (bool): Whether or not the shell's output is
+            read in a background thread while commands are typed.
+        backend (str): Which of `classmodule.BACKENDS` runs the shell,
+            unless it comes from a pool.
+        vectorized (bool): Whether or not typing is planned with
+            ``numpy``, when it is available.
+
+    Returns:
+        BatchResult: How it went.
+    """
+    from runner import classmodule
+    from runner import funcmodule
+    from runner.clock import REAL_CLOCK, VirtualClock
+    from runner.config_cache import ConfigCache
+    from runner.profiling import Profiler
+    from runner.schedule_cache import ScheduleCache
+    from runner.typing_profile import DEFAULT_PROFILE
+
+    start = time.monotonic()
+    error: Union[str, None] = None
+
+    try:
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        sink = classmodule.BatchingSink(classmodule.FileSink(log_path))
+    except OSError as exception:
+        error = f"{type(exception).__name__}: {exception}"
+        return BatchResult(path, log_path, time.monotonic() - start, error)
+
+    profiler = None
+    if profile:
+        profiler = Profiler(log_path, memory=profile_memory)
+        profiler.start()
+
+    try:
+        parsed = funcmodule.load_config(
+            path, ConfigCache(cache_dir) if use_cache else None
+        )
+        command = classmodule.Commands(
+            parsed["commands"],
+            parsed["expect"],
+            seed=seed if seed is not None else parsed.get("seed"),
+            cache=ScheduleCache(cache_dir) if use_cache else None,
+            sink=sink,
+            clock=VirtualClock() if virtual_time else REAL_CLOCK,
+            pool=pool if pool is not None else _POOL,
+            typing_profile=(typing_profile or DEFAULT_PROFILE).updated(
+                parsed.get("typing") or {}
+            ),
+            background_reader=background_reader,
+            backend=backend,
+            vectorized=vectorized,
+        )
+        command.run()
+    except Exception as exception:
+        sink.write(traceback.format_exc())
+        error = f"{type(exception).__name__}: {exception}"
+    finally:
+        sink.close()
+        if profiler is not None:
+            profiler.stop()
+
+    return BatchResult(path, log_path, time.monotonic() - start, error)
+
+
+def start_worker(warm_shells: int, backend: str = "pexpect") -> None:
+    """Gives the current worker process its own pool of shells.
+
+    Args:
+        warm_shells (int): How many shells the worker keeps ready. With
+            0, shells are spawned by each script instead.
+        backend (str): Which of `classmodule.BACKENDS` runs the shells.
+    """
+    from runner import classmodule
+    from runner.shell_pool import ShellPool
+
+    global _POOL
+    _POOL = None
+    if warm_shells:
+        spawn = functools.partial(classmodule.spawn_shell, backend=backend)
+        _POOL = ShellPool(warm_shells, spawn=spawn)
+
+
+def default_jobs() -> int:
+    """Returns how many scripts are run at the same time by default.
+
+    Returns:
+        int: The number of CPU cores available to this process.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on every platform.
+        return os.cpu_count() or 1
+
+
+def run_batch(
+    scripts: List[pathlib.Path],
+    jobs: Union[int, None] = None,
+    log_dir: pathlib.Path = pathlib.Path("runner-logs"),
+    seed: Union[int, None] = None,
+    cache_dir: Union[pathlib.Path, None] = None,
+    use_cache: bool = True,
+    virtual_time: bool = False,
+    warm_shells: int = 0,
+    profile: bool = False,
+    profile_memory: bool = False,
+    typing_profile: Union["TypingProfile", None] = None,
+    background_reader: bool = False,
+    backend: str = "pexpect",
+    vectorized: bool = False,
+) -> List[BatchResult]:
+    """Runs many scripts in parallel.
+
+    Larger scripts usually take longer to run, so they are started
+    first. This keeps a long script from being the last one to start
+    while every other worker is idle.
+
+    Args:
+        scripts (List[pathlib.Path]): The scripts to run.
+        jobs (int, optional): How many scripts are run at the same
+            time. Defaults to `default_jobs()`.
+        log_dir (pathlib.Path): Where the logs are written.
+        seed (int, optional): Overrides the scripts' `seed`.
+        cache_dir (pathlib.Path, optional): Where typing plans and
+            checked scripts are cached.
+        use_cache (bool): Whether or not typing plans and checked
+            scripts are cached.
+        virtual_time (bool): Whether or not to skip waits between
+            keystrokes.
+        warm_shells (int): How many shells each worker keeps ready, so
+            that scripts do not wait for `bash` to start. Shells are
+            never shared between scripts.
+        profile (bool): Whether or not every script is profiled, in
+            its worker. Reports are written next to the log files.
+        profile_memory (bool): Whether or not allocations are profiled
+            too.
+        typing_profile (TypingProfile, optional): How commands are
+            typed, unless the scripts or their commands say otherwise.
+        background_reader (bool): Whether or not the shells' output is
+            read in a background thread while commands are typed.
+        backend (str): Which of `classmodule.BACKENDS` runs the shells.
+        vectorized (bool): Whether or not typing is planned with
+            ``numpy``, when it is available.
+
+    Returns:
+        List[BatchResult]: One result per script, in the same order as
+            `scripts`.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if not scripts:
+        return []
+    jobs = min(jobs or default_jobs(), len(scripts))
+    logs = log_paths(scripts, log_dir)
+
+    def size(index: int) -> int:
+        try:
+            return scripts[index].stat().st_size
+        except OSError:
+            return 0
+
+    order = sorted(range(len(scripts)), key=size, reverse=True)
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=start_worker,
+        initargs=(warm_shells, backend),
+    ) as executor:
+        futures = {
+            index: executor.submit(
+                run_script,
+                scripts[index],
+                logs[index],
+                seed,
+                cache_dir,
+                use_cache,
+                virtual_time,
+                None,
+                profile,
+                profile_memory,
+                typing_profile,
+                background_reader,
+                backend,
+                vectorized,
+            )
+            for index in order
+        }
+        return [futures[index].result() for index in range(len(scripts))]
+
+
+def format_summary(results: List[BatchResult]) -> str:
+    """Summarizes the outcome of a batch.
+
+    Args:
+        results (List[BatchResult]): What `run_batch()` returned.
+
+    Returns:
+        str: One line per script with its duration, followed by the
+            total number of failures.
+    """
+    lines = []
+    for result in results:
+        status = "ok" if result.ok else f"FAILED ({result.error})"
+        lines.append(f"{result.duration:8.2f}s  {result.path}  {status}")
+
+    failures = sum(not result.ok for result in results)
+    total = sum(result.duration for result in results)
+    lines.append(
+        f"{len(results)} scripts, {failures} failed, {total:.2f}s of work."
+    )
+    return "\n".join(lines)
@@ -20,30 +20,433 @@ method should be used to spawn a new shell process and start
 ```python
 todo.run()
 ```
+
+Many `Commands` objects can also be run concurrently, from a single
+event loop, with `run_concurrently()`:
+
+```python
+asyncio.run(run_concurrently([todo, other_todo]))
+```
+
+The output of the child process goes to an `OutputSink`. By default,
+it is written to `stdout`. Other sinks can be used to discard it, to
+write it to a file, or to write it in batches:
+
+```python
+todo = Commands(commands, expect, sink=BatchingSink(FileSink("out.log")))
+```
+
+With `background_reader=True`, the output is read in a thread while
+commands are typed, instead of only while waiting for them. See the
+`reader` module.
+
+Shells are run by a session backend, `pexpect` by default. Backends are
+listed in `BACKENDS`, and their sessions have the methods of `Session`:
+
+```python
+todo = Commands(commands, expect, backend="pty")
+```
+
+A run can also be recorded to a transcript, and replayed later without
+any shell. See the `replay` module.
 """
+import abc
+import asyncio
 import pexpect
+import random
+import secrets
 import sys
+import threading
 import os
+import pathlib
 import time
-from typing import Union, List, Dict
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from runner import human_typing
+from runner.clock import Clock, REAL_CLOCK, VirtualClock
+from runner.metrics import Metrics, NULL_METRICS
+from runner.reader import ChildReader
+from runner.schedule_cache import ScheduleCache
+from runner.streaming import expect_bounded
+from runner.timeline import Timeline
+from runner.typing_profile import DEFAULT_PROFILE, TypingProfile
+
+if TYPE_CHECKING:
+    from runner.replay import Transcript, TranscriptRecorder
+    from runner.shell_pool import ShellPool
+
+# What is expected when the `prompt` keyword is used, for shells that
+# were not started with `spawn_shell()`.
+PROMPT_PATTERN: str = r"[#\$%]"
+
+# The rc file of the shells started with `spawn_shell()`. It prints a
+# sentinel at the end of every prompt: `SENTINEL_START`, the shell's
+# token, the exit status of the last command and `SENTINEL_END`. Once it
+# is read, the whole prompt was.
+SHELL_INTEGRATION: pathlib.Path = pathlib.Path(__file__).with_name(
+    "shell_integration.bash"
+)
+SENTINEL_START: str = "\x1b]697;good-bot;"
+SENTINEL_END: str = "\x07"
+
+# Largest chunk, in bytes, written at once when pasting. A terminal's
+# input queue only holds about 4 KiB on Linux, less on other systems, so
+# the child's output is read between chunks for neither side to block.
+# Chunks do not lift the limit on the length of a line: in canonical
+# mode, Linux drops whatever goes over 4095 bytes of a single line.
+PASTE_CHUNK_SIZE: int = 1024
+
+# How long to wait, in seconds, for the child process to stop printing
+# between two pasted chunks.
+PASTE_SETTLE_TIME: float = 0.01
+
+# How long to wait before sending a secret, **in seconds**. Programs
+# asking for a password may only turn echo off after their prompt, so
+# this wait is always in real time, even with a `VirtualClock`.
+# `pexpect`'s own wait before every send is turned off: keystrokes are
+# sent on their planned deadlines instead.
+DELAY_BEFORE_SEND: float = 0.05
+
+
+class OutputSink:
+    """Where the output of a child process goes.
+
+    `pexpect` writes to its logfile every chunk it reads and every
+    string it sends, and flushes it after each write. Sinks are used
+    as that logfile. Recorders from the `recording` module can also be
+    used as sinks, since they have the same methods.
+
+    This base class discards everything.
+    """
+
+    def write(self, data: str) -> None:
+        """Receives some output.
+
+        Args:
+            data (str): The output.
+        """
+
+    def flush(self) -> None:
+        """Called by `pexpect` after every write."""
+
+    def close(self) -> None:
+        """Releases the sink's resources. Nothing is written afterwards."""
+
+
+class Session(abc.ABC):
+    """A program running in a terminal, to which commands are typed.
+
+    This is the part of `pexpect.spawn` that `runner` uses. Backends
+    return either a `pexpect.spawn`, or a subclass of `Session` that
+    implements the same methods. Both raise `pexpect.TIMEOUT` and
+    `pexpect.EOF`.
+
+    Besides these methods, sessions have the following attributes:
+
+    - `logfile`, `logfile_read` and `logfile_send`: where the output and
+      what is sent are written, or `None`.
+    - `timeout`: the default timeout of `expect()`, **in seconds**.
+    - `maxread`: the most characters read at once.
+    - `delaybeforesend`: `None`, since keystrokes have their own delays.
+    - `before`, `after` and `match`: what the last `expect()` found.
+    - `buffer`: output that was read, but not searched yet.
+
+    Sessions may also have an `expect_bounded()` method, used by
+    `streaming.expect_bounded()` instead of its own.
+
+    Subclasses must implement every method, and cannot be created until
+    they do.
+    """
+
+    # Whether `send()` takes bytes as well as strings. Keystrokes are
+    # planned as bytes, and are decoded for sessions that do not.
+    accepts_bytes: bool = False
+
+    @abc.abstractmethod
+    def send(self, data: Union[str, bytes]) -> int:
+        """Sends data to the program, as is.
+
+        Returns:
+            int: How many bytes were written.
+        """
+
+    @abc.abstractmethod
+    def sendline(self, data: Union[str, bytes] = "") -> int:
+        """Sends data to the program, followed by a newline."""
+
+    @abc.abstractmethod
+    def read_nonblocking(self, size: int = 1, timeout: Any = -1) -> str:
+        """Reads up to `size` characters of output, waiting up to
+        `timeout` seconds for some."""
+
+    @abc.abstractmethod
+    def expect(
+        self,
+        pattern: Any,
+        timeout: Any = -1,
+        searchwindowsize: Optional[int] = None,
+        async_: bool = False,
+    ) -> Any:
+        """Waits until a regular expression matches the output."""
+
+    @abc.abstractmethod
+    def expect_exact(
+        self,
+        pattern: Any,
+        timeout: Any = -1,
+        searchwindowsize: Optional[int] = None,
+        async_: bool = False,
+    ) -> Any:
+        """Waits until a plain string is in the output."""
+
+    @abc.abstractmethod
+    def isalive(self) -> bool:
+        """Checks if the program is still running."""
+
+    @abc.abstractmethod
+    def close(self, force: bool = True) -> None:
+        """Stops the program and releases its terminal."""
+
+
+class NullSink(OutputSink):
+    """Discards the output. Useful for headless runs."""
+
+
+class StreamSink(OutputSink):
+    """Writes the output to an already opened stream, like `stdout`.
+
+    Closing the sink flushes the stream, but does not close it.
+
+    Args:
+        stream (IO[str]): Where to write.
+    """
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+
+    def write(self, data: str) -> None:
+        self.stream.write(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class FileSink(StreamSink):
+    """Writes the output to a file.
+
+    Args:
+        path (Union[str, os.PathLike]): The file. It is overwritten.
+    """
+
+    def __init__(self, path: Union[str, "os.PathLike[str]"]):
+        super().__init__(open(path, "w", encoding="utf-8"))
+
+    def close(self) -> None:
+        self.stream.close()
+
+
+class BatchingSink(OutputSink):
+    """Groups small writes together before passing them to another sink.
+
+    Since `pexpect` flushes after every write, writing each keystroke
+    to a terminal or a file costs a system call. This sink only writes
+    to `target` once enough output has been collected, or once enough
+    time has passed since the last write to `target`.
+
+    Args:
+        target (OutputSink): Where the batches are written.
+        max_chars (int): Write a batch once it holds this many characters.
+        max_delay (float): Write a batch once the oldest output in it
+            is this old, **in seconds**. This is checked on writes.
+    """
+
+    def __init__(
+        self, target: OutputSink, max_chars: int = 8192, max_delay: float = 0.1
+    ):
+        self.target = target
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self.pending: List[str] = []
+        self.size: int = 0
+        self.since: float = 0.0
+
+    def write(self, data: str) -> None:
+        if not self.pending:
+            self.since = time.monotonic()
+        self.pending.append(data)
+        self.size += len(data)
+
+    def flush(self) -> None:
+        if self.size >= self.max_chars or (
+            self.pending and time.monotonic() - self.since >= self.max_delay
+        ):
+            self.drain()
+
+    def drain(self) -> None:
+        """Writes everything that is pending to `target`, and flushes it."""
+        if self.pending:
+            self.target.write("".join(self.pending))
+            self.pending.clear()
+            self.size = 0
+        self.target.flush()
+
+    def close(self) -> None:
+        self.drain()
+        self.target.close()
+
+
+class SwitchingSink(OutputSink):
+    """Passes the output to a sink that can be replaced at any time.
+
+    `Commands` gives one to the child process as its logfile, and
+    switches its target instead of replacing the logfile.
+
+    Writes are serialized with a lock: with a `ChildReader`, output is
+    written from the reader's thread while keystrokes are written from
+    the typing one.
+
+    Args:
+        target (OutputSink): Where the output goes for now.
+    """
+
+    def __init__(self, target: Any):
+        self.target = target
+        self.lock = threading.Lock()
+
+    def switch(self, target: Any) -> Any:
+        """Sends the output somewhere else.
+
+        Args:
+            target (OutputSink): Where the output goes from now on.
+
+        Returns:
+            OutputSink: Where the output went until now.
+        """
+        with self.lock:
+            previous, self.target = self.target, target
+        return previous
+
+    def write(self, data: str) -> None:
+        with self.lock:
+            self.target.write(data)
+
+    def flush(self) -> None:
+        with self.lock:
+            self.target.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            self.target.close()
 
 
 class Commands:
-    def __init__(self, commands: list, expect: list):
+    def __init__(
+        self,
+        commands: list,
+        expect: list,
+        seed: Union[int, None] = None,
+        cache: Union[ScheduleCache, None] = None,
+        sink: Any = None,
+        clock: Union[Clock, None] = None,
+        pool: Union["ShellPool", None] = None,
+        spill: Union[IO, None] = None,
+        steps: Union[Iterable[Tuple[Any, Any]], None] = None,
+        metrics: Union[Metrics, None] = None,
+        typing_profile: Union[TypingProfile, None] = None,
+        background_reader: bool = False,
+        backend: str = "pexpect",
+        recorder: Union["TranscriptRecorder", None] = None,
+        replay: Union["Transcript", None] = None,
+        vectorized: bool = False,
+    ):
         # The first command will be typed using fake_typing.
         # The other commands will be sent using send.
         self.commands = commands
         self.expect = expect
         # `dir_name` should be set dynamically.
         self.dir_name = "commands"
+        # With a seed, every command gets its own seed, drawn in order.
+        # Typing is then reproducible and plans can be cached.
+        self.seed = seed
+        self.seeds = random.Random(seed) if seed is not None else None
+        self.cache = cache
+        # Where the child's output goes. Any `OutputSink`, or anything with
+        # the same methods, can be used. Defaults to `stdout`.
+        self.sink = SwitchingSink(sink if sink is not None else StreamSink(sys.stdout))
+        # Used to wait between keystrokes. A `VirtualClock` skips waits.
+        self.clock = clock or REAL_CLOCK
+        # Where shells come from. Without a pool, one is spawned per run.
+        self.pool = pool
+        # Steps with a `searchwindowsize` only keep the end of their output
+        # in memory. What they drop is also written here, if given.
+        self.spill = spill
+        # Pairs of commands and expects, used instead of `commands` and
+        # `expect` when given. They are only read as the run goes.
+        self.source = steps
+        # Where timings are recorded. Nothing is recorded by default.
+        self.metrics = metrics or NULL_METRICS
+        # The exit status of every command of the last run, when known.
+        self.statuses: List[Union[int, None]] = []
+        # How commands are typed, unless they have their own `typing`
+        # option or `fast` flag.
+        self.typing_profile = typing_profile or DEFAULT_PROFILE
+        # Whether the shell's output is read in a background thread while
+        # commands are typed, by `run()`. See the `reader` module.
+        self.background_reader = background_reader
+        self.reader: Union[ChildReader, None] = None
+        # Which of `BACKENDS` runs the shells spawned here.
+        self.backend = backend
+        # Where the shell's output is recorded, step by step, to be
+        # replayed later. See the `replay` module.
+        self.recorder = recorder
+        # A transcript replayed instead of spawning a shell.
+        self.replay = replay
+        # Whether commands are planned with the `vectorized` module, when
+        # `numpy` is available. See `plan()`.
+        self.vectorized = vectorized
+
+    def steps(self) -> Iterator[Tuple[Any, Any]]:
+        """Iterates over the steps of the run.
 
-    def fake_typing(self, child: pexpect.pty_spawn.spawn, text: str) -> None:
+        Returns:
+            Iterator[Tuple[Any, Any]]: Each command, with what to expect
+                after it. Taken from `steps` if it was given, from
+                `commands` and `expect` otherwise.
+        """
+        if self.source is not None:
+            return iter(self.source)
+        return (
+            (command, self.expect[index])
+            for index, command in enumerate(self.commands)
+        )
+
+    def fake_typing(
+        self,
+        child: pexpect.pty_spawn.spawn,
+        text: str,
+        profile: Union[TypingProfile, None] = None,
+    ) -> None:
         """Fake typing of commands
 
-        This function uses the `type_sentence()` function from the
-        `human_typing` module.
+        This function plans the keystrokes with the `plan_sentence()`
+        function from the `human_typing` module, and then sends them
+        using `play_timeline()`.
 
         This function adds typos and delays to make the typing as
         human-like as possible.
@@ -51,9 +454,96 @@ class Commands:
         Args:
             text (str): The text to type
             child (pexpect.pty_spawn.spawn): The child process.
+            profile (TypingProfile, optional): How to type `text`.
+                Defaults to `self.typing_profile`.
+
+        """
+        timeline = self.plan(text, profile)
+        human_typing.play_timeline(child, timeline, self.clock, self.metrics)
+
+    def plan(self, text: str, profile: Union[TypingProfile, None] = None) -> Timeline:
+        """Plans how a command will be typed.
+
+        Without a seed, this is the same as `human_typing.plan_sentence()`,
+        or as `vectorized.plan_sentence()` if `self.vectorized` is set and
+        `numpy` is available.
+
+        With a seed, the next command seed is drawn and used to plan
+        `text`. If a cache was given, the plan is loaded from it, or
+        stored in it once computed.
+
+        Args:
+            text (str): The text to type.
+            profile (TypingProfile, optional): How to type `text`.
+                Defaults to `self.typing_profile`.
+
+        Returns:
+            Timeline: The keystrokes to send.
+        """
+        profile = profile or self.typing_profile
+        planner = None
+        if self.vectorized:
+            from runner import vectorized
+
+            if vectorized.available():
+                planner = "numpy"
+        if self.seeds is None or not isinstance(text, str):
+            if planner is not None:
+                return vectorized.plan_sentence(text, profile=profile)
+            return human_typing.plan_sentence(text, profile=profile)
+
+        seed = self.seeds.getrandbits(64)
+        if self.cache is not None:
+            cached = self.cache.get(text, seed, profile, planner)
+            if cached is not None:
+                return cached
+
+        if planner is not None:
+            timeline = vectorized.plan_sentence(text, seed, profile)
+        else:
+            timeline = human_typing.plan_sentence(text, random.Random(seed), profile)
+        if self.cache is not None:
+            self.cache.put(text, seed, timeline, profile, planner)
+        return timeline
+
+    def get_profile(self, command: Union[str, dict]) -> TypingProfile:
+        """Gets how a command should be typed.
+
+        Args:
+            command (Union[str, dict]): A value in the configuration
+                file's `commands` field.
+
+        Returns:
+            TypingProfile: `self.typing_profile`, updated with the
+                command's `typing` option and `fast` flag, if any.
+        """
+        profile = self.typing_profile
+        options = self.get_option(command, "typing")
+        if options:
+            profile = profile.updated(options)
+        if self.get_option(command, "fast"):
+            profile = profile._replace(fast=True)
+        return profile
+
+    async def fake_typing_async(
+        self,
+        child: pexpect.pty_spawn.spawn,
+        text: str,
+        profile: Union[TypingProfile, None] = None,
+    ) -> None:
+        """Same as `fake_typing()`, without blocking the event loop.
+
+        Args:
+            text (str): The text to type
+            child (pexpect.pty_spawn.spawn): The child process.
+            profile (TypingProfile, optional): How to type `text`.
+                Defaults to `self.typing_profile`.
 
         """
-        human_typing.type_sentence(child, text)
+        timeline = self.plan(text, profile)
+        await human_typing.play_timeline_async(
+            child, timeline, self.clock, self.metrics
+        )
 
     def fake_typing_secret(self, child: pexpect.pty_spawn.spawn, secret: str) -> None:
         """To fake type a password or other secret. This ensures that the
@@ -67,17 +557,152 @@ class Commands:
         if not isinstance(secret, str):
             raise TypeError(f"Secret must be of type string, not {type(secret)}.")
 
-        listed = list(secret)
         # Adding newline if missing.
-        if listed[-1] != "\n":
-            listed.append("\n")
+        if not secret.endswith("\n"):
+            secret += "\n"
+
+        time.sleep(DELAY_BEFORE_SEND)
+        self.send_secret(child, secret)
+
+    async def fake_typing_secret_async(
+        self, child: pexpect.pty_spawn.spawn, secret: str
+    ) -> None:
+        """Same as `fake_typing_secret()`, without blocking the event loop.
+
+        Args:
+            secret (str): The secret that has to be typed
+            child (pexpect.pty_spawn.spawn): The child process.
+
+        """
+        if not isinstance(secret, str):
+            raise TypeError(f"Secret must be of type string, not {type(secret)}.")
+
+        if not secret.endswith("\n"):
+            secret += "\n"
+
+        await asyncio.sleep(DELAY_BEFORE_SEND)
+        self.send_secret(child, secret)
+
+    def send_secret(self, child: pexpect.pty_spawn.spawn, secret: str) -> None:
+        """Sends a secret at once, without logging it.
+
+        Args:
+            secret (str): The secret, with its newline.
+            child (pexpect.pty_spawn.spawn): The child process.
+
+        """
+        # Turning off logging. We don't want the password to be shown.
+        previous = self.sink.switch(NullSink())
+        try:
+            # Nobody sees a secret being typed, so it is sent at once.
+            child.send(secret)
+        finally:
+            # Getting things back to normal.
+            self.sink.switch(previous)
+
+    def paste(self, child: pexpect.pty_spawn.spawn, text: str) -> None:
+        """Sends text in bulk, as if it was pasted in the terminal.
+
+        This is much faster than typing for long commands, like
+        heredocs or file contents. The text is split with
+        `paste_chunks()` so that no chunk goes over the terminal's
+        input limits. The child's output is read between chunks, so
+        that the child never blocks on a full output buffer.
+
+        Args:
+            text (str): The text to paste. A newline is added if missing.
+            child (pexpect.pty_spawn.spawn): The child process.
+
+        """
+        if not isinstance(text, str):
+            raise TypeError(f"Cannot paste a {type(text)}.")
+        if not text.endswith("\n"):
+            text += "\n"
 
-        # Turning off echo and logging. We don't want the password to be shown.
-        child.logfile = None
-        for item in listed:
-            child.send(item)
-        # Getting things back to normal.
-        child.logfile = sys.stdout
+        for index, chunk in enumerate(paste_chunks(text, PASTE_CHUNK_SIZE)):
+            if index:
+                self.drain(child)
+            child.send(chunk)
+
+    async def paste_async(self, child: pexpect.pty_spawn.spawn, text: str) -> None:
+        """Same as `paste()`, without blocking the event loop.
+
+        The output is drained between chunks in the loop's executor.
+
+        Args:
+            text (str): The text to paste. A newline is added if missing.
+            child (pexpect.pty_spawn.spawn): The child process.
+
+        """
+        if not isinstance(text, str):
+            raise TypeError(f"Cannot paste a {type(text)}.")
+        if not text.endswith("\n"):
+            text += "\n"
+
+        loop = asyncio.get_running_loop()
+        for index, chunk in enumerate(paste_chunks(text, PASTE_CHUNK_SIZE)):
+            if index:
+                await loop.run_in_executor(None, self.drain, child)
+            child.send(chunk)
+
+    def drain(self, child: pexpect.pty_spawn.spawn) -> None:
+        """Reads the child's output until it stops printing for a moment.
+
+        What is read is put back in the child's buffer, so that the
+        next `expect()` still sees it, and in `before`, as a
+        `reader.ChildReader` does.
+
+        Args:
+            child (pexpect.pty_spawn.spawn): The child process.
+
+        """
+        read: List[str] = []
+        try:
+            while True:
+                read.append(child.read_nonblocking(child.maxread, PASTE_SETTLE_TIME))
+        except (pexpect.TIMEOUT, pexpect.EOF):
+            pass
+        if read:
+            text = "".join(read)
+            child.buffer = child.buffer + text
+            before = getattr(child, "_before", None)
+            if before is not None:
+                before.seek(0, 2)
+                before.write(text)
+
+    def get_text(self, command: Union[str, dict]) -> Any:
+        """Gets the text to send for a command.
+
+        Commands can be written as strings, or as dictionaries with a
+        `command` key and options, like `paste`.
+
+        Args:
+            command (Union[str, dict]): A value in the configuration
+                file's `commands` field.
+
+        Returns:
+            Any: The text, or `command` itself if it is not a dictionary
+                with a `command` key. Typing or pasting anything but a
+                string raises a `TypeError` later on.
+        """
+        if isinstance(command, dict) and "command" in command:
+            return command["command"]
+        return command
+
+    def get_option(self, command: Union[str, dict], option: str) -> Any:
+        """Gets an option of a command.
+
+        Args:
+            command (Union[str, dict]): A value in the configuration
+                file's `commands` field.
+            option (str): The name of the option.
+
+        Returns:
+            Any: The option's value, or `None` if it is not set.
+        """
+        if isinstance(command, dict):
+            return command.get(option)
+        return None
 
     def is_password(self, command: Union[str, dict]) -> bool:
         """
@@ -141,28 +766,483 @@ class Commands:
         in the environment variables.
 
         """
-        child = pexpect.spawn("bash", echo=False, encoding="utf-8")
-        child.logfile = sys.stdout
-        child.expect("[#\$%]")
+        child = self.start()
+        self.statuses = []
+
+        try:
+            for command, expect in self.steps():
+
+                with self.metrics.span("typing"):
+
+                    if self.is_password(command):
+
+                        password = self.get_secret(command)
+                        self.fake_typing_secret(child, password)
+
+                    elif self.get_option(command, "paste"):
+
+                        self.paste(child, self.get_text(command))
+
+                    else:
+
+                        self.fake_typing(
+                            child, self.get_text(command), self.get_profile(command)
+                        )
+
+                self.end_input(child)
+                self.statuses.append(self.wait(child, expect, command))
+        finally:
+            # Also when a step failed, so that nothing is left running.
+            self.stop(child)
+
+        return None
+
+    async def run_async(self) -> None:
+        """Same as `run()`, but as a coroutine.
+
+        Delays between keystrokes are awaited with `asyncio.sleep()` and
+        prompts are expected with `pexpect`'s asynchronous `expect()`.
+        Many `Commands` can then share the same event loop. See
+        `run_concurrently()`. `background_reader` is not used: the
+        output is read by the event loop. Secrets are also awaited, and
+        output is drained between pasted chunks in the loop's executor.
+
+        """
+        if self.pool is None:
+            with self.metrics.span("spawn"):
+                child = self.spawn()
+            try:
+                with self.metrics.span("prompt"):
+                    await wait_for_prompt_async(child)
+            except BaseException:
+                child.close()
+                raise
+        else:
+            with self.metrics.span("spawn"):
+                # Waiting for a shell without blocking the event loop.
+                loop = asyncio.get_running_loop()
+                acquired = await loop.run_in_executor(None, self.pool.acquire)
+                child = self.adopt(acquired)
+        self.statuses = []
+
+        try:
+            for command, expect in self.steps():
+
+                with self.metrics.span("typing"):
+
+                    if self.is_password(command):
+
+                        password = self.get_secret(command)
+                        await self.fake_typing_secret_async(child, password)
+
+                    elif self.get_option(command, "paste"):
+
+                        await self.paste_async(child, self.get_text(command))
+
+                    else:
+
+                        await self.fake_typing_async(
+                            child, self.get_text(command), self.get_profile(command)
+                        )
+
+                self.end_input(child)
+                self.statuses.append(await self.wait_async(child, expect, command))
+        finally:
+            # Also when a step failed, so that nothing is left running.
+            self.stop(child)
+
+        return None
+
+    def spawn(self) -> pexpect.pty_spawn.spawn:
+        """Spawns the `bash` process to which commands are typed.
+
+        With `self.replay`, the transcript is replayed instead. With
+        `self.recorder`, the shell's output starts being recorded.
+
+        Returns:
+            pexpect.pty_spawn.spawn: The child process. Its output is
+                logged to `self.sink`.
+        """
+        if self.replay is not None:
+            from runner.replay import ReplaySession
+
+            # Recorded delays only move virtual time. Otherwise, the
+            # output is printed at once.
+            virtual = isinstance(self.clock, VirtualClock)
+            child = ReplaySession(self.replay, self.clock if virtual else None)
+        else:
+            child = spawn_shell(backend=self.backend)
+        child.logfile = self.sink
+        child.delaybeforesend = None
+        if self.recorder is not None:
+            self.recorder.start(child)
+        return child
+
+    def start(self) -> pexpect.pty_spawn.spawn:
+        """Gets a shell that is waiting at its prompt.
+
+        The shell is taken from `self.pool` if there is one. Otherwise,
+        a new one is spawned and its prompt is expected. With
+        `background_reader`, a `ChildReader` starts reading its output.
+
+        Spawning, or waiting for the pool, is timed in the `"spawn"`
+        span, and waiting for the first prompt in the `"prompt"` one.
+
+        Returns:
+            pexpect.pty_spawn.spawn: The child process.
+        """
+        if self.pool is None:
+            with self.metrics.span("spawn"):
+                child = self.spawn()
+            try:
+                with self.metrics.span("prompt"):
+                    wait_for_prompt(child)
+            except BaseException:
+                child.close()
+                raise
+        else:
+            with self.metrics.span("spawn"):
+                child = self.adopt(self.pool.acquire())
+        # Replayed output is never waited for, so it is not read ahead.
+        if self.background_reader and self.replay is None:
+            self.reader = ChildReader(child)
+            self.reader.start()
+        return child
+
+    def adopt(self, child: pexpect.pty_spawn.spawn) -> pexpect.pty_spawn.spawn:
+        """Prepares a shell from the pool as if it had been spawned here.
+
+        What the shell printed before its prompt is written to the sink,
+        so that recordings still start with it.
+
+        Args:
+            child (pexpect.pty_spawn.spawn): A shell from `self.pool`.
+
+        Returns:
+            pexpect.pty_spawn.spawn: The same shell.
+        """
+        self.sink.write(child.startup_output)
+        self.sink.flush()
+        child.logfile = self.sink
+        child.delaybeforesend = None
+        if self.recorder is not None:
+            self.recorder.start(child)
+            self.recorder.write(child.startup_output)
+        return child
+
+    def end_input(self, child: pexpect.pty_spawn.spawn) -> None:
+        """Called once the input of a step was sent.
+
+        Transcripts are cut into steps there: the recorder starts a new
+        step, and a replayed transcript prints the output of the next one.
+
+        Args:
+            child (pexpect.pty_spawn.spawn): The child process.
+        """
+        if self.recorder is not None:
+            self.recorder.next_step()
+        if self.replay is not None:
+            child.next_step()
+
+    def stop(self, child: pexpect.pty_spawn.spawn) -> None:
+        """Closes a shell, or gives it back to the pool.
+
+        Args:
+            child (pexpect.pty_spawn.spawn): The child process.
+        """
+        if self.reader is not None:
+            self.reader.stop()
+            self.reader = None
+        if self.pool is None:
+            child.close()
+        else:
+            self.pool.release(child)
+
+    def wait(
+        self,
+        child: pexpect.pty_spawn.spawn,
+        expect: str,
+        command: Union[str, dict] = "",
+    ) -> Union[int, None]:
+        """Waits until a command is done.
+
+        Commands written as dictionaries can set how the wait is done:
+
+        - `searchwindowsize`: Only the last `searchwindowsize` characters
+          of the output are kept in memory and searched. Everything
+          else is still written to the sink, and to `self.spill`.
+        - `maxread`: How many characters are read at once.
+
+        Args:
+            child (pexpect.pty_spawn.spawn): The child process.
+            expect (str): A value in the configuration file's `expect`
+                field.
+            command (Union[str, dict], optional): The command that was
+                sent.
+
+        Returns:
+            int: The exit status of the command, if `expect` is the
+                `prompt` keyword and the shell reports it. `None`
+                otherwise.
+        """
+        window = self.get_option(command, "searchwindowsize")
+        maxread = child.maxread
+        child.maxread = self.get_option(command, "maxread") or maxread
+        try:
+            with self.metrics.span("expect"):
+                if expect == "prompt":
+                    return wait_for_prompt(child, window, self.spill)
+                expect_bounded(child, self.get_pattern(expect), window, self.spill)
+                return None
+        except pexpect.TIMEOUT:
+            self.metrics.increment("timeouts")
+            raise
+        finally:
+            child.maxread = maxread
+
+    async def wait_async(
+        self,
+        child: pexpect.pty_spawn.spawn,
+        expect: str,
+        command: Union[str, dict] = "",
+    ) -> Union[int, None]:
+        """Same as `wait()`, without blocking the event loop.
+
+        Args:
+            child (pexpect.pty_spawn.spawn): The child process.
+            expect (str): A value in the configuration file's `expect`
+                field.
+            command (Union[str, dict], optional): The command that was
+                sent.
+
+        Returns:
+            int: The exit status of the command, or `None`.
+        """
+        window = self.get_option(command, "searchwindowsize")
+        maxread = child.maxread
+        child.maxread = self.get_option(command, "maxread") or maxread
+        try:
+            with self.metrics.span("expect"):
+                if expect == "prompt":
+                    return await wait_for_prompt_async(child, window, self.spill)
+                await expect_bounded(
+                    child, self.get_pattern(expect), window, self.spill, async_=True
+                )
+                return None
+        except pexpect.TIMEOUT:
+            self.metrics.increment("timeouts")
+            raise
+        finally:
+            child.maxread = maxread
+
+    def get_pattern(self, expect: str) -> str:
+        """Gets what should be expected after a command.
+
+        Args:
+            expect (str): A value in the configuration file's `expect`
+                field.
+
+        Returns:
+            str: The pattern to expect. The `prompt` keyword is replaced
+                by `PROMPT_PATTERN`.
+        """
+        if expect == "prompt":
+            return PROMPT_PATTERN
+        return expect
+
+
+def spawn_pexpect(command: str, args: Sequence[str], env: Dict[str, str]) -> Any:
+    """Spawns a program with `pexpect`, without echo.
+
+    Args:
+        command (str): The program to run.
+        args (Sequence[str]): Its arguments.
+        env (Dict[str, str]): Its environment.
+
+    Returns:
+        pexpect.pty_spawn.spawn: The child process.
+    """
+    return pexpect.spawn(command, list(args), echo=False, encoding="utf-8", env=env)
+
+
+def spawn_pty(command: str, args: Sequence[str], env: Dict[str, str]) -> Any:
+    """Spawns a program in a terminal of its own, without `pexpect`.
 
-        for index, command in enumerate(self.commands):
+    Same arguments as `spawn_pexpect()`.
 
-            expect = self.expect[index]
+    Returns:
+        pty_session.PtySession: The child process.
+    """
+    from runner.pty_session import PtySession
 
-            if self.is_password(command):
+    return PtySession(command, args, env=env, echo=False)
 
-                password = self.get_secret(command)
-                self.fake_typing_secret(child, password)
 
-            else:
+# Session backends, by name. Each spawns a program, from its name, its
+# arguments and its environment, and returns a `Session`.
+BACKENDS: Dict[str, Callable[[str, Sequence[str], Dict[str, str]], Any]] = {
+    "pexpect": spawn_pexpect,
+    "pty": spawn_pty,
+}
 
-                self.fake_typing(child, command)
 
-            if expect == "prompt":
-                child.expect("[#\$%]")
-            else:
-                child.expect(expect)
+def spawn_shell(backend: str = "pexpect") -> Any:
+    """Spawns a `bash` process, without waiting for its prompt.
 
-        child.close()
+    The shell loads `SHELL_INTEGRATION` after the user's rc file. It
+    then prints a sentinel, unique to this shell, at the end of every
+    prompt.
+    The sentinel is kept in the child's `sentinel` attribute.
 
+    Args:
+        backend (str): Which of `BACKENDS` runs the shell.
+
+    Raises:
+        ValueError: If the backend is unknown.
+
+    Returns:
+        Session: The child process. Nothing is logged.
+    """
+    try:
+        spawn = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown backend {backend!r}. Use one of: {', '.join(BACKENDS)}."
+        ) from None
+    token = secrets.token_hex(8)
+    child = spawn(
+        "bash",
+        ["--rcfile", str(SHELL_INTEGRATION)],
+        dict(os.environ, GOOD_BOT_TOKEN=token),
+    )
+    child.sentinel = f"{SENTINEL_START}{token};"
+    return child
+
+
+def wait_for_prompt(
+    child: pexpect.pty_spawn.spawn,
+    window: Union[int, None] = None,
+    spill: Union[IO, None] = None,
+) -> Union[int, None]:
+    """Waits until a shell shows its prompt.
+
+    Shells started with `spawn_shell()` are waited for using their
+    sentinel. Only new output is searched for it, and the output of a
+    command can never be mistaken for it. Other shells are waited for
+    using `PROMPT_PATTERN`.
+
+    Args:
+        child (pexpect.pty_spawn.spawn): The shell.
+        window (int, optional): Only keep this many characters of
+            output in memory. See `streaming.expect_bounded()`.
+        spill (IO, optional): Where output that is dropped is written.
+
+    Returns:
+        int: The exit status of the last command, or `None` if the shell
+            does not report it.
+    """
+    sentinel = getattr(child, "sentinel", None)
+    if sentinel is None:
+        expect_bounded(child, PROMPT_PATTERN, window, spill)
         return None
+    expect_bounded(child, sentinel, window, spill, exact=True)
+    expect_bounded(child, SENTINEL_END, window, spill, exact=True)
+    return int(child.before)
+
+
+async def wait_for_prompt_async(
+    child: pexpect.pty_spawn.spawn,
+    window: Union[int, None] = None,
+    spill: Union[IO, None] = None,
+) -> Union[int, None]:
+    """Same as `wait_for_prompt()`, without blocking the event loop.
+
+    Args:
+        child (pexpect.pty_spawn.spawn): The shell.
+        window (int, optional): Only keep this many characters of
+            output in memory.
+        spill (IO, optional): Where output that is dropped is written.
+
+    Returns:
+        int: The exit status of the last command, or `None`.
+    """
+    sentinel = getattr(child, "sentinel", None)
+    if sentinel is None:
+        await expect_bounded(child, PROMPT_PATTERN, window, spill, async_=True)
+        return None
+    await expect_bounded(child, sentinel, window, spill, exact=True, async_=True)
+    await expect_bounded(child, SENTINEL_END, window, spill, exact=True, async_=True)
+    return int(child.before)
+
+
+def paste_chunks(text: str, size: int) -> List[str]:
+    """Splits text in chunks that can be written to a terminal at once.
+
+    Chunks end on line boundaries whenever possible. Only lines that
+    are longer than `size` are split. Characters are never split.
+
+    Args:
+        text (str): The text to split.
+        size (int): The largest chunk, in UTF-8 encoded bytes.
+
+    Returns:
+        List[str]: The chunks. Joined, they are `text`.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_size = 0
+
+    def pieces(line: str) -> Iterable[str]:
+        if len(line.encode()) <= size:
+            yield line
+            return
+        piece: List[str] = []
+        piece_size = 0
+        for letter in line:
+            letter_size = len(letter.encode())
+            if piece and piece_size + letter_size > size:
+                yield "".join(piece)
+                piece, piece_size = [], 0
+            piece.append(letter)
+            piece_size += letter_size
+        if piece:
+            yield "".join(piece)
+
+    for line in text.splitlines(keepends=True):
+        for piece in pieces(line):
+            piece_size = len(piece.encode())
+            if current and current_size + piece_size > size:
+                chunks.append("".join(current))
+                current, current_size = [], 0
+            current.append(piece)
+            current_size += piece_size
+    if current:
+        chunks.append("".join(current))
+
+    return chunks
+
+
+async def run_concurrently(
+    commands: Iterable[Commands], limit: Union[int, None] = None
+) -> None:
+    """Runs many `Commands` from the same event loop.
+
+    Every shell process uses a pseudo-terminal and a few file
+    descriptors. `limit` can be used to keep the number of shells
+    that are alive at the same time under the system's limits.
+
+    Args:
+        commands (Iterable[Commands]): What to run.
+        limit (int, optional): How many `Commands` can run at the same
+            time. There is no limit by default.
+    """
+    semaphore = asyncio.Semaphore(limit) if limit else None
+
+    async def run_one(todo: Commands) -> None:
+        if semaphore is None:
+            await todo.run_async()
+            return
+        async with semaphore:
+            await todo.run_async()
+
+    await asyncio.gather(*(run_one(todo) for todo in commands))
@@ -12,13 +12,65 @@ for more information on how decorators affect the ``gb_run()`` function.
 """
 
 import click
+import functools
 import pathlib
 import sys
-from runner import classmodule
+from typing import Tuple, Union
+from runner import batch
 from runner import funcmodule
+from runner.typing_profile import DEFAULT_PROFILE, TypingProfile
+
+# Every command imports what it needs when it runs. Starting `runner`,
+# or printing its help, does not import `pexpect` or `yaml`.
 
 DATA_DIR: pathlib.Path = pathlib.Path(".")
 
+
+def get_data_dir(docker: bool, no_docker: bool) -> pathlib.Path:
+    """Finds the directory from which scripts are read.
+
+    Args:
+        docker (bool): The `--docker` flag.
+        no_docker (bool): The `--no-docker` flag.
+
+    Returns:
+        pathlib.Path: ``/data`` in a container, the current directory
+            otherwise. The flags override the automatic selection.
+    """
+    # The flags override the automatic selection, which is then skipped.
+    if docker:
+        return pathlib.Path("/project")
+    if no_docker:
+        return pathlib.Path(".")
+
+    if funcmodule.in_docker():
+        return pathlib.Path("/data")
+    return pathlib.Path(".")
+
+
+def typing_options(
+    speed: Union[float, None], profile: TypingProfile
+) -> TypingProfile:
+    """Applies the `--speed` option to a typing profile.
+
+    Args:
+        speed (float, optional): The `--speed` option.
+        profile (TypingProfile): The profile to update.
+
+    Raises:
+        click.BadParameter: If `speed` is not above 0.
+
+    Returns:
+        TypingProfile: The updated profile.
+    """
+    if speed is None:
+        return profile
+    try:
+        return profile.updated({"speed": speed})
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--speed")
+
+
 @click.command()
 @click.argument("input_file", type=str)
 @click.option(
@@ -35,30 +87,232 @@ DATA_DIR: pathlib.Path = pathlib.Path(".")
     is_flag=True,
     help="Override the automatic environment selection.",
 )
-def gb_run(input_file: str, docker: bool, no_docker: bool) -> None:
+@click.option(
+    "--seed",
+    type=int,
+    default=None,
+    help="Make typing reproducible. Overrides the script's `seed` key.",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Where to cache checked scripts, and typing plans when a seed is used.",
+)
+@click.option(
+    "--no-cache",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Do not cache checked scripts or typing plans.",
+)
+@click.option(
+    "--virtual-time",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Do not wait between keystrokes. Recordings still look human-paced.",
+)
+@click.option(
+    "--typescript",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Record the output to this file, with timings for `scriptreplay`.",
+)
+@click.option(
+    "--asciicast",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Record the output to this file, in the asciicast v2 format.",
+)
+@click.option(
+    "--record",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Record each step's output and timing to this transcript.",
+)
+@click.option(
+    "--replay",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Replay this transcript instead of running the commands.",
+)
+@click.option(
+    "--idle-time-limit",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Longest pause, in seconds, kept in an asciicast recording.",
+)
+@click.option(
+    "--speed",
+    type=float,
+    default=None,
+    help="Type this many times faster. A script's or a command's own `speed` wins.",
+)
+@click.option(
+    "--quiet",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Do not print the output of the commands.",
+)
+@click.option(
+    "--prespawn/--no-prespawn",
+    default=True,
+    show_default=True,
+    help="Start the shell while the script is being read and checked.",
+)
+@click.option(
+    "--stream",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Read the script's YAML documents one at a time, while running.",
+)
+@click.option(
+    "--metrics",
+    "metrics_path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write timings of the run to this file.",
+)
+@click.option(
+    "--metrics-format",
+    type=click.Choice(["json", "prometheus"]),
+    default="json",
+    show_default=True,
+    help="Format of the --metrics file. `prometheus` is a textfile for node_exporter.",
+)
+@click.option(
+    "--profile",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Profile the run with cProfile. Writes a .pstats file next to the output.",
+)
+@click.option(
+    "--profile-memory",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="With --profile, also report the lines that allocated the most memory.",
+)
+@click.option(
+    "--background-reader",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Read the output in a thread while typing, so busy commands do not stall.",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["pexpect", "pty"]),
+    default="pexpect",
+    show_default=True,
+    help="How the shell is run. `pty` drives its terminal without pexpect.",
+)
+@click.option(
+    "--vectorized",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Plan typing with numpy, when it is installed. Faster for long scripts.",
+)
+def gb_run(
+    input_file: str,
+    docker: bool,
+    no_docker: bool,
+    seed: Union[int, None],
+    cache_dir: Union[str, None],
+    no_cache: bool,
+    virtual_time: bool,
+    typescript: Union[str, None],
+    asciicast: Union[str, None],
+    record: Union[str, None],
+    replay: Union[str, None],
+    idle_time_limit: Union[float, None],
+    speed: Union[float, None],
+    quiet: bool,
+    prespawn: bool,
+    stream: bool,
+    metrics_path: Union[str, None],
+    metrics_format: str,
+    profile: bool,
+    profile_memory: bool,
+    background_reader: bool,
+    backend: str,
+    vectorized: bool,
+) -> None:
     """Runs a command using the Commands class.
     It runs the command according to the configuration file that is
     passed as the 'input' argument
     """
+    from runner import classmodule
+    from runner.clock import REAL_CLOCK, VirtualClock
+    from runner.config_cache import ConfigCache
+    from runner.metrics import Metrics
+    from runner.profiling import Profiler
+    from runner.recording import AsciicastRecorder, TypescriptRecorder
+    from runner.replay import Transcript, TranscriptRecorder
+    from runner.schedule_cache import ScheduleCache
+    from runner.shell_pool import DISCARD, ShellPool
+    from runner.steps import StepStream
 
-    if funcmodule.in_docker():
-        DATA_DIR = pathlib.Path("/data")
-    else:
-        DATA_DIR = pathlib.Path(".")
+    DATA_DIR = get_data_dir(docker, no_docker)
 
-    # Overriding the automatic selection if the flags are not set to default.
-    if docker:
-        DATA_DIR = pathlib.Path("/project")
-    elif no_docker:
-        DATA_DIR = pathlib.Path(".")
+    if record and replay:
+        raise click.UsageError("Use either --record or --replay, not both.")
+    transcript = None
+    if replay:
+        try:
+            transcript = Transcript.load(replay)
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--replay")
+
+    # The shell starts in the background. If the script turns out to be
+    # invalid, it is closed when the program exits.
+    pool = None
+    if prespawn and transcript is None:
+        spawn = functools.partial(classmodule.spawn_shell, backend=backend)
+        pool = ShellPool(1, policy=DISCARD, spawn=spawn)
 
     config_file_path: pathlib.Path = DATA_DIR / pathlib.Path(input_file)
-    try:
-        parsed = funcmodule.parse_config(config_file_path)
-    except FileNotFoundError:
-        funcmodule.config_not_found_routine(config_file_path, DATA_DIR)
-    # parse_config does not assume anything about the config file.
-    funcmodule.check_config(parsed)
+
+    profiler = None
+    if profile:
+        # Reports go next to the recording, or next to the script.
+        output = typescript or asciicast
+        profiler = Profiler(
+            pathlib.Path(output) if output else config_file_path,
+            memory=profile_memory,
+        )
+        profiler.start()
+
+    steps: Union[StepStream, None] = None
+    parsed: dict
+    if stream:
+        try:
+            # Documents are read and checked as the script runs.
+            steps = StepStream(config_file_path)
+        except FileNotFoundError:
+            funcmodule.config_not_found_routine(config_file_path, DATA_DIR)
+        parsed = {
+            "commands": [],
+            "expect": [],
+            "seed": steps and steps.seed,
+            "typing": steps.typing if steps else {},
+        }
+    else:
+        config_cache = None
+        if not no_cache:
+            config_cache = ConfigCache(pathlib.Path(cache_dir) if cache_dir else None)
+        try:
+            # Checked without interaction, since checked scripts are cached.
+            parsed = funcmodule.load_config(config_file_path, config_cache)
+        except FileNotFoundError:
+            funcmodule.config_not_found_routine(config_file_path, DATA_DIR)
+        # Unusual values are confirmed on every run, never from the cache.
+        funcmodule.confirm_config(parsed)
 
     try:
         commands = parsed["commands"]
@@ -68,26 +322,289 @@ def gb_run(input_file: str, docker: bool, no_docker: bool) -> None:
         print("Missing element in the dictionary.")
         sys.exit()
 
-    command = classmodule.Commands(commands, expect)
+    if seed is None:
+        seed = parsed.get("seed")
+
+    cache = None
+    if not no_cache:
+        cache = ScheduleCache(pathlib.Path(cache_dir) if cache_dir else None)
+
+    typing_profile = typing_options(speed, DEFAULT_PROFILE)
+    # The script's options override `--speed`.
+    typing_profile = typing_profile.updated(parsed.get("typing") or {})
+
+    clock = VirtualClock() if virtual_time else REAL_CLOCK
+    if typescript and asciicast:
+        raise click.UsageError("Use either --typescript or --asciicast, not both.")
+    sink: Union[classmodule.OutputSink, TypescriptRecorder, AsciicastRecorder]
+    if typescript:
+        sink = TypescriptRecorder(pathlib.Path(typescript), clock=clock)
+    elif asciicast:
+        sink = AsciicastRecorder(
+            pathlib.Path(asciicast), idle_time_limit=idle_time_limit, clock=clock
+        )
+    elif quiet:
+        sink = classmodule.NullSink()
+    else:
+        sink = classmodule.StreamSink(sys.stdout)
+
+    command = classmodule.Commands(
+        commands,
+        expect,
+        seed=seed,
+        cache=cache,
+        sink=sink,
+        clock=clock,
+        pool=pool,
+        steps=steps,
+        metrics=Metrics() if metrics_path else None,
+        typing_profile=typing_profile,
+        background_reader=background_reader,
+        backend=backend,
+        recorder=TranscriptRecorder(record) if record else None,
+        replay=transcript,
+        vectorized=vectorized,
+    )
 
-    command.run()
+    try:
+        command.run()
+    finally:
+        sink.close()
+        if command.recorder is not None:
+            command.recorder.close()
+        if pool is not None:
+            pool.close()
+        if profiler is not None:
+            profiler.stop()
+        if metrics_path:
+            # Written even if the run failed, to see where it did.
+            if metrics_format == "prometheus":
+                report = command.metrics.to_prometheus()
+            else:
+                report = command.metrics.to_json()
+            pathlib.Path(metrics_path).write_text(report)
 
     print()
 
 
 @click.command()
-@click.argument("input-file", type=str)
-def check_config(input_file: str) -> None:
-    """Checks you configuration file to make sure that there are no errors."""
+@click.argument("paths", type=str, nargs=-1, required=True)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=0,
+    help="How many scripts to run at the same time. Defaults to the CPU cores.",
+)
+@click.option(
+    "--log-dir",
+    type=click.Path(file_okay=False),
+    default="runner-logs",
+    show_default=True,
+    help="Where to write the output of each script.",
+)
+@click.option(
+    "--docker",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Override the automatic environment selection.",
+)
+@click.option(
+    "--no-docker",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Override the automatic environment selection.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=None,
+    help="Make typing reproducible. Overrides the scripts' `seed` key.",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Where to cache checked scripts, and typing plans when a seed is used.",
+)
+@click.option(
+    "--no-cache",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Do not cache checked scripts or typing plans.",
+)
+@click.option(
+    "--virtual-time",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Do not wait between keystrokes.",
+)
+@click.option(
+    "--speed",
+    type=float,
+    default=None,
+    help="Type this many times faster. Scripts' and commands' own `speed` wins.",
+)
+@click.option(
+    "--warm-shells",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="How many shells each worker keeps ready. 0 starts them on demand.",
+)
+@click.option(
+    "--profile",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Profile the run with cProfile. Writes a .pstats file next to each log.",
+)
+@click.option(
+    "--profile-memory",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="With --profile, also report the lines that allocated the most memory.",
+)
+@click.option(
+    "--background-reader",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Read the output in a thread while typing, so busy commands do not stall.",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["pexpect", "pty"]),
+    default="pexpect",
+    show_default=True,
+    help="How the shell is run. `pty` drives its terminal without pexpect.",
+)
+@click.option(
+    "--vectorized",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="Plan typing with numpy, when it is installed. Faster for long scripts.",
+)
+def gb_batch(
+    paths: Tuple[str, ...],
+    jobs: int,
+    log_dir: str,
+    docker: bool,
+    no_docker: bool,
+    seed: Union[int, None],
+    cache_dir: Union[str, None],
+    no_cache: bool,
+    virtual_time: bool,
+    speed: Union[float, None],
+    warm_shells: int,
+    profile: bool,
+    profile_memory: bool,
+    background_reader: bool,
+    backend: str,
+    vectorized: bool,
+) -> None:
+    """Runs many scripts in parallel.
+
+    PATHS can be scripts, directories containing scripts or glob
+    patterns. The output of each script is written to its own file
+    in the log directory. A summary is printed at the end.
+    """
+    data_dir = get_data_dir(docker, no_docker)
+    typing_profile = typing_options(speed, DEFAULT_PROFILE)
+
     try:
-        funcmodule.check_parsed_config_no_interaction(
-            DATA_DIR / pathlib.Path(input_file)
-        )
-    except FileNotFoundError:
-        funcmodule.config_not_found_routine(
-            DATA_DIR / pathlib.Path(input_file), DATA_DIR
-        )
+        scripts = batch.expand_paths(str(data_dir / path) for path in paths)
+    except FileNotFoundError as error:
+        funcmodule.config_not_found_routine(pathlib.Path(str(error)), data_dir)
+
+    results = batch.run_batch(
+        scripts,
+        jobs=jobs or None,
+        log_dir=pathlib.Path(log_dir),
+        seed=seed,
+        cache_dir=pathlib.Path(cache_dir) if cache_dir else None,
+        use_cache=not no_cache,
+        virtual_time=virtual_time,
+        warm_shells=warm_shells,
+        profile=profile,
+        profile_memory=profile_memory,
+        typing_profile=typing_profile,
+        background_reader=background_reader,
+        backend=backend,
+        vectorized=vectorized,
+    )
+    click.echo(batch.format_summary(results))
+
+    if not all(result.ok for result in results):
+        sys.exit(1)
+
+
+@click.command()
+@click.argument("paths", type=str, nargs=-1, required=True)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=0,
+    help="How many files to check at the same time. Defaults to the CPU cores.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="How problems are reported.",
+)
+@click.option(
+    "--stream",
+    type=bool,
+    default=False,
+    is_flag=True,
+    help="The files are run with --stream, so they can hold many YAML documents.",
+)
+def check_config(
+    paths: Tuple[str, ...], jobs: int, output_format: str, stream: bool
+) -> None:
+    """Checks your configuration files to make sure that there are no errors.
+
+    PATHS can be files, directories containing files or glob patterns.
+    Every problem of every file is reported, and nothing is ever asked.
+    Exits with an error status if a problem was found.
+    """
+    from runner import validation
+
+    try:
+        scripts = batch.expand_paths(str(DATA_DIR / path) for path in paths)
+    except FileNotFoundError as error:
+        funcmodule.config_not_found_routine(pathlib.Path(str(error)), DATA_DIR)
+
+    problems = validation.validate_files(scripts, jobs or None, stream)
+
+    if output_format == "json":
+        click.echo(validation.format_json(problems, len(scripts)))
+    else:
+        for problem in problems:
+            click.echo(str(problem))
+        click.echo(f"{len(scripts)} files checked, {len(problems)} problems found.")
+
+    if problems:
+        sys.exit(1)
 
 
 def main():
     gb_run()
+
+
+def batch_main():
+    gb_batch()
+
+
+def check_main():
+    check_config()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Clocks used to pace typing.
+
+`Clock` waits for real. Keystrokes are timed with `sleep_until()`,
+against deadlines computed from the start of the typing. Being late
+for one keystroke then does not make every following one late too.
+
+`VirtualClock` does not wait: it only moves its own time forward.
+When typing with a `VirtualClock`, keystrokes are sent as fast as the
+child process accepts them, while recordings are still stamped as if
+a human was typing. Real time is only spent waiting for the child
+process.
+
+## Example
+
+```python
+from runner.clock import VirtualClock
+clock = VirtualClock()
+clock.sleep(300)  # Returns immediately.
+```
+"""
+import asyncio
+import time
+
+# How long before a deadline `Clock.sleep_until()` stops sleeping and
+# starts polling the time instead, **in seconds**. `time.sleep()` can
+# wake up late by this much on a busy machine. Coroutines never poll.
+SPIN_TIME: float = 0.002
+
+
+class Clock:
+    """A clock that follows real time."""
+
+    def now(self) -> float:
+        """Returns the current time.
+
+        Returns:
+            float: A monotonic time **in seconds**. Only differences
+                between two values are meaningful.
+        """
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        """Waits for a while.
+
+        Args:
+            seconds (float): How long to wait **in seconds**.
+        """
+        time.sleep(seconds)
+
+    async def sleep_async(self, seconds: float) -> None:
+        """Same as `sleep()`, without blocking the event loop.
+
+        Args:
+            seconds (float): How long to wait **in seconds**.
+        """
+        await asyncio.sleep(seconds)
+
+    def sleep_until(self, deadline: float) -> None:
+        """Waits until a point in time, as given by `now()`.
+
+        Most of the wait is slept. The end of it is spent polling the
+        time, so that the deadline is met within microseconds instead
+        of whenever the operating system wakes the process up.
+
+        Args:
+            deadline (float): When to return. Returns immediately if
+                it has passed.
+        """
+        remaining = deadline - self.now()
+        if remaining > SPIN_TIME:
+            self.sleep(remaining - SPIN_TIME)
+        while self.now() < deadline:
+            pass
+
+    async def sleep_until_async(self, deadline: float) -> None:
+        """Same as `sleep_until()`, without blocking the event loop.
+
+        The whole wait is slept: polling would keep the event loop busy
+        for every coroutine waiting, and the loop wakes coroutines up
+        less precisely anyway.
+
+        Args:
+            deadline (float): When to return.
+        """
+        remaining = deadline - self.now()
+        if remaining > 0:
+            await self.sleep_async(remaining)
+
+
+class VirtualClock(Clock):
+    """A clock that skips sleeps instead of waiting.
+
+    The time returned by `now()` is the real time plus every sleep that
+    was skipped so far.
+    """
+
+    def __init__(self) -> None:
+        self.skipped: float = 0.0
+
+    def now(self) -> float:
+        return time.monotonic() + self.skipped
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self.skipped += seconds
+
+    async def sleep_async(self, seconds: float) -> None:
+        self.sleep(seconds)
+        # Still giving other coroutines a chance to run.
+        await asyncio.sleep(0)
+
+    def sleep_until(self, deadline: float) -> None:
+        self.sleep(deadline - self.now())
+
+    async def sleep_until_async(self, deadline: float) -> None:
+        await self.sleep_async(deadline - self.now())
+
+
+# The clock used when none is given.
+REAL_CLOCK: Clock = Clock()
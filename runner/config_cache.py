@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""On-disk cache of parsed and checked configuration files.
+
+Parsing YAML is slow, especially for large generated scripts that are
+run again and again. `ConfigCache` stores configurations once they are
+parsed and checked. A script that did not change since is loaded from
+the cache, without being parsed or checked again.
+
+Files are recognized by their path, modification time and size.
+Configurations are stored with `marshal`, which is compact and much
+faster to load than YAML.
+
+## Example
+
+```python
+from runner.config_cache import ConfigCache
+from runner import funcmodule
+parsed = funcmodule.load_config(pathlib.Path("demo.yaml"), ConfigCache())
+```
+"""
+import hashlib
+import marshal
+import os
+import pathlib
+import sys
+import tempfile
+from typing import Union
+
+from runner.schedule_cache import default_cache_dir
+
+# Changed whenever what is stored, or how it is checked, changes.
+# 2: `commands` and `expect` must have the same length, and `typing`
+# options, layouts included, are checked.
+CONFIG_CACHE_VERSION: int = 2
+
+
+class ConfigCache:
+    """Stores checked configurations, keyed by path, mtime and size.
+
+    Args:
+        directory (pathlib.Path, optional): Where to store the
+            configurations. Defaults to a ``configs`` directory in
+            `default_cache_dir()`.
+    """
+
+    def __init__(self, directory: Union[pathlib.Path, None] = None):
+        if directory is None:
+            directory = default_cache_dir() / "configs"
+        self.directory = pathlib.Path(directory)
+
+    def key(self, path: pathlib.Path, stat: os.stat_result) -> str:
+        """Computes the key under which a configuration is stored.
+
+        Args:
+            path (pathlib.Path): The configuration file.
+            stat (os.stat_result): The file's status, from when it was read.
+
+        Returns:
+            str: A hexadecimal digest.
+        """
+        digest = hashlib.sha256()
+        digest.update(
+            f"{CONFIG_CACHE_VERSION}\0{sys.version_info[:2]}\0"
+            f"{stat.st_mtime_ns}\0{stat.st_size}\0".encode()
+        )
+        digest.update(os.fsencode(path.resolve()))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / key
+
+    def get(self, path: pathlib.Path) -> Union[dict, None]:
+        """Loads a cached configuration.
+
+        Args:
+            path (pathlib.Path): The configuration file.
+
+        Raises:
+            FileNotFoundError: If `path` does not exist.
+
+        Returns:
+            dict/None: The configuration, or `None` if it is not cached,
+                if the file changed or if the cache cannot be read.
+        """
+        key = self.key(path, path.stat())
+        try:
+            parsed = marshal.loads(self._path(key).read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return parsed if isinstance(parsed, dict) else None
+
+    def put(self, path: pathlib.Path, stat: os.stat_result, parsed: dict) -> None:
+        """Stores a configuration.
+
+        The file is written atomically. Errors are ignored: the cache is
+        only an optimization. Configurations holding values that
+        `marshal` cannot store, like dates, are not cached.
+
+        Args:
+            path (pathlib.Path): The configuration file.
+            stat (os.stat_result): The file's status, taken before it
+                was read. A file changed while being read is then never
+                loaded from the cache.
+            parsed (dict): The checked configuration.
+        """
+        try:
+            data = marshal.dumps(parsed)
+        except ValueError:
+            return
+        cached = self._path(self.key(path, stat))
+        try:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            stream = tempfile.NamedTemporaryFile(dir=cached.parent, delete=False)
+        except OSError:
+            return
+        try:
+            with stream:
+                stream.write(data)
+            os.replace(stream.name, cached)
+        except OSError:
+            # Not leaving a partial file in the cache.
+            try:
+                os.unlink(stream.name)
+            except OSError:
+                pass
@@ -18,25 +18,59 @@ text file.
 """
 
 import click
+import functools
 import pathlib
 import sys
 import os
-import yaml
+from typing import TYPE_CHECKING, Any, Callable, Tuple, Union
+
+from runner.typing_profile import check_typing
+
+if TYPE_CHECKING:
+    from runner.config_cache import ConfigCache
+
+# Keys that a configuration file must have, and keys that it may have.
+REQUIRED_KEYS: Tuple[str, ...] = ("commands", "expect")
+OPTIONAL_KEYS: Tuple[str, ...] = ("seed", "typing")
+CONFIG_KEYS: Tuple[str, ...] = REQUIRED_KEYS + OPTIONAL_KEYS
+# Keys that apply to the whole script. In a script made of many YAML
+# documents, only the first document can have them.
+SCRIPT_KEYS: Tuple[str, ...] = ("seed", "typing")
 
 
 def in_docker() -> bool:
     """Checks if code is currently running in a Docker container.
     Checks if Docker is in control groups or if there is a `.dockerenv`
     file at the filesystem's root directory.
+
     Returns:
         bool: Whether or not the code is running in a Docker container.
     """
-    path = "/proc/self/cgroup"
-    return (
-        os.path.exists("/.dockerenv")
-        or os.path.isfile(path)
-        and any("docker" in line for line in open(path))
-    )
+    if os.path.exists("/.dockerenv"):
+        return True
+    try:
+        with open("/proc/self/cgroup") as cgroup:
+            return any("docker" in line for line in cgroup)
+    except OSError:
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def yaml_loader() -> Any:
+    """Returns the fastest safe YAML loader available.
+
+    `yaml` is only imported the first time this is called, so that
+    programs which never parse YAML, or find it in a cache, do not
+    pay for importing it.
+
+    Returns:
+        Any: libyaml's `CSafeLoader` if it is installed, PyYAML's
+            `SafeLoader` otherwise.
+    """
+    import yaml
+
+    # libyaml's loader is much faster, but it is not always installed.
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 def config_not_found_routine(
@@ -80,29 +114,87 @@ def parse_config(conf_path: pathlib.Path) -> dict:
         should be `lists` of shell commands or stuff to
         expect before running those shell commands.
     """
-    with open(conf_path, "r") as stream:
-        conf = stream.read()
+    import yaml
 
-    parsed = yaml.safe_load(conf)
+    with open(conf_path, "rb") as stream:
+        parsed = yaml.load(stream, Loader=yaml_loader())
 
     return parsed
 
 
+def load_config(
+    conf_path: pathlib.Path,
+    cache: Union["ConfigCache", None] = None,
+    check: Union[Callable[[Any], None], None] = None,
+) -> dict:
+    """Parses and checks a config file, using a cache if given.
+
+    When the file did not change since it was cached, it is neither
+    parsed nor checked again.
+
+    Args:
+        conf_path (pathlib.Path): The path to the user's
+            configuration file.
+        cache (ConfigCache, optional): Where checked configurations
+            are cached.
+        check (Callable, optional): Checks the parsed configuration.
+            Defaults to `check_config_no_interaction()`.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+
+    Returns:
+        dict: The checked configuration.
+    """
+    check = check or check_config_no_interaction
+    if cache is None:
+        parsed = parse_config(conf_path)
+        check(parsed)
+        return parsed
+
+    cached = cache.get(conf_path)
+    if cached is not None:
+        return cached
+
+    stat = conf_path.stat()
+    parsed = parse_config(conf_path)
+    check(parsed)
+    cache.put(conf_path, stat, parsed)
+    return parsed
+
+
+def check_seed(seed: Any) -> None:
+    """Checks that a seed can be used to make typing reproducible.
+
+    Args:
+        seed (Any): The `seed` value from a configuration file.
+
+    Raises:
+        TypeError: If `seed` is not an integer.
+    """
+    # `bool` is a subclass of `int`, but `seed: yes` is most likely a mistake.
+    if isinstance(seed, bool) or not isinstance(seed, int):
+        raise TypeError(f"The seed must be an integer, not {type(seed)}.")
+
+
 def check_config(conf: dict) -> None:
     """Checks the parsed configuration file for wrong types and arguments.
 
     This helps reduce weird error messages later on. It is easier for the
     user to interpret curated error messages than Python's default ones.
     This is especially true for `Pexpect`'s error messages. Timeouts can
-    take a long time and the messages are often hard to read.
+    take a long time and the messages are often hard to read. Unusual
+    values are then confirmed by the user with `confirm_config()`.
 
     Args:
         conf (dict): The parsed configuration file. This should be returned
             by `parse_config()`
 
     Raises:
-        KeyError: If the configuration file has too many keys (more than 2).
-        KeyError: If a key is named differently than `commands` or `expect`.
+        KeyError: If a key is not one of `CONFIG_KEYS`.
+        TypeError: If the `seed` is not an integer, or if a typing
+            option has the wrong type.
+        ValueError: If a typing option is unknown or out of range.
     """
 
     if not isinstance(conf, dict):
@@ -110,15 +202,32 @@ def check_config(conf: dict) -> None:
             f"The configuration file must be seen as a dictionary. Currently seen as {type(conf)}"
         )
 
-    if len(conf.keys()) > 2:
-        raise KeyError(
-            f"Your configuration file must only have 2 keys, not {len(conf.keys())}"
-        )
     for key, value in conf.items():
-        if key not in ("commands", "expect"):
+        if key not in CONFIG_KEYS:
             raise KeyError(
-                "Every key in your configuration file must be either 'commands' or 'expect'."
+                f"Every key in your configuration file must be one of {', '.join(CONFIG_KEYS)}."
             )
+        if key == "seed":
+            check_seed(value)
+        if key == "typing":
+            check_typing(value)
+
+    confirm_config(conf)
+
+
+def confirm_config(conf: dict) -> None:
+    """Asks the user to confirm unusual values of a configuration file.
+
+    Items of `commands` or `expect` that are neither strings nor
+    dictionaries are probably mistakes. The user is asked whether to go
+    on for each of them. This is never cached: it runs every time.
+
+    Args:
+        conf (dict): The parsed and checked configuration file.
+    """
+    for key, value in conf.items():
+        if key in ("seed", "typing"):
+            continue
         # value is of type `list`
         for item in value:
 
@@ -146,13 +255,8 @@ def check_config(conf: dict) -> None:
 def check_parsed_config_no_interaction(conf_path: pathlib.Path) -> None:
     """
     check_parsed_config_no_interaction makes sure that a configuration file
-    is valid. The configuration file is parsed using ``parse_config()```.
-
-    Once the configuration file is unmarshalled, the result is checked for:
-
-    - type is dict.
-    - No more than two keys.
-    - Keys are `commands` or `expect`.
+    is valid. The configuration file is parsed using ``parse_config()```
+    and checked with ``check_config_no_interaction()``.
 
     Parameters
     ----------
@@ -160,22 +264,50 @@ def check_parsed_config_no_interaction(conf_path: pathlib.Path) -> None:
         The path towards the configuration file to check. Can be relative
         or absolute.
     """
-    conf = parse_config(conf_path)
+    check_config_no_interaction(parse_config(conf_path))
+
+
+def check_config_no_interaction(conf: dict) -> None:
+    """
+    check_config_no_interaction makes sure that a parsed configuration
+    file is valid without ever prompting the user.
+
+    The parsed configuration file is checked for:
+
+    - type is dict.
+    - Keys are one of `CONFIG_KEYS`.
+    - The `seed`, if any, is an integer.
+    - The `typing` options, if any, are valid.
+    - `commands` and `expect` have the same length.
 
+    See the `validation` module to get every problem at once.
+
+    Parameters
+    ----------
+    conf: dict
+        The parsed configuration file. This should be returned by
+        ``parse_config()``.
+    """
     if not isinstance(conf, dict):
         raise TypeError(
             f"The configuration file must be seen as a dictionary. Currently seen as {type(conf)}"
         )
 
-    if len(conf.keys()) > 2:
-        raise KeyError(
-            f"Your configuration file must only have 2 keys, not {len(conf.keys())}"
-        )
     for key, value in conf.items():
-        if key not in ("commands", "expect"):
+        if key not in CONFIG_KEYS:
             raise KeyError(
-                "Every key in your configuration file must be either 'commands' or 'expect'."
+                f"Every key in your configuration file must be one of {', '.join(CONFIG_KEYS)}."
             )
+        if key == "seed":
+            check_seed(value)
+        if key == "typing":
+            check_typing(value)
+
+    commands, expect = conf.get("commands", []), conf.get("expect", [])
+    if len(commands) != len(expect):
+        raise ValueError(
+            f"There are {len(commands)} commands but {len(expect)} items to expect."
+        )
 
 
 #######################################################################
@@ -1,96 +1,27 @@
 # -*- coding: utf-8 -*-
 """Functions to help with fake typing on the command line."""
 import pexpect
-import time
 import random
-from typing import List, Dict, Union
-
-LEFT_HAND: List[str] = [
-    "as",
-    "sa",
-    "er",
-    "re",
-    "sd",
-    "ds",
-    "ec",
-    "ce",
-    "ew",
-    "we",
-    "wa",
-    "aw",
-    "cr",
-    "sc",
-    "cs",
-]
-RIGHT_HAND: List[str] = [
-    "lk",
-    "lo",
-    "ol",
-    "op",
-    "po",
-    "io",
-    "oi",
-    "no",
-    "on",
-    "in",
-    "ni",
-]
-HAND_ALTERNATION: List[str] = [
-    "al",
-    "la",
-    "ak",
-    "ka",
-    "am",
-    "ma",
-    "an",
-    "na",
-    "ai",
-    "ia",
-    "so",
-    "os",
-    "sp",
-    "ps",
-    "en",
-    "ne",
-    "em",
-    "me",
-    "el",
-    "le",
-    "ep",
-    "pe",
-]
-
-PLAUSIBLE_TYPOS: Dict[str, List[str]] = {  # In keyboard order.
-    "q": ["w", "a"],
-    "w": ["q", "e", "s"],
-    "e": ["w", "r", "d"],
-    "r": ["e", "t", "f"],
-    "t": ["r", "y", "g"],
-    "y": ["t", "u", "h"],
-    "u": ["y", "i", "j"],
-    "i": ["u", "o", "k"],
-    "o": ["i", "p", "l"],
-    "p": ["o", "[", ";"],
-    "a": ["s", "q"],
-    "s": ["a", "w", "d"],
-    "d": ["s", "f", "e"],
-    "f": ["d", "d", "r"],
-    "g": ["f", "h", "t"],
-    "h": ["g", "j", "y"],
-    "j": ["h", "k", "i"],
-    "k": ["j", "l", "o"],
-    "l": ["k", "o", "p", ";"],
-    "z": ["a", "x", "s"],
-    "x": ["z", "c", "s"],
-    "c": ["x", "v", "d"],
-    "v": ["c", "b", "f"],
-    "b": ["v", "n", "g"],
-    "n": ["b", "m", "h"],
-    "m": ["n", "j", "k", ","],
-}
-
-
-def is_typo() -> bool:
+import time
+from typing import List, Optional, Union
+
+from runner import layouts
+from runner.clock import Clock, REAL_CLOCK
+from runner.metrics import Metrics, NULL_METRICS
+from runner.timeline import Timeline
+from runner.typing_profile import DEFAULT_PROFILE, TypingProfile
+
+# Bump this whenever a change to this module changes the keystrokes
+# planned for a given sentence and seed. Cached plans are keyed by it.
+TYPING_MODEL_VERSION: int = 2
+
+# The random number generator used when none is given.
+RANDOM: random.Random = random.Random()
+
+
+def is_typo(
+    rng: Optional[random.Random] = None, profile: Optional[TypingProfile] = None
+) -> bool:
     """
     Determines wether or not a combination of key presses should
     generate a typo. For now, we assume that every key press has
@@ -99,109 +30,361 @@ def is_typo() -> bool:
     According to some papers[0], there is between 0.62% and 3.2%
     chances that a keypress will be a typo. For our purposes, we
     will assume that this percentage is between 1 and 3 percent.
+    The profile's `typo_percent` can change this.
 
     [0]: Refer the documentation.
 
+    Args:
+        rng (random.Random, optional): The random number generator
+            to use. Defaults to `RANDOM`.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
+
     Returns:
         bool: Whether or not there will be a typo.
 
     """
-    error_percent = random.randint(1, 4)  # 3.2 rounded up
+    rng = rng or RANDOM
+    profile = profile or DEFAULT_PROFILE
+    error_percent = rng.randint(*profile.typo_percent)  # 3.2 rounded up
     # Randint includes the upper bound.
-    return random.randint(1, 100) <= error_percent
+    return rng.randint(1, 100) <= error_percent
 
 
-def is_pause() -> bool:
+def is_pause(
+    rng: Optional[random.Random] = None, profile: Optional[TypingProfile] = None
+) -> bool:
     """Checks if the computer should pause typing for a while.
 
     Similar to `is_typo()`, but is not based on any research.
     The chances of taking a small pause has been determined
     by testing different combinations of `is_pause()` and
-    `pause_time()`.
+    `pause_time()`. The profile's `pause_percent` can change this.
+
+    Args:
+        rng (random.Random, optional): The random number generator
+            to use. Defaults to `RANDOM`.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
 
     Returns:
         bool: Whether or not the program should stop typing.
     """
-    pause_percent: int = random.randint(20, 30)
-    return random.randint(1, 100) <= pause_percent
+    rng = rng or RANDOM
+    profile = profile or DEFAULT_PROFILE
+    pause_percent: int = rng.randint(*profile.pause_percent)
+    return rng.randint(1, 100) <= pause_percent
 
 
-def pause_time() -> float:
+def pause_time(
+    rng: Optional[random.Random] = None, profile: Optional[TypingProfile] = None
+) -> float:
     """Returns for how long the program should pause when typing.
 
     The short pause time is based on what felt more natural when
-    testing.
+    testing. It is divided by the profile's `speed`.
+
+    Args:
+        rng (random.Random, optional): The random number generator
+            to use. Defaults to `RANDOM`.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
 
     Returns:
         float: How long the pause shoud last **in seconds**.
     """
+    rng = rng or RANDOM
+    profile = profile or DEFAULT_PROFILE
     # Between .5 to 1 seconds
-    pause_ms: int = random.randint(500, 1000)
-    return pause_ms / 1000  # returned pause is in seconds.
+    pause_ms: int = rng.randint(500, 1000)
+    return pause_ms / 1000 / profile.speed  # returned pause is in seconds.
 
 
-def pick_typo(next_letter: str) -> Union[str, None]:
+def pick_typo(
+    next_letter: str,
+    rng: Optional[random.Random] = None,
+    profile: Optional[TypingProfile] = None,
+) -> Union[str, None]:
     """Picks a typo according to the next letter to type.
 
     This function uses `is_typo()` to determine wether or
     not there will be a typo.
 
-    Plausible typos are defined in the `PLAUSIBLE_TYPOS`
-    global variable. If `next_letter` is not a key in the
-    `PLAUSIBLE_TYPOS` dict, the typo is set to none.
+    Plausible typos are the keys next to `next_letter` on the
+    profile's layout, in the same shift state (see `layouts`). If
+    `next_letter` is not on the layout, the typo is set to none.
 
     Args:
         next_letter (str): The next letter that should be typed.
+        rng (random.Random, optional): The random number generator
+            to use. Defaults to `RANDOM`.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
 
     Returns:
         str/None: The typo or `None` if there is no typo.
     """
+    rng = rng or RANDOM
+    profile = profile or DEFAULT_PROFILE
 
     typo: Union[str, None] = None
 
-    if is_typo():
-
-        try:
-            plausible_for_letter = PLAUSIBLE_TYPOS[next_letter.lower()]
-            # Pick a random typo in the list associated with the
-            # key.
-            typo = random.choice(plausible_for_letter)
-
-        except KeyError:  # No typo defined for `next_letter`
-            typo = None
-
-    else:
-
-        typo = None
+    if is_typo(rng, profile):
+        plausible_for_letter = profile.layout.typos_for(next_letter)
+        if plausible_for_letter:
+            # Pick a random typo among the neighbours of the key.
+            typo = rng.choice(plausible_for_letter)
 
     return typo
 
 
-def get_delay(previous_letter: str, next_letter: str) -> float:
+def get_delay(
+    previous_letter: str,
+    next_letter: str,
+    rng: Optional[random.Random] = None,
+    profile: Optional[TypingProfile] = None,
+) -> float:
     """Function to get the delay before the next letter is typed.
 
     This function uses the fact that letters typed by two different
     hands will usually be typed 30 to 60ms faster than two letters
-    pressed by the same hand.
+    pressed by the same hand. Hands are looked up in the profile's
+    layout.
 
     There is also an average delay of betweem 120 and 170ms between
-    two keystrokes.
+    two keystrokes. Delays are scaled by the profile's `wpm` and
+    `speed`.
 
     Args:
         previous_letter (str): The previously typed letter.
         next_letter (str): The next letter to type.
+        rng (random.Random, optional): The random number generator
+            to use. Defaults to `RANDOM`.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
 
     Returns:
         float: The time **in seconds** before the next keystroke.
             This value is calculated using the previous and next
             letter.
     """
-    avg_delay = random.randint(120, 170) / 1000  # in seconds
-    if (previous_letter + next_letter).lower() in HAND_ALTERNATION:
+    rng = rng or RANDOM
+    profile = profile or DEFAULT_PROFILE
+    avg_delay = rng.randint(120, 170) / 1000  # in seconds
+    bigram_class = profile.layout.bigram_class(previous_letter, next_letter)
+    if bigram_class == layouts.ALTERNATION:
         # Two letters typed by different hands are 30-60ms faster.
-        faster_by = random.randint(30, 60) / 1000
+        faster_by = rng.randint(30, 60) / 1000
         avg_delay -= faster_by
-    return avg_delay
+    return avg_delay * profile.delay_scale
+
+
+def plan_letter(
+    timeline: Timeline,
+    clock: float,
+    previous: str,
+    next: str,
+    rng: Optional[random.Random] = None,
+    profile: Optional[TypingProfile] = None,
+) -> float:
+    """Plans the keystrokes needed to type the next letter.
+
+    This is where typos, delays and pauses are decided. Every random
+    number is drawn here, ahead of time, so that nothing but sleeping
+    and sending happens while the keystrokes are played.
+
+    If there is a typo, the wrong letter, a backspace and the right
+    letter are added to `timeline`. Otherwise, only the right letter
+    is added.
+
+    If the next character to type is a space, there are chances that
+    a pause will be added before it. Indeed, people are more likely to
+    hesitate between words than while typing a word.
+
+    Args:
+        timeline (Timeline): The timeline to which the keystrokes
+            are added.
+        clock (float): The offset **in seconds** of the last keystroke
+            in `timeline`.
+        previous (str): The last letter that has been planned.
+        next (str): The next letter to plan.
+        rng (random.Random, optional): The random number generator
+            to use. Defaults to `RANDOM`.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
+
+    Returns:
+        float: The offset **in seconds** of the last planned keystroke.
+    """
+    rng = rng or RANDOM
+    typo: Union[str, None] = pick_typo(next, rng, profile)
+
+    if next == " ":
+        # If the next char to type is a space, compute chances of taking
+        # a pause.
+        if is_pause(rng, profile):
+            clock += pause_time(rng, profile)
+    else:
+        clock += get_delay(previous, next, rng, profile)
+    if typo:
+        timeline.append(clock, typo.encode())
+        clock += get_delay(typo, "\b", rng, profile)
+        timeline.append(clock, b"\b")
+        clock += get_delay(typo, next, rng, profile)
+    timeline.append(clock, next.encode())
+
+    return clock
+
+
+def plan_sentence(
+    sentence: str,
+    rng: Optional[random.Random] = None,
+    profile: Optional[TypingProfile] = None,
+) -> Timeline:
+    """Plans how a full sentence will be typed.
+
+    This function ends the sentence with a newline if it does not
+    already have one.
+
+    Given the same `rng` state and profile, the same timeline is always
+    returned. With a `fast` profile, every keystroke is planned at once,
+    without typos, and nothing is drawn from `rng`.
+
+    Args:
+        sentence (str): What will be typed.
+        rng (random.Random, optional): The random number generator
+            to use. Defaults to `RANDOM`.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
+
+    Raises:
+        TypeError: Raises a `TypeError` if the `sentence` argument
+        is not of type `str`. This makes sure that once loaded, the
+        yaml configuration file did not contain other types.
+
+    Returns:
+        Timeline: Every keystroke required to type `sentence`, typos
+            included.
+    """
+    if not isinstance(sentence, str):
+        raise TypeError(f"Cannot type a {type(sentence)}.")
+
+    letters: List[str] = list(sentence)
+
+    if not letters or letters[-1] != "\n":
+        letters.append("\n")
+
+    timeline = Timeline()
+    if profile is not None and profile.fast:
+        for letter in letters:
+            timeline.append(0.0, letter.encode())
+        return timeline
+
+    clock: float = 0.0
+    for index, letter in enumerate(letters):
+        # Setting `letter` as previous letter when there is none.
+        previous = letters[index - 1] if index > 0 else letter
+        clock = plan_letter(timeline, clock, previous, letter, rng, profile)
+
+    return timeline
+
+
+def play_timeline(
+    child: pexpect.pty_spawn.spawn,
+    timeline: Timeline,
+    clock: Optional[Clock] = None,
+    metrics: Optional[Metrics] = None,
+) -> None:
+    """Sends the keystrokes of a timeline to the child process.
+
+    Keystrokes are sent when their offset is reached. No decision is
+    taken here: everything has already been planned. Keystrokes that
+    share an offset are sent with a single write.
+
+    Offsets are turned into deadlines from the time this function is
+    called, and waited for with `Clock.sleep_until()`. Time spent
+    sending a keystroke is taken from the wait before the next one,
+    so the typing takes as long as planned.
+
+    With metrics, how late each write was compared to its deadline is
+    recorded as `keystroke_error`, the time taken by each write as
+    `keystroke_send`, and how late the typing ended compared to the
+    plan as `typing_lag`.
+
+    Args:
+        child (pexpect.pty_spawn.spawn): The child process to which
+            the keystrokes will be sent.
+        timeline (Timeline): The planned keystrokes.
+        clock (Clock, optional): Used to wait between keystrokes.
+            Defaults to real time. With a `VirtualClock`, nothing
+            is waited for.
+        metrics (Metrics, optional): Where timings are recorded.
+    """
+    clock = clock or REAL_CLOCK
+    metrics = metrics or NULL_METRICS
+    timed = metrics.enabled
+    encoding: Union[str, None] = getattr(child, "encoding", None)
+    if getattr(child, "accepts_bytes", False):
+        # Sent as planned, without decoding them.
+        encoding = None
+    start = clock.now()
+    deadline = start
+
+    for offset, data in timeline.bursts():
+        deadline = start + offset
+        clock.sleep_until(deadline)
+        if timed:
+            sent = time.perf_counter()
+            metrics.observe("keystroke_error", clock.now() - deadline)
+        child.send(data.decode(encoding) if encoding else data)
+        if timed:
+            metrics.observe("keystroke_send", time.perf_counter() - sent)
+
+    if timed:
+        metrics.observe("typing_lag", clock.now() - deadline)
+
+
+async def play_timeline_async(
+    child: pexpect.pty_spawn.spawn,
+    timeline: Timeline,
+    clock: Optional[Clock] = None,
+    metrics: Optional[Metrics] = None,
+) -> None:
+    """Same as `play_timeline()`, but waits with `asyncio.sleep()`.
+
+    Other coroutines, like other typists, can then run while this one
+    waits for its next keystroke.
+
+    Args:
+        child (pexpect.pty_spawn.spawn): The child process to which
+            the keystrokes will be sent.
+        timeline (Timeline): The planned keystrokes.
+        clock (Clock, optional): Used to wait between keystrokes.
+            Defaults to real time.
+        metrics (Metrics, optional): Where timings are recorded.
+    """
+    clock = clock or REAL_CLOCK
+    metrics = metrics or NULL_METRICS
+    timed = metrics.enabled
+    encoding: Union[str, None] = getattr(child, "encoding", None)
+    if getattr(child, "accepts_bytes", False):
+        # Sent as planned, without decoding them.
+        encoding = None
+    start = clock.now()
+    deadline = start
+
+    for offset, data in timeline.bursts():
+        deadline = start + offset
+        await clock.sleep_until_async(deadline)
+        if timed:
+            sent = time.perf_counter()
+            metrics.observe("keystroke_error", clock.now() - deadline)
+        child.send(data.decode(encoding) if encoding else data)
+        if timed:
+            metrics.observe("keystroke_send", time.perf_counter() - sent)
+
+    if timed:
+        metrics.observe("typing_lag", clock.now() - deadline)
 
 
 def type_typo(child: pexpect.pty_spawn.spawn, next_letter: str, typo: str) -> None:
@@ -220,52 +403,50 @@ def type_typo(child: pexpect.pty_spawn.spawn, next_letter: str, typo: str) -> No
         typo (str): The letter that will be typed instead of `next_letter`
             the first time.
     """
-    child.send(typo)
-    time.sleep(get_delay(typo, "backspace"))
-    child.send("\b")
-    time.sleep(get_delay(typo, next_letter))
-    child.send(next_letter)
-
-
-def type_letters(child: pexpect.pty_spawn.spawn, previous: str, next: str) -> None:
+    timeline = Timeline()
+    clock: float = 0.0
+    timeline.append(clock, typo.encode())
+    clock += get_delay(typo, "\b")
+    timeline.append(clock, b"\b")
+    clock += get_delay(typo, next_letter)
+    timeline.append(clock, next_letter.encode())
+    play_timeline(child, timeline)
+
+
+def type_letters(
+    child: pexpect.pty_spawn.spawn,
+    previous: str,
+    next: str,
+    profile: Optional[TypingProfile] = None,
+) -> None:
     """Sends the next letter to the process.
 
-    This function also calculates the delay using the previous letter
-    and the chances of typing a typo.
-
-    If there is a typo, `type_typo()` is called and sends the wrong letter
-    to the process before correcting it.
-
-    If the next character to type is a space, there are chances that the
-    program will take a pause. Indeed, people are more likely to hesitate
-    between words than while typing a word.
+    The keystrokes are planned using `plan_letter()` and then sent
+    with `play_timeline()`.
 
     Args:
         child (pexpect.pty_spawn.spawn): The child process to which the next
             letter will be sent.
         previous (str): The last letter that has been sent to the process.
         next (str): The next letter to send to the process.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
     """
-    typo: Union[str, None] = pick_typo(next)
-
-    if next == " ":
-        # If the next char to type is a space, compute chances of taking
-        # a pause.
-        if is_pause():
-            time.sleep(pause_time())
-    else:
-        delay: float = get_delay(previous, next)
-        time.sleep(delay)
-    if typo:
-        type_typo(child, next, typo)
-    else:
-        child.send(next)
+    timeline = Timeline()
+    plan_letter(timeline, 0.0, previous, next, profile=profile)
+    play_timeline(child, timeline)
 
 
-def type_sentence(child: pexpect.pty_spawn.spawn, sentence: str) -> None:
+def type_sentence(
+    child: pexpect.pty_spawn.spawn,
+    sentence: str,
+    profile: Optional[TypingProfile] = None,
+) -> None:
     """Types a full sentence to the child program.
 
-    It uses delays and typos to make typing human like.
+    It uses delays and typos to make typing human like. The sentence
+    is planned with `plan_sentence()` and then played with
+    `play_timeline()`.
 
     This function ends by sending a newline to the child process.
 
@@ -273,24 +454,12 @@ def type_sentence(child: pexpect.pty_spawn.spawn, sentence: str) -> None:
         child (pexpect.pty_spawn.spawn): The child process to which
             the sentence will be sent.
         sentence (str): What will be typed and sent to the process.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
 
     Raises:
         TypeError: Raises a `TypeError` if the `sentence` argument
         is not of type `str`. This makes sure that once loaded, the
         yaml configuration file did not contain other types.
     """
-    if not isinstance(sentence, str):
-        raise TypeError(f"Cannot type a {type(sentence)}.")
-
-    letters: List[str] = list(sentence)
-
-    if not letters[-1] == "\n":
-        letters.append("\n")
-
-    for index, letter in enumerate(letters):
-        if index > 0:
-            type_letters(child, letters[index - 1], letter)
-        else:
-            # Setting `letter` as previous letter when there
-            # is none.
-            type_letters(child, letter, letter)
+    play_timeline(child, plan_sentence(sentence, profile=profile))
@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""Keyboard layouts, and what they tell about typing.
+
+A `Layout` places the keys of a keyboard on a grid of four rows: the
+number row, then the top, home and bottom rows. Each key has the
+character it types with and without shift. The first time a layout is
+used, it precomputes dense tables indexed by character code:
+
+- `hands`: which hand presses each key.
+- `distances`: how far apart two keys are, in key widths.
+- `bigram_classes`: the delay class of every pair of keys.
+  `ALTERNATION` when they are pressed by different hands.
+- `typos`: the keys near each key, in the same shift state. These
+  are its plausible typos.
+
+Every keystroke then only needs a single lookup in these tables.
+Characters that are not on the layout, or whose code is at least
+`TABLE_SIZE`, have no hand, no delay class and no typo.
+
+Layouts are chosen with the `layout` typing option: the name of a
+registered layout, or a mapping describing a new one (see
+`from_options()`).
+
+## Example
+
+```python
+from runner import layouts
+layouts.QWERTY.typos_for("g")  # "tyfhvb"
+layouts.DVORAK.bigram_class("a", "h") == layouts.ALTERNATION  # True
+```
+"""
+import array
+import math
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Characters with a code below this are in the tables. This covers
+# ASCII, and the accented letters of layouts like AZERTY.
+TABLE_SIZE: int = 256
+
+# Delay classes of bigrams.
+SAME_HAND: int = 0
+ALTERNATION: int = 1
+
+# Hands, as stored in `Tables.hands`.
+NO_HAND: int = 0
+LEFT_HAND: int = 1
+RIGHT_HAND: int = 2
+
+# Keys closer than this many key widths are plausible typos of each
+# other. Includes the diagonal neighbours on staggered rows.
+NEIGHBOUR_DISTANCE: float = 1.25
+
+# How far each row is shifted to the right, in key widths, on ANSI and
+# ISO keyboards. ISO keyboards have an extra key left of the bottom row.
+ANSI_OFFSETS: Tuple[float, ...] = (0.0, 1.5, 1.75, 2.25)
+ISO_OFFSETS: Tuple[float, ...] = (0.0, 1.5, 1.75, 1.25)
+
+# Index of the first key pressed by the right hand, in each row.
+ANSI_RIGHT_HAND: Tuple[int, ...] = (6, 5, 5, 5)
+ISO_RIGHT_HAND: Tuple[int, ...] = (6, 5, 5, 6)
+
+# Keys that do not type a printable character: their character, row,
+# column (relative to the end of the row when negative) and hand.
+SPECIAL_KEYS: Tuple[Tuple[str, int, float, int], ...] = (
+    ("\b", 0, -0.5, RIGHT_HAND),  # Backspace, right of the number row.
+    ("\t", 1, -1.0, LEFT_HAND),  # Tab, left of the top row.
+    ("\n", 2, -0.75, RIGHT_HAND),  # Enter, right of the home row.
+    ("\r", 2, -0.75, RIGHT_HAND),
+)
+ROWS: int = 4
+
+
+def code(letter: str) -> int:
+    """Returns the index of a character in the tables.
+
+    Args:
+        letter (str): A single character.
+
+    Returns:
+        int: The code point of `letter`, or 0 (NUL, which is on no
+            layout) if it is not a single character below `TABLE_SIZE`.
+    """
+    if len(letter) == 1:
+        point = ord(letter)
+        if point < TABLE_SIZE:
+            return point
+    return 0
+
+
+class Tables(NamedTuple):
+    """Precomputed tables of a layout, indexed by character code.
+
+    Two-dimensional tables are flat: the entry of a pair of characters
+    is at ``code(first) * TABLE_SIZE + code(second)``.
+    """
+
+    hands: bytes
+    distances: "array.array[float]"
+    bigram_classes: bytes
+    typos: Tuple[str, ...]
+
+
+class Layout:
+    """A keyboard layout.
+
+    Args:
+        name (str): How the layout is referred to in scripts.
+        rows (Sequence[str]): The characters of the four rows, left to
+            right, without shift.
+        shifted (Sequence[str]): The same rows, with shift. Each row has
+            as many characters as in `rows`. A key that types the same
+            character with shift repeats it.
+        offsets (Sequence[float], optional): How far each row is
+            shifted to the right, in key widths. Defaults to
+            `ANSI_OFFSETS`.
+        right_hand (Sequence[int], optional): Index of the first key
+            pressed by the right hand, in each row. Defaults to
+            `ANSI_RIGHT_HAND`.
+
+    Raises:
+        ValueError: If there are not four of each, or if a shifted row
+            does not have as many characters as its unshifted row.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rows: Sequence[str],
+        shifted: Sequence[str],
+        offsets: Sequence[float] = ANSI_OFFSETS,
+        right_hand: Sequence[int] = ANSI_RIGHT_HAND,
+    ):
+        for argument, value in (
+            ("rows", rows),
+            ("shifted", shifted),
+            ("offsets", offsets),
+            ("right_hand", right_hand),
+        ):
+            if len(value) != ROWS:
+                raise ValueError(f"A layout needs {ROWS} {argument}, not {len(value)}.")
+        for index, (row, shifted_row) in enumerate(zip(rows, shifted)):
+            if len(row) != len(shifted_row):
+                raise ValueError(
+                    f"Row {index + 1} of the `{name}` layout has {len(row)} keys "
+                    f"without shift and {len(shifted_row)} with shift."
+                )
+        self.name = name
+        self.rows = tuple(rows)
+        self.shifted = tuple(shifted)
+        self.offsets = tuple(float(offset) for offset in offsets)
+        self.right_hand = tuple(right_hand)
+        self._tables: Optional[Tables] = None
+
+    @property
+    def tables(self) -> Tables:
+        """Tables: The precomputed tables, built on first use."""
+        if self._tables is None:
+            self._tables = self._build_tables()
+        return self._tables
+
+    def _positions(self) -> Dict[str, Tuple[float, float, int, bool]]:
+        """Places every key on the grid.
+
+        Returns:
+            dict: The column, row, hand and shift state of every
+                character of the layout. The first key typing a
+                character wins.
+        """
+        positions: Dict[str, Tuple[float, float, int, bool]] = {}
+        for layer, is_shifted in ((self.rows, False), (self.shifted, True)):
+            for row_index, row in enumerate(layer):
+                for column, letter in enumerate(row):
+                    if letter in positions:
+                        continue
+                    hand = (
+                        RIGHT_HAND
+                        if column >= self.right_hand[row_index]
+                        else LEFT_HAND
+                    )
+                    x = self.offsets[row_index] + column
+                    positions[letter] = (x, float(row_index), hand, is_shifted)
+
+        for letter, row_index, x, hand in SPECIAL_KEYS:
+            if x < 0:
+                x += self.offsets[row_index] + len(self.rows[row_index]) + 1
+            positions.setdefault(letter, (x, float(row_index), hand, False))
+        return positions
+
+    def _build_tables(self) -> Tables:
+        """Precomputes the lookup tables of the layout."""
+        positions = {
+            letter: position
+            for letter, position in self._positions().items()
+            if code(letter) == ord(letter)
+        }
+
+        hands = bytearray(TABLE_SIZE)
+        for letter, (_, _, hand, _) in positions.items():
+            hands[ord(letter)] = hand
+
+        distances = array.array("d", [math.inf]) * (TABLE_SIZE * TABLE_SIZE)
+        bigram_classes = bytearray(TABLE_SIZE * TABLE_SIZE)
+        typos: List[str] = [""] * TABLE_SIZE
+        printable = {
+            letter for letter in positions if letter.isprintable() and letter != " "
+        }
+        for first, (x1, y1, hand1, shifted1) in positions.items():
+            row = ord(first) * TABLE_SIZE
+            neighbours = []
+            for second, (x2, y2, hand2, shifted2) in positions.items():
+                distance = math.hypot(x1 - x2, y1 - y2)
+                distances[row + ord(second)] = distance
+                if hand1 != hand2:
+                    bigram_classes[row + ord(second)] = ALTERNATION
+                if (
+                    first in printable
+                    and second in printable
+                    and first != second
+                    and shifted1 == shifted2
+                    and distance <= NEIGHBOUR_DISTANCE
+                ):
+                    neighbours.append(second)
+            typos[ord(first)] = "".join(neighbours)
+
+        return Tables(bytes(hands), distances, bytes(bigram_classes), tuple(typos))
+
+    def hand(self, letter: str) -> int:
+        """Returns the hand pressing a key: `LEFT_HAND`, `RIGHT_HAND` or
+        `NO_HAND`."""
+        return self.tables.hands[code(letter)]
+
+    def distance(self, first: str, second: str) -> float:
+        """Returns how far apart two keys are, in key widths.
+
+        Returns:
+            float: The distance, or `math.inf` if a key is not on the
+                layout.
+        """
+        return self.tables.distances[code(first) * TABLE_SIZE + code(second)]
+
+    def bigram_class(self, previous: str, next: str) -> int:
+        """Returns the delay class of typing `next` after `previous`.
+
+        Returns:
+            int: `ALTERNATION` if the keys are pressed by different
+                hands, `SAME_HAND` otherwise.
+        """
+        return self.tables.bigram_classes[code(previous) * TABLE_SIZE + code(next)]
+
+    def typos_for(self, letter: str) -> str:
+        """Returns the plausible typos of a key, in layout order.
+
+        Returns:
+            str: The neighbouring keys, in the same shift state. Empty if
+                `letter` is not on the layout.
+        """
+        return self.tables.typos[code(letter)]
+
+    def _key(self) -> Tuple[Any, ...]:
+        return (self.name, self.rows, self.shifted, self.offsets, self.right_hand)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Layout):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        # Used in schedule cache keys, so it describes every key.
+        return (
+            f"Layout({self.name!r}, {self.rows!r}, {self.shifted!r}, "
+            f"{self.offsets!r}, {self.right_hand!r})"
+        )
+
+
+QWERTY: Layout = Layout(
+    "qwerty",
+    ["`1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./"],
+    ["~!@#$%^&*()_+", "QWERTYUIOP{}|", 'ASDFGHJKL:"', "ZXCVBNM<>?"],
+)
+
+AZERTY: Layout = Layout(
+    "azerty",
+    ["²&é\"'(-è_çà)=", "azertyuiop^$", "qsdfghjklmù*", "<wxcvbn,;:!"],
+    ["²1234567890°+", "AZERTYUIOP¨£", "QSDFGHJKLM%µ", ">WXCVBN?./§"],
+    ISO_OFFSETS,
+    ISO_RIGHT_HAND,
+)
+
+DVORAK: Layout = Layout(
+    "dvorak",
+    ["`1234567890[]", "',.pyfgcrl/=\\", "aoeuidhtns-", ";qjkxbmwvz"],
+    ["~!@#$%^&*(){}", '"<>PYFGCRL?+|', "AOEUIDHTNS_", ":QJKXBMWVZ"],
+)
+
+# Layouts that can be chosen by name.
+LAYOUTS: Dict[str, Layout] = {
+    layout.name: layout for layout in (QWERTY, AZERTY, DVORAK)
+}
+
+# Options of a mapping describing a new layout, with their expected types.
+LAYOUT_OPTIONS: Dict[str, type] = {
+    "name": str,
+    "rows": list,
+    "shifted": list,
+    "offsets": list,
+    "right_hand": list,
+}
+
+
+def register(layout: Layout) -> None:
+    """Makes a layout available by name.
+
+    Args:
+        layout (Layout): The layout. Replaces any layout with the same
+            name.
+    """
+    LAYOUTS[layout.name] = layout
+
+
+def from_options(options: Any) -> Layout:
+    """Finds or creates the layout described by a `layout` option.
+
+    The option is either the name of a registered layout, or a mapping
+    with a `name`, four `rows` and four `shifted` rows. `offsets` and
+    `right_hand` can also be given, as described in `Layout`.
+
+    Args:
+        options (Any): The value of a `layout` typing option.
+
+    Raises:
+        TypeError: If `options` or one of its values has the wrong type.
+        ValueError: If the layout is unknown, or does not make sense.
+
+    Returns:
+        Layout: The layout.
+    """
+    if isinstance(options, str):
+        try:
+            return LAYOUTS[options]
+        except KeyError:
+            raise ValueError(
+                f"Unknown layout `{options}`. Use one of {', '.join(LAYOUTS)}, "
+                "or describe it with a mapping."
+            ) from None
+    if not isinstance(options, dict):
+        raise TypeError(f"A layout must be a name or a mapping, not {type(options)}.")
+
+    for option, value in options.items():
+        expected = LAYOUT_OPTIONS.get(option)
+        if expected is None:
+            raise ValueError(
+                f"Unknown layout option `{option}`. "
+                f"Use one of {', '.join(LAYOUT_OPTIONS)}."
+            )
+        if not isinstance(value, expected):
+            raise TypeError(f"The layout option `{option}` cannot be a {type(value)}.")
+    for option in ("name", "rows", "shifted"):
+        if option not in options:
+            raise ValueError(f"A layout needs a `{option}`.")
+    for option, types in (
+        ("rows", (str,)),
+        ("shifted", (str,)),
+        ("offsets", (int, float)),
+        ("right_hand", (int,)),
+    ):
+        # Exact types, as `bool` is a subclass of `int`.
+        if not all(type(item) in types for item in options.get(option, ())):
+            names = " or ".join(kind.__name__ for kind in types)
+            raise TypeError(f"The layout option `{option}` must only hold {names}.")
+
+    return Layout(**options)
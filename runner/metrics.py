@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Timing metrics for runs.
+
+`Metrics` collects how long the different parts of a run take, like
+spawning the shell, typing each command or waiting for each prompt.
+Durations are aggregated in histograms, which can be written as JSON or
+as a Prometheus textfile.
+
+Collecting metrics is off by default. `NULL_METRICS` is used instead:
+it ignores everything, and code that runs for every keystroke checks
+`enabled` to skip timing altogether.
+
+## Example
+
+```python
+from runner.metrics import Metrics
+metrics = Metrics()
+Commands(commands, expect, metrics=metrics).run()
+pathlib.Path("run.prom").write_text(metrics.to_prometheus())
+```
+"""
+import bisect
+import contextlib
+import json
+import math
+import time
+from typing import Dict, Iterator, List, Tuple
+
+# Upper bounds of the histogram buckets, **in seconds**. They go from
+# sending a single keystroke to waiting for a slow command.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Prefix of every metric name, as Prometheus expects one per program.
+PREFIX: str = "runner_"
+
+
+class Histogram:
+    """Counts durations in buckets.
+
+    Args:
+        buckets (Tuple[float, ...]): Upper bounds of the buckets, sorted.
+            A last bucket holds everything larger.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        """Adds a duration.
+
+        Args:
+            value (float): The duration **in seconds**.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        """Yields each bucket's upper bound, with how many values it holds.
+
+        As in Prometheus, every bucket also holds the smaller ones. The
+        last bound is infinity.
+        """
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics:
+    """Collects timings and counts for a run.
+
+    Names are given without `PREFIX` or unit. Durations are always
+    **in seconds**.
+    """
+
+    enabled: bool = True
+
+    def __init__(self) -> None:
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Adds a duration to a histogram.
+
+        Args:
+            name (str): The histogram, like ``"expect"``.
+            seconds (float): The duration.
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Adds to a counter.
+
+        Args:
+            name (str): The counter, like ``"timeouts"``.
+            amount (int): How much to add.
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Times a block of code, even if it raises.
+
+        Args:
+            name (str): The histogram the duration is added to.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def to_json(self) -> str:
+        """Returns every metric as a JSON document.
+
+        Returns:
+            str: Histograms with their count, sum and cumulative buckets,
+                and counters.
+        """
+        histograms = {
+            name: {
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "buckets": [
+                    ["+Inf" if math.isinf(bound) else bound, count]
+                    for bound, count in histogram.cumulative()
+                ],
+            }
+            for name, histogram in sorted(self.histograms.items())
+        }
+        counters = dict(sorted(self.counters.items()))
+        return json.dumps({"histograms": histograms, "counters": counters}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Returns every metric in the Prometheus text format.
+
+        The result can be written where node_exporter's textfile
+        collector looks for metrics.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):
+            full = f"{PREFIX}{name}_seconds"
+            lines.append(f"# TYPE {full} histogram")
+            for bound, count in histogram.cumulative():
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append(f'{full}_bucket{{le="{le}"}} {count}')
+            lines.append(f"{full}_sum {histogram.sum!r}")
+            lines.append(f"{full}_count {histogram.count}")
+        for name, value in sorted(self.counters.items()):
+            full = f"{PREFIX}{name}_total"
+            lines.append(f"# TYPE {full} counter")
+            lines.append(f"{full} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class NullMetrics(Metrics):
+    """Metrics that are not collected. Every method does nothing."""
+
+    enabled = False
+
+    def observe(self, name: str, seconds: float) -> None:
+        pass
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        pass
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        yield
+
+
+# The metrics used when none are given.
+NULL_METRICS: Metrics = NullMetrics()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Finding where a run spends its time and memory.
+
+`Profiler` runs `cProfile` and, optionally, `tracemalloc` while it is
+started. When stopped, it writes a `pstats` file that can be opened
+with ``python -m pstats`` or tools like ``snakeviz``, and a report of
+the lines that allocated the most memory.
+
+Both files are named after a base path, usually the output of the run:
+``demo.cast`` is profiled to ``demo.pstats`` and
+``demo.allocations.txt``.
+
+Only the thread that started the profiler is profiled. Shells started
+in the background by a `ShellPool` are not.
+
+## Example
+
+```python
+from runner.profiling import Profiler
+with Profiler(pathlib.Path("demo.log"), memory=True):
+    Commands(commands, expect).run()
+```
+"""
+import cProfile
+import pathlib
+import tracemalloc
+from typing import Any
+
+# How many lines are listed in the allocation report.
+TOP_ALLOCATIONS: int = 25
+
+# How many frames `tracemalloc` keeps for each allocation.
+TRACEBACK_FRAMES: int = 1
+
+
+class Profiler:
+    """Profiles the code that runs while it is started.
+
+    Args:
+        path (pathlib.Path): The base path of the reports. Its suffix
+            is replaced.
+        memory (bool): Whether or not allocations are traced too. This
+            makes the run a lot slower.
+        top (int): How many lines are listed in the allocation report.
+    """
+
+    def __init__(
+        self, path: pathlib.Path, memory: bool = False, top: int = TOP_ALLOCATIONS
+    ):
+        self.stats_path = path.with_suffix(".pstats")
+        self.allocations_path = path.with_suffix(".allocations.txt")
+        self.memory = memory
+        self.top = top
+        self.profile = cProfile.Profile()
+        # Whether `tracemalloc` was started here, and must be stopped here.
+        self.tracing = False
+
+    def start(self) -> None:
+        """Starts profiling the current thread."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+            self.tracing = True
+        self.profile.enable()
+
+    def stop(self) -> None:
+        """Stops profiling and writes the reports."""
+        self.profile.disable()
+        report = None
+        if self.memory:
+            # Taken first, so that writing the stats is not reported.
+            try:
+                report = self.allocation_report()
+            finally:
+                if self.tracing:
+                    tracemalloc.stop()
+                    self.tracing = False
+
+        self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+        self.profile.dump_stats(str(self.stats_path))
+        if report is not None:
+            self.allocations_path.write_text(report)
+
+    def allocation_report(self) -> str:
+        """Lists the lines that allocated the most memory still in use.
+
+        Returns:
+            str: The peak memory use, followed by one line per allocation
+                site, largest first.
+        """
+        if not tracemalloc.is_tracing():
+            return "Memory was not traced.\n"
+
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, cProfile.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            )
+        )
+        statistics = snapshot.statistics("lineno")
+
+        lines = [
+            f"Peak traced memory: {peak / 1024:.1f} KiB",
+            f"Top {min(self.top, len(statistics))} allocation sites:",
+        ]
+        lines.extend(str(statistic) for statistic in statistics[: self.top])
+        return "\n".join(lines) + "\n"
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
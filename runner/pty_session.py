@@ -0,0 +1,549 @@
+# -*- coding: utf-8 -*-
+"""A lightweight session backend, working on the pseudo-terminal directly.
+
+`PtySession` starts a program with `pty.fork()` and talks to it with
+`os.read()`, `os.write()` and `selectors`. It has the subset of
+`pexpect.spawn` that `Commands` uses (see `classmodule.Session`), with
+less work per call:
+
+- Keystrokes planned as bytes are written as they are, through a
+  `memoryview`, without being decoded and encoded again.
+- Output is kept as bytes in a bounded `bytearray`. When it grows over
+  twice its capacity, the oldest output is dropped, so each byte is
+  only moved a constant number of times.
+- Patterns are compiled once, as bytes, and searched in place. Plain
+  strings are only searched in new output.
+- Closing does not wait a fixed delay for the program to exit.
+
+`pexpect.TIMEOUT` and `pexpect.EOF` are still raised, so code written
+for `pexpect` works with both backends. How output is kept and searched
+is in `BufferedSession`, which `replay.ReplaySession` also uses.
+
+Output is kept as it was read. It is decoded only for the logfile, for
+`before` and `after`, and when it is read with `read_nonblocking()`.
+Matches are searched in UTF-8 encoded output, so the `window` of
+`expect_bounded()` and the `capacity` are counted in bytes.
+
+## Example
+
+```python
+from runner.pty_session import PtySession
+child = PtySession("bash", ["--norc"])
+child.send(b"echo hello\\n")
+child.expect("hello")
+child.close()
+```
+"""
+import asyncio
+import codecs
+import errno
+import fcntl
+import functools
+import os
+import pty
+import re
+import selectors
+import signal
+import struct
+import termios
+import time
+from typing import IO, Any, Dict, Optional, Pattern, Sequence, Tuple, Union
+
+import pexpect
+
+from runner.classmodule import Session
+
+# Most bytes read at once, by default.
+MAXREAD: int = 2000
+
+# Most bytes of output kept to be searched, by default. Matches must be
+# within the last `CAPACITY` bytes printed since the previous match.
+CAPACITY: int = 1024 * 1024
+
+# How long the program gets to exit once its terminal is closed, **in
+# seconds**, before it is killed.
+CLOSE_GRACE: float = 0.5
+
+
+@functools.lru_cache(maxsize=256)
+def compile_pattern(pattern: str, encoding: str = "utf-8") -> Pattern[bytes]:
+    """Compiles a regular expression to search in encoded output.
+
+    Like `pexpect`, `.` also matches newlines.
+
+    Args:
+        pattern (str): The regular expression.
+        encoding (str): The encoding of the output.
+
+    Returns:
+        Pattern[bytes]: The compiled pattern. Compiled patterns are kept.
+    """
+    return re.compile(pattern.encode(encoding), re.DOTALL)
+
+
+class Searcher:
+    """Finds a pattern in a session's output.
+
+    Args:
+        pattern (Any): A regular expression, a string if `exact`, or
+            `pexpect.EOF` to wait until the program exits.
+        exact (bool): Whether `pattern` is a plain string.
+        encoding (str): The encoding of the output.
+    """
+
+    def __init__(self, pattern: Any, exact: bool, encoding: str):
+        self.eof = pattern is pexpect.EOF
+        self.needle: Optional[bytes] = None
+        self.regex: Optional[Pattern[bytes]] = None
+        if self.eof:
+            pass
+        elif exact:
+            self.needle = pattern.encode(encoding)
+        else:
+            self.regex = compile_pattern(pattern, encoding)
+        # How much of the output was searched for `needle` already.
+        self.searched = 0
+
+    def search(self, data: bytearray, start: int) -> Optional[Tuple[int, int, Any]]:
+        """Searches the output, from `start`.
+
+        Returns:
+            tuple: The start and end of the match, and the match object
+                of regular expressions. `None` if nothing matched.
+        """
+        if self.needle is not None:
+            # Plain strings are only searched for in new output.
+            start = max(start, self.searched - len(self.needle) + 1)
+            self.searched = len(data)
+            begin = data.find(self.needle, start)
+            if begin < 0:
+                return None
+            return begin, begin + len(self.needle), None
+        if self.regex is not None:
+            match = self.regex.search(data, start)
+            if match is not None:
+                return match.start(), match.end(), match
+        return None
+
+
+def _execute(
+    argv: Sequence[str],
+    env: Optional[Dict[str, str]],
+    echo: bool,
+    dimensions: Tuple[int, int],
+    errors: int,
+) -> None:  # pragma: no cover - runs in the forked child.
+    """Sets the terminal up and runs the program, in the forked child.
+
+    If the program cannot be run, the error is written to `errors`.
+    Otherwise, `errors` is closed when the program starts.
+    """
+    try:
+        if not echo:
+            attributes = termios.tcgetattr(pty.STDIN_FILENO)
+            attributes[3] &= ~termios.ECHO
+            termios.tcsetattr(pty.STDIN_FILENO, termios.TCSANOW, attributes)
+        rows, columns = dimensions
+        size = struct.pack("HHHH", rows, columns, 0, 0)
+        fcntl.ioctl(pty.STDOUT_FILENO, termios.TIOCSWINSZ, size)
+        if env is None:
+            os.execvp(argv[0], list(argv))
+        else:
+            os.execvpe(argv[0], list(argv), env)
+    except OSError as error:
+        os.write(errors, f"{error.errno}:{error.strerror}".encode())
+    finally:
+        os._exit(127)
+
+
+class BufferedSession(Session):
+    """Searches output kept as bytes, for sessions of this module.
+
+    Subclasses read the output with `read_nonblocking()`, and write what
+    is sent with `send()`.
+
+    Args:
+        timeout (float, optional): Default timeout of `expect()`, **in
+            seconds**.
+        maxread (int): Most bytes read at once.
+        capacity (int): Most bytes of output kept to be searched.
+    """
+
+    accepts_bytes = True
+
+    def __init__(
+        self,
+        timeout: Optional[float] = 30,
+        maxread: int = MAXREAD,
+        capacity: int = CAPACITY,
+    ):
+        self.encoding = "utf-8"
+        self.timeout = timeout
+        self.maxread = maxread
+        self.capacity = capacity
+        self.logfile: Any = None
+        self.logfile_read: Any = None
+        self.logfile_send: Any = None
+        # Not used: kept for code written for `pexpect`.
+        self.delaybeforesend: Optional[float] = None
+        self.before: str = ""
+        self.after: Any = ""
+        self.match: Any = None
+        self.closed = False
+        self.flag_eof = False
+        self.exitstatus: Optional[int] = None
+        self.signalstatus: Optional[int] = None
+        # Output that was not matched yet.
+        self._output = bytearray()
+        self._send_decoder = codecs.getincrementaldecoder(self.encoding)("replace")
+
+    @property
+    def buffer(self) -> str:
+        """str: Output that was read but not matched yet."""
+        return self._output.decode(self.encoding, "replace")
+
+    @buffer.setter
+    def buffer(self, value: str) -> None:
+        self._output = bytearray(value.encode(self.encoding))
+
+    def _log(self, text: str, extra: Any) -> None:
+        for logfile in (self.logfile, extra):
+            if logfile is not None:
+                logfile.write(text)
+                logfile.flush()
+
+    def _log_send(self, data: Union[str, bytes]) -> bytes:
+        """Logs what is sent.
+
+        Returns:
+            bytes: The data, encoded.
+        """
+        if isinstance(data, str):
+            raw = data.encode(self.encoding)
+            if self.logfile is not None or self.logfile_send is not None:
+                self._log(data, self.logfile_send)
+            return raw
+        if self.logfile is not None or self.logfile_send is not None:
+            self._log(self._send_decoder.decode(data), self.logfile_send)
+        return data
+
+    def sendline(self, data: Union[str, bytes] = "") -> int:
+        if isinstance(data, str):
+            return self.send(data + "\n")
+        return self.send(data + b"\n")
+
+    def _receive(self, timeout: Any) -> None:
+        # Through `read_nonblocking()`, which a `ChildReader` replaces.
+        text = self.read_nonblocking(self.maxread, timeout)
+        self._output += text.encode(self.encoding)
+
+    def expect(
+        self,
+        pattern: Any,
+        timeout: Any = -1,
+        searchwindowsize: Optional[int] = None,
+        async_: bool = False,
+    ) -> Any:
+        """Waits until a regular expression matches the output.
+
+        Returns:
+            int: Always 0. A coroutine that returns it if `async_`.
+        """
+        return self.expect_bounded(
+            pattern, searchwindowsize, timeout=timeout, async_=async_
+        )
+
+    def expect_exact(
+        self,
+        pattern: Any,
+        timeout: Any = -1,
+        searchwindowsize: Optional[int] = None,
+        async_: bool = False,
+    ) -> Any:
+        """Waits until a plain string is in the output.
+
+        Returns:
+            int: Always 0. A coroutine that returns it if `async_`.
+        """
+        return self.expect_bounded(
+            pattern, searchwindowsize, exact=True, timeout=timeout, async_=async_
+        )
+
+    def expect_bounded(
+        self,
+        pattern: Any,
+        window: Optional[int],
+        spill: Optional[IO] = None,
+        exact: bool = False,
+        timeout: Any = -1,
+        async_: bool = False,
+    ) -> Any:
+        """Same as `streaming.expect_bounded()`, which calls it.
+
+        Args:
+            pattern (Any): A regular expression, a string if `exact`,
+                or `pexpect.EOF`.
+            window (int, optional): How many bytes of output are kept,
+                and searched.
+            spill (IO, optional): Where output that is dropped is written.
+            exact (bool): Whether `pattern` is a plain string.
+            timeout (float, optional): Same as for `expect()`.
+            async_ (bool): Whether to return a coroutine.
+
+        Raises:
+            ValueError: If `window` is smaller than 1.
+
+        Returns:
+            int: Always 0. A coroutine that returns it if `async_`.
+        """
+        if window is not None and window < 1:
+            raise ValueError("The window must hold at least one character.")
+        if timeout == -1:
+            timeout = self.timeout
+        searcher = Searcher(pattern, exact, self.encoding)
+        if async_:
+            return self._expect_async(searcher, window, spill, timeout)
+        return self._expect(searcher, window, spill, timeout)
+
+    def _found(
+        self, searcher: Searcher, window: Optional[int], spill: Optional[IO]
+    ) -> bool:
+        """Trims the output, and searches it."""
+        output = self._output
+        limit = self.capacity if window is None else min(window, self.capacity)
+        if len(output) > 2 * limit:
+            excess = len(output) - limit
+            if spill is not None:
+                spill.write(output[:excess].decode(self.encoding, "replace"))
+            del output[:excess]
+            searcher.searched = max(0, searcher.searched - excess)
+
+        start = 0 if window is None else max(0, len(output) - window)
+        found = searcher.search(output, start)
+        if found is None:
+            return False
+        begin, end, self.match = found
+        self.before = output[:begin].decode(self.encoding, "replace")
+        self.after = output[begin:end].decode(self.encoding, "replace")
+        # A new buffer, since the match object refers to this one.
+        self._output = output[end:]
+        return True
+
+    def _eof(self, searcher: Searcher, error: pexpect.EOF) -> int:
+        """Handles the end of the output."""
+        if not searcher.eof:
+            raise error
+        self.before = self.buffer
+        self.after = pexpect.EOF
+        self.match = pexpect.EOF
+        self._output = bytearray()
+        return 0
+
+    def _expect(
+        self,
+        searcher: Searcher,
+        window: Optional[int],
+        spill: Optional[IO],
+        timeout: Optional[float],
+    ) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._found(searcher, window, spill):
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            try:
+                self._receive(remaining)
+            except pexpect.EOF as error:
+                return self._eof(searcher, error)
+        return 0
+
+    async def _expect_async(
+        self,
+        searcher: Searcher,
+        window: Optional[int],
+        spill: Optional[IO],
+        timeout: Optional[float],
+    ) -> int:
+        # For sessions whose reads never block. Others wait in the loop.
+        return self._expect(searcher, window, spill, timeout)
+
+
+class PtySession(BufferedSession):
+    """A program running in a pseudo-terminal.
+
+    Args:
+        command (str): The program to run.
+        args (Sequence[str]): Its arguments.
+        env (Dict[str, str], optional): Its environment. Defaults to
+            this process' environment.
+        echo (bool): Whether or not the terminal echoes what is sent.
+        timeout (float, optional): Default timeout of `expect()`, **in
+            seconds**.
+        maxread (int): Most bytes read at once.
+        capacity (int): Most bytes of output kept to be searched.
+        dimensions (Tuple[int, int]): Rows and columns of the terminal.
+    """
+
+    def __init__(
+        self,
+        command: str,
+        args: Sequence[str] = (),
+        env: Optional[Dict[str, str]] = None,
+        echo: bool = True,
+        timeout: Optional[float] = 30,
+        maxread: int = MAXREAD,
+        capacity: int = CAPACITY,
+        dimensions: Tuple[int, int] = (24, 80),
+    ):
+        super().__init__(timeout, maxread, capacity)
+        argv = [command, *args]
+        # Closed on `exec`, so that the program only gets input once its
+        # terminal is set up.
+        errors, report = os.pipe()
+        self.pid, self.child_fd = pty.fork()
+        if self.pid == pty.CHILD:  # pragma: no cover - runs in the child.
+            _execute(argv, env, echo, dimensions, report)
+        os.close(report)
+        with os.fdopen(errors, "rb") as pipe:
+            failure = pipe.read()
+        if failure:
+            os.close(self.child_fd)
+            os.waitpid(self.pid, 0)
+            number, _, message = failure.decode().partition(":")
+            raise OSError(int(number), f"{message}: {command!r}")
+
+        self._read_decoder = codecs.getincrementaldecoder(self.encoding)("replace")
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.child_fd, selectors.EVENT_READ)
+
+    def send(self, data: Union[str, bytes]) -> int:
+        raw = self._log_send(data)
+        view = memoryview(raw)
+        while view:
+            view = view[os.write(self.child_fd, view) :]
+        return len(raw)
+
+    def _read(self, size: int, timeout: Any) -> bytes:
+        """Reads up to `size` bytes, waiting up to `timeout` seconds."""
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if timeout == -1:
+            timeout = self.timeout
+        if not self._selector.select(timeout):
+            raise pexpect.TIMEOUT("Timeout exceeded.")
+        try:
+            data = os.read(self.child_fd, size)
+        except OSError as error:
+            # Linux reports a closed terminal with EIO.
+            if error.errno != errno.EIO:
+                raise
+            data = b""
+        if not data:
+            self.flag_eof = True
+            raise pexpect.EOF("End Of File (EOF).")
+        return data
+
+    def _receive(self, timeout: Any) -> None:
+        if "read_nonblocking" in vars(self):
+            # Replaced by a `ChildReader`, which reads in its own thread.
+            super()._receive(timeout)
+            return
+        data = self._read(self.maxread, timeout)
+        self._output += data
+        if self.logfile is not None or self.logfile_read is not None:
+            self._log(self._read_decoder.decode(data), self.logfile_read)
+
+    def read_nonblocking(self, size: int = 1, timeout: Any = -1) -> str:
+        """Reads output, like `pexpect.spawn.read_nonblocking()`.
+
+        Args:
+            size (int): Most bytes read.
+            timeout (float, optional): How long to wait for output, **in
+                seconds**. ``-1`` uses `timeout`, and `None` waits forever.
+
+        Raises:
+            pexpect.TIMEOUT: If nothing was read in time.
+            pexpect.EOF: If the program is gone.
+
+        Returns:
+            str: The output, decoded. It is written to the logfile.
+        """
+        text = self._read_decoder.decode(self._read(size, timeout))
+        self._log(text, self.logfile_read)
+        return text
+
+    async def _expect_async(
+        self,
+        searcher: Searcher,
+        window: Optional[int],
+        spill: Optional[IO],
+        timeout: Optional[float],
+    ) -> int:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self._found(searcher, window, spill):
+            readable = loop.create_future()
+
+            def ready() -> None:
+                if not readable.done():
+                    readable.set_result(None)
+
+            remaining = None if deadline is None else deadline - loop.time()
+            loop.add_reader(self.child_fd, ready)
+            try:
+                await asyncio.wait_for(readable, remaining)
+            except asyncio.TimeoutError:
+                raise pexpect.TIMEOUT("Timeout exceeded.") from None
+            finally:
+                loop.remove_reader(self.child_fd)
+            try:
+                self._receive(0)
+            except pexpect.TIMEOUT:
+                continue
+            except pexpect.EOF as error:
+                return self._eof(searcher, error)
+        return 0
+
+    def isalive(self) -> bool:
+        """Checks if the program is still running. Reaps it if not."""
+        if self.exitstatus is not None or self.signalstatus is not None:
+            return False
+        try:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+        except ChildProcessError:
+            return False
+        if pid == 0:
+            return True
+        if os.WIFEXITED(status):
+            self.exitstatus = os.WEXITSTATUS(status)
+        elif os.WIFSIGNALED(status):
+            self.signalstatus = os.WTERMSIG(status)
+        else:  # Stopped, not gone.
+            return True
+        return False
+
+    def close(self, force: bool = True) -> None:
+        """Closes the terminal, and waits for the program to exit.
+
+        Closing the terminal hangs the program up. If it is still
+        running after `CLOSE_GRACE` seconds, it is killed.
+
+        Args:
+            force (bool): Unused, the program is always killed if needed.
+        """
+        if self.closed:
+            return
+        self._selector.close()
+        os.close(self.child_fd)
+        self.closed = True
+        deadline = time.monotonic() + CLOSE_GRACE
+        while self.isalive():
+            if time.monotonic() >= deadline:
+                try:
+                    os.kill(self.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                os.waitpid(self.pid, 0)
+                self.signalstatus = signal.SIGKILL
+                return
+            time.sleep(0.001)
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Reading the output of a child process in the background.
+
+While `runner` waits between keystrokes, nothing reads what the child
+prints. A job in the background, or a command that prints while the
+next one is typed, can fill the terminal's buffer and stall until the
+next `expect()`. That `expect()` then has all of it to read and search
+at once.
+
+`ChildReader` reads the child's output in a thread, as soon as it is
+printed. It reads through `pexpect`, so the output still goes to the
+child's logfile as it arrives. What is read is kept in a bounded
+buffer, and the child's `read_nonblocking()` is served from that
+buffer while the reader is started. `expect()` then only searches
+output that was already read, and never waits on the terminal itself.
+
+The buffer only holds what has not been searched yet. When it is full,
+the reader stops reading until `expect()` takes some of it, so output
+is never dropped. The child may then stall, as it would without a
+reader, but only once it printed more than `limit` characters that
+nobody searched.
+
+Only blocking reads are served from the buffer. `pexpect`'s
+asynchronous `expect()` reads the terminal from the event loop, which
+already runs while keystrokes are waited for.
+
+## Example
+
+```python
+from runner.reader import ChildReader
+with ChildReader(child):
+    human_typing.type_sentence(child, "make")
+    child.expect("done")
+```
+"""
+import collections
+import threading
+from typing import Any, Deque, Optional
+
+import pexpect
+
+# Most characters kept in the buffer before the reader waits, by default.
+READER_LIMIT: int = 1024 * 1024
+
+# How long each read waits for output, **in seconds**. Stopping the
+# reader takes up to this long.
+POLL_INTERVAL: float = 0.02
+
+
+class ChildReader:
+    """Reads a child's output in a background thread.
+
+    Args:
+        child (pexpect.pty_spawn.spawn): The child process. Its logfile
+            is written to from the reader's thread, so it must accept
+            writes from many threads. `classmodule.SwitchingSink` does.
+        limit (int): Most characters kept in the buffer. The reader
+            waits for them to be taken before reading any more, so it
+            may hold up to `limit` plus the child's `maxread`.
+        interval (float): How long each read waits for output, **in
+            seconds**.
+    """
+
+    def __init__(
+        self,
+        child: Any,
+        limit: int = READER_LIMIT,
+        interval: float = POLL_INTERVAL,
+    ):
+        self.child = child
+        self.limit = limit
+        self.interval = interval
+        self.chunks: Deque[str] = collections.deque()
+        self.size: int = 0
+        # What stopped the thread: `pexpect.EOF`, or an error.
+        self.error: Optional[BaseException] = None
+        self.condition = threading.Condition()
+        self.stopping = threading.Event()
+        # The child's own method, which reads the terminal.
+        self.read_terminal = child.read_nonblocking
+        self.thread = threading.Thread(
+            target=self._run, name="runner-child-reader", daemon=True
+        )
+
+    def start(self) -> None:
+        """Starts reading, and serves the child's reads from the buffer."""
+        self.child.read_nonblocking = self.read_nonblocking
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stops reading, and gives the child its own reads back.
+
+        Output that was read but not searched yet is put at the end of
+        the child's buffer, so that the next `expect()` still sees it.
+        """
+        self.stopping.set()
+        with self.condition:
+            # The reader may be waiting for the buffer to be consumed.
+            self.condition.notify_all()
+        self.thread.join()
+        # Removes the instance attribute set by `start()`.
+        del self.child.read_nonblocking
+        with self.condition:
+            leftover = "".join(self.chunks)
+            self.chunks.clear()
+            self.size = 0
+        if leftover:
+            # Like `pexpect` does with what it reads, so that `before`
+            # includes it too.
+            self.child.buffer = self.child.buffer + leftover
+            before = getattr(self.child, "_before", None)
+            if before is not None:
+                before.seek(0, 2)
+                before.write(leftover)
+
+    def _run(self) -> None:
+        while not self.stopping.is_set():
+            with self.condition:
+                # Waits for `expect()` to take output from a full buffer.
+                self.condition.wait_for(self._has_room)
+            if self.stopping.is_set():
+                return
+            try:
+                data = self.read_terminal(self.child.maxread, self.interval)
+            except pexpect.TIMEOUT:
+                continue
+            except BaseException as error:
+                # The child is gone, or its terminal was closed.
+                with self.condition:
+                    self.error = error
+                    self.condition.notify_all()
+                return
+            with self.condition:
+                self.chunks.append(data)
+                self.size += len(data)
+                self.condition.notify_all()
+
+    def _has_room(self) -> bool:
+        return self.size < self.limit or self.stopping.is_set()
+
+    def _ready(self) -> bool:
+        return bool(self.chunks) or self.error is not None
+
+    def read_nonblocking(self, size: int = 1, timeout: Any = -1) -> str:
+        """Same as `pexpect.spawn.read_nonblocking()`, from the buffer.
+
+        Args:
+            size (int): Most characters returned.
+            timeout (float, optional): How long to wait for output, **in
+                seconds**. ``-1`` uses the child's timeout, and `None`
+                waits forever.
+
+        Raises:
+            pexpect.TIMEOUT: If nothing was read in time.
+            pexpect.EOF: If the child is gone and everything was read.
+
+        Returns:
+            str: Between 1 and `size` characters.
+        """
+        if timeout == -1:
+            timeout = self.child.timeout
+        with self.condition:
+            if not self.condition.wait_for(self._ready, timeout):
+                raise pexpect.TIMEOUT("Timeout exceeded.")
+            if self.chunks:
+                return self._take(size)
+            if self.error is None or isinstance(self.error, pexpect.EOF):
+                raise pexpect.EOF(str(self.error))
+            raise self.error
+
+    def _take(self, size: int) -> str:
+        """Removes up to `size` characters from the buffer."""
+        taken = []
+        while self.chunks and size:
+            chunk = self.chunks.popleft()
+            if len(chunk) > size:
+                self.chunks.appendleft(chunk[size:])
+                chunk = chunk[:size]
+            taken.append(chunk)
+            size -= len(chunk)
+            self.size -= len(chunk)
+        # The reader may be waiting for room.
+        self.condition.notify_all()
+        return "".join(taken)
+
+    def __enter__(self) -> "ChildReader":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
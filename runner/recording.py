@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Recorders for the output of `Commands`.
+
+Recorders are used as the output sink of `Commands`. They timestamp
+everything that is written to them using a `Clock`. With a
+`VirtualClock`, recordings look human-paced even though the typing
+itself was not.
+
+## Example
+
+```python
+from runner.recording import TypescriptRecorder
+recorder = TypescriptRecorder(pathlib.Path("demo.typescript"))
+Commands(commands, expect, sink=recorder).run()
+recorder.close()
+```
+
+The result can then be played with ``scriptreplay``::
+
+    $ scriptreplay demo.typescript.timing demo.typescript
+
+`AsciicastRecorder` works the same way, but writes a single asciicast
+v2 file that can be played with ``asciinema play``.
+"""
+import codecs
+import datetime
+import json
+import os
+import pathlib
+import time
+from typing import Union
+
+from runner.clock import Clock, REAL_CLOCK
+
+
+class TypescriptRecorder:
+    """Records output in the format of ``script --timing``.
+
+    Two files are written: the typescript, which is the raw output,
+    and a timing file. Each line of the timing file holds the delay
+    **in seconds** since the previous write and how many bytes were
+    written.
+
+    Args:
+        path (pathlib.Path): Where the typescript is written.
+        timing_path (pathlib.Path, optional): Where the timing is written.
+            Defaults to `path` with a ``.timing`` suffix.
+        clock (Clock, optional): Used to timestamp writes. Defaults to
+            real time.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        timing_path: Union[pathlib.Path, None] = None,
+        clock: Union[Clock, None] = None,
+    ):
+        if timing_path is None:
+            timing_path = path.with_name(path.name + ".timing")
+        self.clock = clock or REAL_CLOCK
+        self.typescript = open(path, "wb")
+        self.timing = open(timing_path, "w")
+        # `scriptreplay` skips the first line of the typescript.
+        started = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.typescript.write(f"Script started on {started}\n".encode())
+        self.last: float = self.clock.now()
+
+    def write(self, data: Union[str, bytes]) -> None:
+        """Records some output.
+
+        Args:
+            data (str/bytes): The output. Strings are encoded as UTF-8.
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        if not data:
+            return
+        now = self.clock.now()
+        self.timing.write(f"{now - self.last:.6f} {len(data)}\n")
+        self.typescript.write(data)
+        self.last = now
+
+    def flush(self) -> None:
+        """Flushes both files."""
+        self.typescript.flush()
+        self.timing.flush()
+
+    def close(self) -> None:
+        """Closes both files."""
+        self.typescript.close()
+        self.timing.close()
+
+
+class AsciicastRecorder:
+    """Records output as an asciicast v2 file.
+
+    Every write becomes an output event, timestamped when it happens.
+    Events are written through a large buffer, so recording does not
+    add a system call for each keystroke.
+
+    Idle periods, like waiting for a slow command, can be capped with
+    `idle_time_limit`. Recorded timestamps are then compressed, which
+    keeps both the recording and its playback short.
+
+    Args:
+        path (pathlib.Path): Where the recording is written.
+        width (int): The width of the terminal, in columns.
+        height (int): The height of the terminal, in rows.
+        idle_time_limit (float, optional): The longest pause **in
+            seconds** that is kept in the recording.
+        clock (Clock, optional): Used to timestamp writes. Defaults to
+            real time.
+    """
+
+    # Size of the write buffer, in bytes.
+    BUFFER_SIZE: int = 64 * 1024
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        width: int = 80,
+        height: int = 24,
+        idle_time_limit: Union[float, None] = None,
+        clock: Union[Clock, None] = None,
+    ):
+        self.clock = clock or REAL_CLOCK
+        self.idle_time_limit = idle_time_limit
+        self.stream = open(path, "w", buffering=self.BUFFER_SIZE)
+
+        header = {
+            "version": 2,
+            "width": width,
+            "height": height,
+            "timestamp": int(time.time()),
+            "env": {"SHELL": "bash", "TERM": os.getenv("TERM", "xterm")},
+        }
+        if idle_time_limit is not None:
+            header["idle_time_limit"] = idle_time_limit
+        self.stream.write(json.dumps(header) + "\n")
+
+        self.last: float = self.clock.now()
+        # Time since the start of the recording, idle periods capped.
+        self.elapsed: float = 0.0
+        # Characters can be split between two writes of bytes.
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def write(self, data: Union[str, bytes]) -> None:
+        """Records some output.
+
+        Args:
+            data (str/bytes): The output. Bytes are decoded as UTF-8. A
+                character split between writes is recorded with the
+                write that ends it.
+        """
+        if isinstance(data, bytes):
+            data = self.decoder.decode(data)
+        self._event(data)
+
+    def _event(self, data: str) -> None:
+        """Writes an output event, timestamped now."""
+        if not data:
+            return
+        now = self.clock.now()
+        delay = now - self.last
+        if self.idle_time_limit is not None:
+            delay = min(delay, self.idle_time_limit)
+        self.elapsed += delay
+        self.last = now
+        self.stream.write(json.dumps([round(self.elapsed, 6), "o", data]) + "\n")
+
+    def flush(self) -> None:
+        """Does nothing.
+
+        `pexpect` flushes its logfile after every write, which would
+        defeat the buffer. The recording is flushed when it is closed.
+        """
+
+    def close(self) -> None:
+        """Flushes and closes the recording.
+
+        An unfinished character left by the last write is recorded as
+        U+FFFD.
+        """
+        if self.stream.closed:
+            return
+        self._event(self.decoder.decode(b"", final=True))
+        self.stream.close()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Recording a shell's output, and replaying it without running anything.
+
+Re-rendering a demo with other typing options runs every command again,
+even if its output did not change. A transcript keeps what the shell
+printed at each step of a script instead, with when it was printed.
+
+`TranscriptRecorder` records a run of `Commands` to a transcript, and
+`ReplaySession` replaces the shell with it on the next runs. What is
+typed still goes to the sink as it is typed, but the output of every
+step is printed at once, as soon as the step's input was sent. The
+`expect` of each step is searched in it as usual, so scripts are still
+checked.
+
+Transcripts are cut into steps when `Commands` sends the last of a
+step's input. The first step is what the shell printed before any input.
+Each step holds the chunks of output that were read, with the delay
+since the previous one, **in seconds**.
+
+## Example
+
+```python
+from runner.replay import Transcript, TranscriptRecorder
+recorder = TranscriptRecorder(pathlib.Path("demo.transcript"))
+Commands(commands, expect, recorder=recorder).run()
+recorder.close()
+
+transcript = Transcript.load(pathlib.Path("demo.transcript"))
+Commands(commands, expect, replay=transcript).run()
+```
+"""
+import collections
+import json
+import pathlib
+import threading
+from typing import Any, Deque, List, NamedTuple, Optional, Tuple, Union
+
+import pexpect
+
+from runner.clock import Clock, REAL_CLOCK
+from runner.pty_session import CAPACITY, MAXREAD, BufferedSession
+
+# Changed when transcripts are written differently.
+TRANSCRIPT_VERSION: int = 1
+
+# Output printed at once, and how long after the previous output it was
+# printed, **in seconds**.
+Chunk = Tuple[float, str]
+
+
+class Transcript(NamedTuple):
+    """What a shell printed during a run of `Commands`.
+
+    Attributes:
+        sentinel (str, optional): What the shell printed at the end of
+            its prompts. See `classmodule.spawn_shell()`.
+        steps (List[List[Chunk]]): The output of each step. The first
+            one was printed before anything was sent.
+    """
+
+    sentinel: Optional[str]
+    steps: List[List[Chunk]]
+
+    @classmethod
+    def load(cls, path: Union[str, pathlib.Path]) -> "Transcript":
+        """Reads a transcript written by `TranscriptRecorder`.
+
+        Args:
+            path (str/pathlib.Path): The transcript.
+
+        Raises:
+            ValueError: If the file is not a transcript, or was written
+                by another version of `runner`.
+
+        Returns:
+            Transcript: The transcript.
+        """
+        with open(path, encoding="utf-8") as stream:
+            try:
+                header = json.loads(stream.readline())
+                steps = [json.loads(line)["output"] for line in stream]
+            except (ValueError, KeyError, TypeError) as error:
+                raise ValueError(f"{path} is not a transcript: {error}") from None
+        if not isinstance(header, dict) or header.get("version") != TRANSCRIPT_VERSION:
+            raise ValueError(
+                f"{path} is not a version {TRANSCRIPT_VERSION} transcript."
+            )
+        return cls(
+            header.get("sentinel"),
+            [[(float(delay), str(text)) for delay, text in step] for step in steps],
+        )
+
+
+class TranscriptRecorder:
+    """Records a shell's output to a transcript, one step at a time.
+
+    The recorder is the shell's `logfile_read`, so it only gets what the
+    shell printed, not what was sent. Each step is written as a JSON line
+    once the next one starts, so an interrupted run still leaves the
+    steps it finished. A recorder records a single run.
+
+    Args:
+        path (str/pathlib.Path): Where the transcript is written.
+        clock (Clock, optional): Used to time the output. Defaults to
+            real time.
+    """
+
+    def __init__(
+        self, path: Union[str, pathlib.Path], clock: Optional[Clock] = None
+    ):
+        self.clock = clock or REAL_CLOCK
+        self.stream = open(path, "w", encoding="utf-8")
+        self.chunks: List[Chunk] = []
+        self.last: float = self.clock.now()
+        # A `ChildReader` writes from its own thread.
+        self.lock = threading.Lock()
+
+    def start(self, child: Any) -> None:
+        """Starts recording a shell's output.
+
+        Args:
+            child (classmodule.Session): The shell, before its prompt is
+                expected.
+        """
+        header = {
+            "version": TRANSCRIPT_VERSION,
+            "sentinel": getattr(child, "sentinel", None),
+        }
+        self.stream.write(json.dumps(header) + "\n")
+        child.logfile_read = self
+
+    def write(self, data: str) -> None:
+        """Records some output.
+
+        Args:
+            data (str): The output.
+        """
+        if not data:
+            return
+        with self.lock:
+            now = self.clock.now()
+            self.chunks.append((round(now - self.last, 6), data))
+            self.last = now
+
+    def flush(self) -> None:
+        """Called after every write. Steps are only written when done."""
+
+    def next_step(self) -> None:
+        """Writes the current step, and starts the next one."""
+        with self.lock:
+            self.stream.write(json.dumps({"output": self.chunks}) + "\n")
+            self.stream.flush()
+            self.chunks = []
+            self.last = self.clock.now()
+
+    def close(self) -> None:
+        """Writes the last step and closes the transcript."""
+        if self.stream.closed:
+            return
+        self.next_step()
+        self.stream.close()
+
+
+class ReplaySession(BufferedSession):
+    """Replays a transcript in place of a shell.
+
+    Nothing is run. The output of a step is printed once `next_step()`
+    says its input was sent. Output is never waited for: if what is
+    expected is not in the replayed output, `pexpect.TIMEOUT` is raised
+    at once. Once every step was replayed, `pexpect.EOF` is.
+
+    Args:
+        transcript (Transcript): What to replay.
+        clock (Clock, optional): If given, waits for the recorded delay
+            before each chunk of output. A `VirtualClock` keeps the
+            timing of recordings without waiting.
+        timeout (float, optional): Unused, output is never waited for.
+        maxread (int): Most characters read at once.
+        capacity (int): Most bytes of output kept to be searched.
+    """
+
+    def __init__(
+        self,
+        transcript: Transcript,
+        clock: Optional[Clock] = None,
+        timeout: Optional[float] = 30,
+        maxread: int = MAXREAD,
+        capacity: int = CAPACITY,
+    ):
+        super().__init__(timeout, maxread, capacity)
+        self.transcript = transcript
+        self.clock = clock
+        self.sentinel = transcript.sentinel
+        # How many steps were replayed, the first one included.
+        self.step = 0
+        self.pending: Deque[Chunk] = collections.deque()
+        if transcript.steps:
+            self.next_step()
+
+    def next_step(self) -> None:
+        """Prints the output of the next step."""
+        if self.step < len(self.transcript.steps):
+            self.pending.extend(self.transcript.steps[self.step])
+        self.step += 1
+
+    def send(self, data: Union[str, bytes]) -> int:
+        """Logs what is sent. It goes nowhere else."""
+        return len(self._log_send(data))
+
+    def read_nonblocking(self, size: int = 1, timeout: Any = -1) -> str:
+        """Reads replayed output.
+
+        Args:
+            size (int): Most characters returned.
+            timeout (float, optional): Unused, output is never waited for.
+
+        Raises:
+            pexpect.TIMEOUT: If the output of the current step was read.
+            pexpect.EOF: If every step was read.
+
+        Returns:
+            str: The output. It is written to the logfile.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if not self.pending:
+            if self.step > len(self.transcript.steps):
+                self.flag_eof = True
+                raise pexpect.EOF("End of the transcript.")
+            raise pexpect.TIMEOUT("Nothing more was recorded for this step.")
+        delay, text = self.pending.popleft()
+        if len(text) > size:
+            self.pending.appendleft((0.0, text[size:]))
+            text = text[:size]
+        if self.clock is not None:
+            self.clock.sleep(delay)
+        self._log(text, self.logfile_read)
+        return text
+
+    def isalive(self) -> bool:
+        return not self.closed and self.step <= len(self.transcript.steps)
+
+    def close(self, force: bool = True) -> None:
+        self.closed = True
+        self.exitstatus = 0
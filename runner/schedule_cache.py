@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""On-disk cache of planned keystrokes.
+
+When a seed is used, the keystrokes planned for a command only depend
+on the command's text, on the seed, on the typing profile, on the
+planner and on the version of the typing model. `ScheduleCache` stores
+those plans on disk so that re-recording a script reuses them instead
+of planning them again.
+
+## Example
+
+```python
+from runner.schedule_cache import ScheduleCache
+cache = ScheduleCache()
+timeline = cache.get("ls -a", 42)
+```
+"""
+import hashlib
+import os
+import pathlib
+import tempfile
+from typing import Optional, Union
+
+from runner import human_typing
+from runner.timeline import Timeline
+from runner.typing_profile import DEFAULT_PROFILE, TypingProfile
+
+
+def default_cache_dir() -> pathlib.Path:
+    """Returns the directory where `runner` keeps its caches.
+
+    Uses ``$XDG_CACHE_HOME`` when it is set, ``~/.cache`` otherwise.
+
+    Returns:
+        pathlib.Path: The cache directory. It might not exist yet.
+    """
+    base = os.getenv("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+    return pathlib.Path(base) / "good-bot-runner"
+
+
+class ScheduleCache:
+    """Stores planned timelines, keyed by text, seed, profile, planner and version.
+
+    Args:
+        directory (pathlib.Path, optional): Where to store the timelines.
+            Defaults to a ``schedules`` directory in `default_cache_dir()`.
+    """
+
+    def __init__(self, directory: Union[pathlib.Path, None] = None):
+        if directory is None:
+            directory = default_cache_dir() / "schedules"
+        self.directory = pathlib.Path(directory)
+
+    def key(
+        self,
+        text: str,
+        seed: int,
+        profile: Optional[TypingProfile] = None,
+        planner: Optional[str] = None,
+    ) -> str:
+        """Computes the key under which a plan is stored.
+
+        Args:
+            text (str): The text that was planned.
+            seed (int): The seed used to plan `text`.
+            profile (TypingProfile, optional): The profile used to plan
+                `text`. Defaults to `DEFAULT_PROFILE`.
+            planner (str, optional): What planned `text`, if not
+                `human_typing.plan_sentence()`. Each planner draws
+                different numbers from the same seed.
+
+        Returns:
+            str: A hexadecimal digest.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{human_typing.TYPING_MODEL_VERSION}\0{seed}\0".encode())
+        if profile is not None and profile != DEFAULT_PROFILE:
+            # Plans made with the default profile keep their old keys.
+            digest.update(f"{tuple(profile)!r}\0".encode())
+        if planner is not None:
+            digest.update(f"{planner}\0".encode())
+        digest.update(text.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / key
+
+    def get(
+        self,
+        text: str,
+        seed: int,
+        profile: Optional[TypingProfile] = None,
+        planner: Optional[str] = None,
+    ) -> Union[Timeline, None]:
+        """Loads a cached plan.
+
+        Args:
+            text (str): The text that was planned.
+            seed (int): The seed used to plan `text`.
+            profile (TypingProfile, optional): The profile used to plan
+                `text`.
+            planner (str, optional): What planned `text`. See `key()`.
+
+        Returns:
+            Timeline/None: The plan, or `None` if it is not cached or
+                if the cached file cannot be read.
+        """
+        try:
+            data = self._path(self.key(text, seed, profile, planner)).read_bytes()
+            return Timeline.from_bytes(data)
+        except (OSError, ValueError):
+            return None
+
+    def put(
+        self,
+        text: str,
+        seed: int,
+        timeline: Timeline,
+        profile: Optional[TypingProfile] = None,
+        planner: Optional[str] = None,
+    ) -> None:
+        """Stores a plan.
+
+        The file is written atomically, so that concurrent runs never
+        read a partial plan. Errors are ignored: the cache is only an
+        optimization.
+
+        Args:
+            text (str): The text that was planned.
+            seed (int): The seed used to plan `text`.
+            timeline (Timeline): The plan.
+            profile (TypingProfile, optional): The profile used to plan
+                `text`.
+            planner (str, optional): What planned `text`. See `key()`.
+        """
+        path = self._path(self.key(text, seed, profile, planner))
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            stream = tempfile.NamedTemporaryFile(dir=path.parent, delete=False)
+        except OSError:
+            return
+        try:
+            with stream:
+                stream.write(timeline.to_bytes())
+            os.replace(stream.name, path)
+        except OSError:
+            # Not leaving a partial file in the cache.
+            try:
+                os.unlink(stream.name)
+            except OSError:
+                pass
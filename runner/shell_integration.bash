@@ -0,0 +1,29 @@
+# Used by `runner` as the rc file of the shells it types to.
+#
+# The user's own rc file is loaded first. Then, at the end of every
+# prompt, an OSC escape sequence holding this shell's token and the exit
+# status of the last command is printed. Terminals and players ignore
+# it, and `runner` waits for it instead of guessing where the prompt is.
+# Since it comes last, the whole prompt was printed once it is read.
+
+if [ -f ~/.bashrc ]; then
+    . ~/.bashrc
+fi
+
+__good_bot_status=0
+# Expanded when the prompt is drawn. `\[` and `\]` tell readline that it
+# takes no room on screen.
+__good_bot_sentinel='\[\e]697;good-bot;'"$GOOD_BOT_TOKEN"';${__good_bot_status}\a\]'
+
+__good_bot_prompt() {
+    __good_bot_status=$1
+    # Added again if `PROMPT_COMMAND` set `PS1` anew.
+    case "$PS1" in
+        *"$__good_bot_sentinel") ;;
+        *) PS1="${PS1//"$__good_bot_sentinel"/}$__good_bot_sentinel" ;;
+    esac
+}
+
+# Running first, so that `$?` is still the status of the last command,
+# and again last, so that the sentinel ends whatever `PS1` was set to.
+PROMPT_COMMAND="__good_bot_prompt \$?${PROMPT_COMMAND:+; $PROMPT_COMMAND; __good_bot_prompt \$__good_bot_status}"
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""A pool of shells that are ready to be typed to.
+
+Starting `bash`, loading its rc files and waiting for its first prompt
+is a large fixed cost for short scripts. `ShellPool` pays it ahead of
+time, in background threads, so that `Commands` get a shell that is
+already waiting at its prompt.
+
+## Example
+
+```python
+from runner.shell_pool import ShellPool
+with ShellPool(size=2) as pool:
+    Commands(commands, expect, pool=pool).run()
+    Commands(other_commands, other_expect, pool=pool).run()
+```
+"""
+# Imported before any shell is spawned. Importing it registers fork
+# handlers that release a lock: if that happens while a pool's thread is
+# forking, the lock is released once too often, and the next executor
+# fails. `Commands.run_async()` uses an executor to wait for the pool.
+import concurrent.futures.thread  # noqa: F401
+import io
+import os
+import queue
+import secrets
+import shlex
+import threading
+from typing import Any, Callable, List, Union
+
+import pexpect
+
+from runner import classmodule
+
+# What is done with a shell once a `Commands` is done with it.
+RECYCLE: str = "recycle"  # Close it and start a fresh one.
+RESET: str = "reset"  # Go back to the starting directory and reuse it.
+DISCARD: str = "discard"  # Close it without replacing it.
+POLICIES = (RECYCLE, RESET, DISCARD)
+
+# Sent to a shell to reset it. The leading space keeps it out of the
+# history, which is cleared anyway. The directory is quoted with
+# `shlex.quote()`. The reset then prints `RESET_MARKER`, with a nonce of
+# its own, which its echo does not contain.
+RESET_COMMAND: str = (
+    " builtin cd -- {directory} && history -c;"
+    " builtin printf '%s%s\\n' good-bot-reset- {nonce}"
+)
+RESET_MARKER: str = "good-bot-reset-{nonce}"
+
+
+class ShellPool:
+    """Keeps shells ready, with their prompt already detected.
+
+    Shells are given by `acquire()` and taken back by `release()`.
+    What happens to a released shell depends on `policy`:
+
+    - `RECYCLE`: the shell is closed and a fresh one is started in
+      the background. Scripts never share a shell.
+    - `RESET`: the shell goes back to the directory it started in and
+      its history is cleared. This is faster, but variables, functions
+      and aliases defined by a script are kept.
+    - `DISCARD`: the shell is closed. Useful to get a single shell
+      started while doing something else.
+
+    The output printed by a shell while it was started is kept in its
+    `startup_output` attribute so that it can still be recorded.
+
+    Args:
+        size (int): How many shells to keep ready.
+        policy (str): One of `POLICIES`.
+        spawn (Callable, optional): Starts a shell. Defaults to
+            `classmodule.spawn_shell()`.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        policy: str = RECYCLE,
+        spawn: Union[Callable[[], Any], None] = None,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"The policy must be one of {', '.join(POLICIES)}.")
+        self.size = size
+        self.policy = policy
+        self.spawn = spawn or classmodule.spawn_shell
+        self.ready: "queue.Queue[Any]" = queue.Queue()
+        self.threads: List[threading.Thread] = []
+        self.closed = False
+
+        for _ in range(size):
+            self.start_one()
+
+    def start_one(self) -> None:
+        """Starts a shell in the background. It is ready once prompting."""
+        thread = threading.Thread(target=self.warm_up, daemon=True)
+        thread.start()
+        self.threads = [alive for alive in self.threads if alive.is_alive()]
+        self.threads.append(thread)
+
+    def warm_up(self) -> None:
+        """Starts a shell, waits for its prompt and adds it to the pool."""
+        startup = io.StringIO()
+        child = None
+        try:
+            child = self.spawn()
+            child.logfile = startup
+            classmodule.wait_for_prompt(child)
+        except Exception as error:
+            # Whoever acquires this will get the error, instead of
+            # waiting for a shell that will never come.
+            if child is not None:
+                child.close()
+            self.ready.put(error)
+            return
+        child.logfile = None
+        child.startup_output = startup.getvalue()
+        child.start_directory = os.getcwd()
+        self.ready.put(child)
+
+    def acquire(self, timeout: Union[float, None] = None) -> Any:
+        """Takes a ready shell from the pool.
+
+        Waits for one to be ready if needed. If every shell was already
+        given, a new one is started.
+
+        Args:
+            timeout (float, optional): How long to wait **in seconds**.
+
+        Raises:
+            queue.Empty: If no shell was ready in time.
+
+        Returns:
+            pexpect.pty_spawn.spawn: A shell, waiting at its prompt.
+        """
+        if self.ready.empty() and not any(
+            thread.is_alive() for thread in self.threads
+        ):
+            self.start_one()
+        child = self.ready.get(timeout=timeout)
+        if isinstance(child, Exception):
+            raise child
+        return child
+
+    def release(self, child: Any) -> None:
+        """Gives a shell back to the pool.
+
+        Args:
+            child (pexpect.pty_spawn.spawn): A shell from `acquire()`.
+        """
+        child.logfile = None
+        child.logfile_read = None
+
+        if self.policy == RESET and not self.closed and child.isalive():
+            nonce = secrets.token_hex(8)
+            try:
+                child.sendline(
+                    RESET_COMMAND.format(
+                        directory=shlex.quote(child.start_directory), nonce=nonce
+                    )
+                )
+                # Skips output the last script did not wait for, prompts
+                # included, so that only the reset's own prompt is waited
+                # for.
+                child.expect_exact(RESET_MARKER.format(nonce=nonce))
+                classmodule.wait_for_prompt(child)
+                child.startup_output = ""
+                self.ready.put(child)
+                return
+            except (pexpect.ExceptionPexpect, OSError):
+                pass
+
+        child.close()
+        if self.policy != DISCARD and not self.closed:
+            self.start_one()
+
+    def close(self) -> None:
+        """Closes every shell of the pool."""
+        self.closed = True
+        for thread in self.threads:
+            thread.join()
+        while not self.ready.empty():
+            child = self.ready.get_nowait()
+            if not isinstance(child, Exception):
+                child.close()
+
+    def __enter__(self) -> "ShellPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Reading the steps of very large scripts as they are run.
+
+A script can hold many YAML documents, separated by ``---``. Each
+document has its own `commands` and `expect` lists. `StepStream` reads
+the documents one at a time, while the steps of the previous ones are
+being run. Memory then only depends on the size of the largest
+document, and running starts as soon as the first one is read.
+
+## Example
+
+```yaml
+seed: 42
+commands:
+  - echo 'first'
+expect:
+  - prompt
+---
+commands:
+  - echo 'second'
+expect:
+  - prompt
+```
+
+```python
+from runner.steps import StepStream
+stream = StepStream(pathlib.Path("generated.yaml"))
+Commands([], [], seed=stream.seed, steps=stream).run()
+```
+"""
+import itertools
+import pathlib
+from typing import Any, Iterator, Tuple, Union
+
+import yaml
+
+from runner import funcmodule
+
+# Returned by `next()` once every document was read.
+_END = object()
+
+
+class StepStream:
+    """The steps of a script, read lazily, one document at a time.
+
+    The first document is read when the stream is created, so that the
+    script's `seed` and `typing` are known before running. Every
+    document is checked with `funcmodule.check_config_no_interaction()`
+    when it is read.
+    Only the first document can have a `seed` or `typing` options.
+
+    Args:
+        conf_path (pathlib.Path): The script.
+
+    Raises:
+        FileNotFoundError: If the script does not exist.
+    """
+
+    def __init__(self, conf_path: pathlib.Path):
+        self.conf_path = conf_path
+        self.stream = open(conf_path, "rb")
+        self.documents = yaml.load_all(self.stream, Loader=funcmodule.yaml_loader())
+        try:
+            self.first = self.check(next(self.documents, None), 0)
+        except Exception:
+            self.close()
+            raise
+        self.seed: Union[int, None] = self.first.get("seed")
+        self.typing: dict = self.first.get("typing") or {}
+
+    def check(self, document: Any, index: int) -> dict:
+        """Checks one document of the script.
+
+        Args:
+            document (Any): The parsed document.
+            index (int): Its position in the script, starting at 0.
+
+        Raises:
+            TypeError: If the document is not valid.
+            KeyError: If the document has unknown keys.
+            ValueError: If a document other than the first has a `seed`
+                or `typing` options, if a typing option is out of range,
+                or if `commands` and `expect` have different lengths.
+
+        Returns:
+            dict: The document.
+        """
+        where = f"document {index + 1} of {self.conf_path}"
+        if document is None:
+            raise TypeError(f"{where} is empty.")
+        funcmodule.check_config_no_interaction(document)
+        for key in funcmodule.SCRIPT_KEYS:
+            if index and key in document:
+                raise ValueError(
+                    f"Only the first document can have a `{key}` key, not {where}."
+                )
+        return document
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        """Yields every step, reading documents as needed.
+
+        The script is closed once every step was read. A stream can
+        only be iterated over once.
+
+        Yields:
+            Tuple[Any, Any]: A command, and what to expect after it.
+        """
+        try:
+            # Only keeping the document that is being run in memory.
+            document, self.first = self.first, {}
+            for index in itertools.count(1):
+                yield from zip(
+                    document.get("commands", []), document.get("expect", [])
+                )
+                parsed: Any = next(self.documents, _END)
+                if parsed is _END:
+                    break
+                document = self.check(parsed, index)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Closes the script."""
+        self.stream.close()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Expecting patterns in memory that does not grow with the output.
+
+`pexpect` keeps everything a child process prints until its pattern
+matches, to fill `before`. Even with a `searchwindowsize`, a command
+that prints gigabytes makes `pexpect` hold gigabytes.
+
+`expect_bounded()` works like `expect()`, but only keeps a bounded tail
+of the output. Older output is still written to the child's logfile as
+it is read, and can also be written to a spill file. `before` then only
+holds the end of the output.
+
+## Example
+
+```python
+from runner.streaming import expect_bounded
+child.sendline("find /")
+expect_bounded(child, r"\\$ $", window=4096)
+```
+"""
+from typing import IO, Any, Union
+
+from pexpect.expect import Expecter, searcher_re, searcher_string
+
+
+class BoundedExpecter(Expecter):
+    """An `Expecter` that only keeps the end of the output.
+
+    Matches are only searched for in the last `window` characters, which
+    must be longer than anything the pattern can match.
+
+    Args:
+        spawn (pexpect.spawnbase.SpawnBase): The child process.
+        searcher (searcher_re or searcher_string): What to search for.
+        window (int): How many characters are kept, and searched.
+        spill (IO, optional): Where older output is written.
+    """
+
+    def __init__(
+        self, spawn: Any, searcher: Any, window: int, spill: Union[IO, None] = None
+    ):
+        super().__init__(spawn, searcher, window)
+        self.window = window
+        self.spill = spill
+
+    def do_search(self, window: Any, freshlen: int) -> Union[int, None]:
+        # Called with everything read so far already in `before`.
+        self.trim()
+        return super().do_search(window, freshlen)
+
+    def trim(self) -> None:
+        """Drops everything but the last `window` characters of `before`.
+
+        Trimming only happens once twice the window was collected, so
+        that each character is only copied a constant number of times.
+        """
+        before = self.spawn._before
+        if before.tell() <= 2 * self.window:
+            return
+        value = before.getvalue()
+        if self.spill is not None:
+            self.spill.write(value[: -self.window])
+        self.spawn._before = self.spawn.buffer_type()
+        self.spawn._before.write(value[-self.window :])
+
+
+def expect_bounded(
+    child: Any,
+    pattern: str,
+    window: Union[int, None],
+    spill: Union[IO, None] = None,
+    exact: bool = False,
+    timeout: Union[float, None] = -1,
+    async_: bool = False,
+) -> Any:
+    """Same as `child.expect()`, in bounded memory.
+
+    Args:
+        child (pexpect.spawnbase.SpawnBase): The child process.
+        pattern (str): A regular expression, or a string if `exact`.
+        window (int, optional): How many characters of output are kept,
+            and searched. Matches must be shorter than this. Without a
+            window, this is the same as `child.expect()` or
+            `child.expect_exact()`.
+        spill (IO, optional): Where output that is dropped is written.
+        exact (bool): Whether `pattern` is a plain string.
+        timeout (float, optional): Same as for `child.expect()`.
+        async_ (bool): Whether to return a coroutine, like `child.expect()`.
+
+    Raises:
+        ValueError: If `window` is smaller than 1.
+
+    Returns:
+        int: The index of the pattern that matched, always 0. A coroutine
+            that returns it if `async_`.
+    """
+    if hasattr(child, "expect_bounded"):
+        # Sessions that bound their own output, like `PtySession`.
+        return child.expect_bounded(pattern, window, spill, exact, timeout, async_)
+    if window is None:
+        if exact:
+            return child.expect_exact(pattern, timeout=timeout, async_=async_)
+        return child.expect(pattern, timeout=timeout, async_=async_)
+    if window < 1:
+        raise ValueError("The window must hold at least one character.")
+    if timeout == -1:
+        timeout = child.timeout
+
+    if exact:
+        searcher = searcher_string([child._coerce_expect_string(pattern)])
+    else:
+        searcher = searcher_re(child.compile_pattern_list(pattern))
+    expecter = BoundedExpecter(child, searcher, window, spill)
+
+    if async_:
+        from pexpect._async import expect_async
+
+        return expect_async(expecter, timeout)
+    return expecter.expect_loop(timeout)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Keystroke timelines.
+
+A `Timeline` is the output of the planning stage of `human_typing`.
+It holds every keystroke that will be sent to a child process, along
+with the moment it should be sent, **in seconds** from the start of
+the timeline.
+
+Timelines are stored in flat arrays instead of lists of tuples. This
+keeps them small in memory and makes them easy to analyse or reuse
+without spawning any process.
+
+## Example
+
+```python
+from runner import human_typing
+timeline = human_typing.plan_sentence("echo 'Hello, World!'")
+for offset, keystroke in timeline:
+    print(f"{offset:.3f}s {keystroke!r}")
+```
+"""
+import struct
+import sys
+from array import array
+from typing import Iterable, Iterator, Sequence, Tuple
+
+# Serialized timelines start with this header: a magic string followed
+# by the number of events, as a little-endian unsigned int.
+_HEADER = struct.Struct("<4sI")
+_MAGIC = b"GBTL"
+
+
+class Timeline:
+    """An array-backed sequence of `(offset_seconds, bytes_to_send)` events.
+
+    Offsets are absolute (relative to the start of the timeline) and
+    never decrease. Every payload is stored in a single `bytearray`; an
+    array of end positions is used to slice it back into events.
+    """
+
+    __slots__ = ("offsets", "payload", "ends")
+
+    def __init__(self) -> None:
+        self.offsets: array = array("d")
+        self.payload: bytearray = bytearray()
+        self.ends: array = array("I")
+
+    @classmethod
+    def from_events(
+        cls, offsets: Iterable[float], chunks: Sequence[bytes]
+    ) -> "Timeline":
+        """Builds a timeline from already sorted offsets and payloads.
+
+        This skips the ordering check done by `append()`, which makes
+        it the fastest way to build large timelines.
+
+        Args:
+            offsets (Iterable[float]): When each event should be sent,
+                **in seconds**. Must not decrease.
+            chunks (Sequence[bytes]): What will be sent for each event.
+
+        Returns:
+            Timeline: The events as a timeline.
+        """
+        timeline = cls()
+        timeline.offsets.extend(offsets)
+        end = 0
+        ends = timeline.ends
+        for chunk in chunks:
+            end += len(chunk)
+            ends.append(end)
+        timeline.payload[:] = b"".join(chunks)
+        if len(timeline.offsets) != len(ends):
+            raise ValueError("There must be as many offsets as chunks.")
+        return timeline
+
+    def append(self, offset: float, data: bytes) -> None:
+        """Adds an event at the end of the timeline.
+
+        Args:
+            offset (float): When the event should be sent, **in seconds**
+                from the start of the timeline.
+            data (bytes): What will be sent to the child process.
+
+        Raises:
+            ValueError: If `offset` is before the last event's offset.
+        """
+        if self.offsets and offset < self.offsets[-1]:
+            raise ValueError(
+                f"Events must be added in order ({offset} < {self.offsets[-1]})."
+            )
+        self.offsets.append(offset)
+        self.payload += data
+        self.ends.append(len(self.payload))
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> Tuple[float, bytes]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Timeline index out of range.")
+        start = self.ends[index - 1] if index > 0 else 0
+        return self.offsets[index], bytes(self.payload[start : self.ends[index]])
+
+    def __iter__(self) -> Iterator[Tuple[float, bytes]]:
+        start = 0
+        payload = self.payload
+        for offset, end in zip(self.offsets, self.ends):
+            yield offset, bytes(payload[start:end])
+            start = end
+
+    def bursts(self) -> Iterator[Tuple[float, bytes]]:
+        """Iterates over the events, merging those sent at the same time.
+
+        Consecutive events that share an offset are joined, so that
+        they can be sent with a single write.
+
+        Yields:
+            Tuple[float, bytes]: The offset and what to send.
+        """
+        offsets, ends, payload = self.offsets, self.ends, self.payload
+        count = len(offsets)
+        start = 0
+        index = 0
+        while index < count:
+            offset = offsets[index]
+            while index + 1 < count and offsets[index + 1] == offset:
+                index += 1
+            yield offset, bytes(payload[start : ends[index]])
+            start = ends[index]
+            index += 1
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Timeline):
+            return NotImplemented
+        return (
+            self.offsets == other.offsets
+            and self.payload == other.payload
+            and self.ends == other.ends
+        )
+
+    def __repr__(self) -> str:
+        return f"<Timeline events={len(self)} duration={self.duration:.3f}s>"
+
+    @property
+    def duration(self) -> float:
+        """float: The offset of the last event **in seconds**."""
+        return self.offsets[-1] if self.offsets else 0.0
+
+    def to_bytes(self) -> bytes:
+        """Serializes the timeline to a compact binary form.
+
+        Returns:
+            bytes: The timeline. Use `from_bytes()` to load it back.
+        """
+        offsets, ends = array("d", self.offsets), array("I", self.ends)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+            ends.byteswap()
+        return b"".join(
+            (
+                _HEADER.pack(_MAGIC, len(self)),
+                offsets.tobytes(),
+                ends.tobytes(),
+                bytes(self.payload),
+            )
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Timeline":
+        """Loads a timeline serialized with `to_bytes()`.
+
+        Args:
+            data (bytes): The serialized timeline.
+
+        Raises:
+            ValueError: If `data` is not a serialized timeline.
+
+        Returns:
+            Timeline: The timeline.
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Not a serialized timeline.")
+        magic, count = _HEADER.unpack_from(data)
+        offsets_end = _HEADER.size + 8 * count
+        ends_end = offsets_end + 4 * count
+        if magic != _MAGIC or len(data) < ends_end:
+            raise ValueError("Not a serialized timeline.")
+
+        timeline = cls()
+        timeline.offsets.frombytes(data[_HEADER.size : offsets_end])
+        timeline.ends.frombytes(data[offsets_end:ends_end])
+        if sys.byteorder != "little":
+            timeline.offsets.byteswap()
+            timeline.ends.byteswap()
+        timeline.payload[:] = data[ends_end:]
+        if count and timeline.ends[-1] != len(timeline.payload):
+            raise ValueError("Truncated timeline.")
+        return timeline
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""How fast, and how carefully, commands are typed.
+
+A `TypingProfile` holds the parameters of the typing model used by
+`human_typing`. The default profile types like the model always did.
+Profiles are layered: the one given to `Commands`, then the script's
+`typing` key, then the `typing` option and `fast` flag of a command.
+Each layer only overrides the options it sets.
+
+Options, as written in a script:
+
+- `wpm`: Average typing speed, in words of 5 characters per minute.
+- `speed`: Multiplies every delay and pause. ``2`` types twice as fast.
+- `pause_rate`: Chance of pausing before a space, between 0 and 1.
+- `typo_rate`: Chance of making a typo on each key, between 0 and 1.
+- `fast`: Sends the whole command at once, without typos.
+- `layout`: The keyboard layout, which decides typos and delays. The
+  name of a layout from `layouts.LAYOUTS`, or a mapping describing a
+  new one. Defaults to ``qwerty``.
+
+## Example
+
+```python
+from runner.typing_profile import DEFAULT_PROFILE
+profile = DEFAULT_PROFILE.updated({"wpm": 120, "typo_rate": 0})
+human_typing.type_sentence(child, "ls -a", profile)
+```
+"""
+from typing import Any, Dict, NamedTuple, Tuple
+
+from runner import layouts
+from runner.layouts import Layout
+
+# The average delay between two keys is 145 ms, or this many words of 5
+# characters per minute.
+DEFAULT_WPM: float = 60 / (5 * 0.145)
+
+# Options of the `typing` key, and of commands' `typing` option, with
+# their expected types.
+TYPING_OPTIONS: Dict[str, Tuple[type, ...]] = {
+    "wpm": (int, float),
+    "speed": (int, float),
+    "pause_rate": (int, float),
+    "typo_rate": (int, float),
+    "fast": (bool,),
+    "layout": (str, dict),
+}
+
+
+class TypingProfile(NamedTuple):
+    """Parameters of the typing model.
+
+    Chances are drawn as percents, between two bounds for every key, so
+    rates given to `updated()` are rounded to the nearest percent.
+    """
+
+    wpm: float = DEFAULT_WPM
+    speed: float = 1.0
+    # Bounds of the chance of pausing before a space, in percent.
+    pause_percent: Tuple[int, int] = (20, 30)
+    # Bounds of the chance of making a typo on each key, in percent.
+    typo_percent: Tuple[int, int] = (1, 4)
+    fast: bool = False
+    layout: Layout = layouts.QWERTY
+
+    @property
+    def delay_scale(self) -> float:
+        """float: What delays between keys are multiplied by."""
+        return DEFAULT_WPM / (self.wpm * self.speed)
+
+    def updated(self, options: Dict[str, Any]) -> "TypingProfile":
+        """Overrides some parameters with options from a script.
+
+        Args:
+            options (Dict[str, Any]): Options, as described in this
+                module's documentation.
+
+        Raises:
+            TypeError: If `options` is not a mapping, or if an option
+                has the wrong type.
+            ValueError: If an option is unknown or out of range.
+
+        Returns:
+            TypingProfile: A new profile.
+        """
+        check_typing(options)
+        profile = self
+        for option, value in options.items():
+            if option in ("pause_rate", "typo_rate"):
+                percent = round(value * 100)
+                option = option.replace("rate", "percent")
+                value = (percent, percent)
+            elif option == "layout":
+                value = layouts.from_options(value)
+            profile = profile._replace(**{option: value})
+        return profile
+
+
+def check_typing(options: Any) -> None:
+    """Checks the `typing` options of a script or of a command.
+
+    Args:
+        options (Any): The value of a `typing` key.
+
+    Raises:
+        TypeError: If `options` is not a mapping, or if an option has
+            the wrong type.
+        ValueError: If an option is unknown or out of range.
+    """
+    if not isinstance(options, dict):
+        raise TypeError(f"Typing options must be a mapping, not {type(options)}.")
+
+    for option, value in options.items():
+        expected = TYPING_OPTIONS.get(option)
+        if expected is None:
+            raise ValueError(
+                f"Unknown typing option `{option}`. "
+                f"Use one of {', '.join(TYPING_OPTIONS)}."
+            )
+        # Exact types, as `bool` is a subclass of `int`.
+        if type(value) not in expected:
+            raise TypeError(f"The typing option `{option}` cannot be a {type(value)}.")
+        if option in ("wpm", "speed") and value <= 0:
+            raise ValueError(f"The typing option `{option}` must be above 0.")
+        if option in ("pause_rate", "typo_rate") and not 0 <= value <= 1:
+            raise ValueError(f"The typing option `{option}` must be between 0 and 1.")
+        if option == "layout":
+            layouts.from_options(value)
+
+
+# The profile used when none is given.
+DEFAULT_PROFILE: TypingProfile = TypingProfile()
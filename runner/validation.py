@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""Checking many configuration files at once, without any interaction.
+
+`funcmodule.check_config()` stops at the first error, and can ask the
+user questions. This module is made for automated checks instead: every
+problem of every file is reported, and nobody is ever asked anything.
+
+Files are checked against `SCHEMA`, which maps every key to the
+function checking its value. Files can be checked in parallel with
+`validate_files()`.
+
+## Example
+
+```python
+from runner import validation
+paths = batch.expand_paths(["scripts/"])
+print(validation.format_json(validation.validate_files(paths), len(paths)))
+```
+"""
+import functools
+import json
+import pathlib
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Union
+
+import yaml
+
+from runner import batch
+from runner import funcmodule
+from runner import typing_profile
+
+# Options of commands written as dictionaries, with their expected types.
+COMMAND_OPTIONS: Dict[str, type] = {
+    "command": str,
+    "paste": bool,
+    "searchwindowsize": int,
+    "maxread": int,
+    "fast": bool,
+    "typing": dict,
+}
+
+
+class Problem(NamedTuple):
+    """Something wrong with a configuration file."""
+
+    path: str
+    # Where in the file, like ``commands[2].paste``. Empty for the file itself.
+    location: str
+    message: str
+
+    def __str__(self) -> str:
+        where = f"{self.path}: {self.location}" if self.location else self.path
+        return f"{where}: {self.message}"
+
+
+def type_name(value: Any) -> str:
+    """Returns the name of a value's type, for messages."""
+    return type(value).__name__
+
+
+def check_command(command: Any, location: str) -> List[Problem]:
+    """Checks one item of `commands`.
+
+    Args:
+        command (Any): The item.
+        location (str): Where the item is in the file.
+
+    Returns:
+        List[Problem]: What is wrong with it. Problems have no path yet.
+    """
+    if isinstance(command, str):
+        return []
+    if not isinstance(command, dict):
+        message = f"must be a string or a mapping, not {type_name(command)}"
+        return [Problem("", location, message)]
+
+    if "password" in command:
+        if len(command) != 1 or not isinstance(command["password"], str):
+            message = "a password must only name an environment variable"
+            return [Problem("", location, message)]
+        return []
+
+    problems = []
+    if "command" not in command:
+        message = "must have a `command` or `password` key"
+        problems.append(Problem("", location, message))
+    for option, value in command.items():
+        expected = COMMAND_OPTIONS.get(option)
+        where = f"{location}.{option}"
+        if expected is None:
+            problems.append(Problem("", where, "unknown option"))
+        # `bool` is a subclass of `int`.
+        elif not isinstance(value, expected) or (
+            expected is int and isinstance(value, bool)
+        ):
+            message = f"must be a {expected.__name__}, not {type_name(value)}"
+            problems.append(Problem("", where, message))
+        elif expected is int and isinstance(value, int) and value < 1:
+            problems.append(Problem("", where, "must be at least 1"))
+        elif option == "typing":
+            problems.extend(check_typing(value, where))
+    return problems
+
+
+def check_expect(expect: Any, location: str) -> List[Problem]:
+    """Checks one item of `expect`.
+
+    Args:
+        expect (Any): The item.
+        location (str): Where the item is in the file.
+
+    Returns:
+        List[Problem]: What is wrong with it. Problems have no path yet.
+    """
+    if isinstance(expect, str):
+        return []
+    return [Problem("", location, f"must be a string, not {type_name(expect)}")]
+
+
+def check_list(check: Callable[[Any, str], List[Problem]]) -> Callable:
+    """Makes a check for a list, from a check for its items."""
+
+    def check_items(value: Any, location: str) -> List[Problem]:
+        if not isinstance(value, list):
+            message = f"must be a list, not {type_name(value)}"
+            return [Problem("", location, message)]
+        problems = []
+        for index, item in enumerate(value):
+            problems.extend(check(item, f"{location}[{index}]"))
+        return problems
+
+    return check_items
+
+
+def check_seed(seed: Any, location: str) -> List[Problem]:
+    """Checks the `seed`, like `funcmodule.check_seed()`."""
+    try:
+        funcmodule.check_seed(seed)
+    except TypeError as error:
+        return [Problem("", location, str(error))]
+    return []
+
+
+def check_typing(options: Any, location: str) -> List[Problem]:
+    """Checks typing options, like `typing_profile.check_typing()`.
+
+    Args:
+        options (Any): The options of a script or of a command.
+        location (str): Where the options are in the file.
+
+    Returns:
+        List[Problem]: What is wrong with them, one problem per option.
+    """
+    if not isinstance(options, dict):
+        return [Problem("", location, f"must be a mapping, not {type_name(options)}")]
+    problems = []
+    for option, value in options.items():
+        try:
+            typing_profile.check_typing({option: value})
+        except (TypeError, ValueError) as error:
+            problems.append(Problem("", f"{location}.{option}", str(error)))
+    return problems
+
+
+# How the value of every key is checked.
+SCHEMA: Dict[str, Callable[[Any, str], List[Problem]]] = {
+    "commands": check_list(check_command),
+    "expect": check_list(check_expect),
+    "seed": check_seed,
+    "typing": check_typing,
+}
+
+
+def validate(conf: Any, prefix: str = "") -> List[Problem]:
+    """Checks a parsed configuration file.
+
+    Args:
+        conf (Any): The parsed file, or one of its documents.
+        prefix (str): Added in front of every location.
+
+    Returns:
+        List[Problem]: Every problem found. Problems have no path yet.
+    """
+    if not isinstance(conf, dict):
+        return [Problem("", prefix, f"must be a mapping, not {type_name(conf)}")]
+
+    problems = []
+    for key in funcmodule.REQUIRED_KEYS:
+        if key not in conf:
+            problems.append(Problem("", prefix, f"missing the `{key}` key"))
+    for key, value in conf.items():
+        check = SCHEMA.get(key)
+        if check is None:
+            problems.append(Problem("", f"{prefix}{key}", "unknown key"))
+        else:
+            problems.extend(check(value, f"{prefix}{key}"))
+
+    commands, expect = conf.get("commands"), conf.get("expect")
+    if isinstance(commands, list) and isinstance(expect, list):
+        if len(commands) != len(expect):
+            problems.append(
+                Problem(
+                    "",
+                    prefix,
+                    f"{len(commands)} commands but {len(expect)} `expect` items",
+                )
+            )
+    return problems
+
+
+def validate_file(
+    path: Union[str, pathlib.Path], stream: bool = False
+) -> List[Problem]:
+    """Checks a configuration file.
+
+    Files made of many YAML documents can only be run with ``--stream``
+    (see `steps.StepStream`). They are a problem unless `stream` is set.
+    Only the first document can have the keys in `funcmodule.SCRIPT_KEYS`.
+
+    Args:
+        path (str/pathlib.Path): The file.
+        stream (bool): Whether or not the file is run with ``--stream``.
+
+    Returns:
+        List[Problem]: Every problem found.
+    """
+    problems: List[Problem] = []
+    try:
+        with open(path, "rb") as script:
+            documents = list(yaml.load_all(script, Loader=funcmodule.yaml_loader()))
+    except OSError as error:
+        return [Problem(str(path), "", error.strerror or str(error))]
+    except yaml.YAMLError as error:
+        mark = getattr(error, "problem_mark", None)
+        location = f"line {mark.line + 1}" if mark is not None else ""
+        return [Problem(str(path), location, f"invalid YAML: {error}")]
+
+    if not documents:
+        return [Problem(str(path), "", "empty file")]
+    if len(documents) > 1 and not stream:
+        message = f"{len(documents)} YAML documents, which are only run with --stream"
+        problems.append(Problem("", "", message))
+    for index, document in enumerate(documents):
+        prefix = f"document {index + 1}: " if len(documents) > 1 else ""
+        problems.extend(validate(document, prefix))
+        if not index or not isinstance(document, dict):
+            continue
+        for key in funcmodule.SCRIPT_KEYS:
+            if key in document:
+                message = "only allowed in the first document"
+                problems.append(Problem("", prefix + key, message))
+
+    return [problem._replace(path=str(path)) for problem in problems]
+
+
+def validate_files(
+    paths: Iterable[pathlib.Path], jobs: Union[int, None] = None, stream: bool = False
+) -> List[Problem]:
+    """Checks many configuration files in parallel.
+
+    Args:
+        paths (Iterable[pathlib.Path]): The files.
+        jobs (int, optional): How many processes check files. Defaults
+            to the number of CPU cores. With 1, files are checked in
+            this process.
+        stream (bool): Whether or not the files are run with ``--stream``.
+            See `validate_file()`.
+
+    Returns:
+        List[Problem]: Every problem found, in the order of `paths`.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    paths = list(paths)
+    jobs = jobs or batch.default_jobs()
+    check = functools.partial(validate_file, stream=stream)
+    if jobs == 1 or len(paths) < 2:
+        results: Iterable[List[Problem]] = map(check, paths)
+        return [problem for result in results for problem in result]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Checking a file is quick. Sending many at once to each worker
+        # keeps them from waiting on this process.
+        chunksize = max(1, len(paths) // (4 * jobs))
+        results = executor.map(check, paths, chunksize=chunksize)
+        return [problem for result in results for problem in result]
+
+
+def format_json(problems: List[Problem], checked: int) -> str:
+    """Reports problems in a machine-readable way.
+
+    Args:
+        problems (List[Problem]): What `validate_files()` returned.
+        checked (int): How many files were checked.
+
+    Returns:
+        str: A JSON document with the number of files checked and
+            every problem, with its `path`, `location` and `message`.
+    """
+    return json.dumps(
+        {
+            "checked": checked,
+            "valid": not problems,
+            "problems": [problem._asdict() for problem in problems],
+        },
+        indent=2,
+    )
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""Batch generation of keystroke timelines.
+
+This module plans typing the same way `human_typing.plan_sentence()`
+does, with the same distributions for delays, pauses and typos. The
+difference is that every random number needed for a sentence, or for
+a whole script, is drawn at once using ``numpy``. The tables of the
+profile's layout (see `layouts`) are turned into arrays, so that the
+delay classes and typos of every keystroke are looked up at once.
+
+``numpy`` is optional. When it is not installed, every function in
+this module falls back to the pure-Python planner from `human_typing`.
+Both planners draw from the same distributions, but not the same
+numbers: a seed gives reproducible plans with either of them, not the
+same plan.
+
+## Example
+
+```python
+from runner import vectorized
+timelines = vectorized.plan_script(["ls -a", "echo 'Hello, World!'"])
+```
+"""
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from runner import human_typing, layouts
+from runner.timeline import Timeline
+from runner.typing_profile import DEFAULT_PROFILE, TypingProfile
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment.
+    np = None  # type: ignore
+
+# Ranges used by `human_typing` with the default profile, in the order
+# in which they are drawn. Bounds are inclusive, like `random.randint()`.
+_TYPO_PERCENT, _TYPO_ROLL, _TYPO_PICK = 0, 1, 2
+_DELAY, _FASTER = 3, 4
+_PAUSE_PERCENT, _PAUSE_ROLL, _PAUSE_MS = 5, 6, 7
+_BACKSPACE_DELAY, _BACKSPACE_FASTER, _FIX_DELAY, _FIX_FASTER = 8, 9, 10, 11
+_RANGES: Tuple[Tuple[int, int], ...] = (
+    (1, 4),  # is_typo(): error percent.
+    (1, 100),  # is_typo(): roll.
+    (0, 0),  # pick_typo(): index, upper bound depends on the letter.
+    (120, 170),  # get_delay(): average delay.
+    (30, 60),  # get_delay(): hand alternation.
+    (20, 30),  # is_pause(): pause percent.
+    (1, 100),  # is_pause(): roll.
+    (500, 1000),  # pause_time().
+    (120, 170),  # get_delay(typo, "\b").
+    (30, 60),  # get_delay(typo, "\b"): hand alternation.
+    (120, 170),  # get_delay(typo, next_letter).
+    (30, 60),  # get_delay(typo, next_letter): hand alternation.
+)
+
+_SPACE: int = ord(" ")
+_BACKSPACE: int = ord("\b")
+
+
+def available() -> bool:
+    """Checks if the ``numpy`` backend can be used.
+
+    Returns:
+        bool: Whether or not ``numpy`` could be imported.
+    """
+    return np is not None
+
+
+def _build_tables(layout: layouts.Layout) -> Dict[str, Any]:
+    """Turns the tables of a layout into the arrays used by the planner.
+
+    Args:
+        layout (layouts.Layout): The layout.
+
+    Returns:
+        dict: The bigram delay classes (1 for hand alternation, 0
+            otherwise), the number of plausible typos for each key,
+            and the plausible typos themselves.
+    """
+    size = layouts.TABLE_SIZE
+    tables = layout.tables
+    bigram_class = np.frombuffer(tables.bigram_classes, dtype=np.uint8)
+    bigram_class = bigram_class.reshape(size, size).astype(np.int64)
+
+    width = max(len(typos) for typos in tables.typos)
+    typo_count = np.zeros(size, dtype=np.int64)
+    typo_choices = np.zeros((size, max(width, 1)), dtype=np.int64)
+    for letter, typos in enumerate(tables.typos):
+        typo_count[letter] = len(typos)
+        typo_choices[letter, : len(typos)] = [ord(typo) for typo in typos]
+
+    return {
+        "bigram_class": bigram_class,
+        "typo_count": typo_count,
+        "typo_choices": typo_choices,
+    }
+
+
+# Arrays of every layout used so far.
+_TABLES: Dict[layouts.Layout, Dict[str, Any]] = {}
+
+
+def _tables(layout: layouts.Layout) -> Dict[str, Any]:
+    """Returns the arrays of a layout, building them on first use."""
+    tables = _TABLES.get(layout)
+    if tables is None:
+        tables = _TABLES[layout] = _build_tables(layout)
+    return tables
+
+
+def _letters(sentence: str) -> List[str]:
+    """Splits a sentence in letters and makes sure it ends with a newline."""
+    if not isinstance(sentence, str):
+        raise TypeError(f"Cannot type a {type(sentence)}.")
+    letters = list(sentence)
+    if not letters or letters[-1] != "\n":
+        letters.append("\n")
+    return letters
+
+
+def plan_script(
+    sentences: Sequence[str], rng: Any = None, profile: Optional[TypingProfile] = None
+) -> List[Timeline]:
+    """Plans how every sentence of a script will be typed.
+
+    Every random number required for the whole script is drawn in a
+    single call to the generator.
+
+    Args:
+        sentences (Sequence[str]): What will be typed. Each sentence
+            gets its own timeline.
+        rng (numpy.random.Generator/random.Random/int, optional): The
+            random number generator to use, or the seed of a new one. A
+            new one is created if omitted. A `random.Random` is used
+            by the pure-Python planner, as is a seed without ``numpy``.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
+
+    Raises:
+        TypeError: If one of the sentences is not of type `str`.
+
+    Returns:
+        List[Timeline]: One timeline per sentence.
+    """
+    profile = profile or DEFAULT_PROFILE
+    if np is None or profile.fast or isinstance(rng, random.Random):
+        # Nothing is drawn for `fast` profiles.
+        if isinstance(rng, int):
+            rng = random.Random(rng)
+        return [
+            human_typing.plan_sentence(sentence, rng, profile)
+            for sentence in sentences
+        ]
+    if not sentences:
+        return []
+    if rng is None or isinstance(rng, int):
+        rng = np.random.default_rng(rng)
+
+    split = [_letters(sentence) for sentence in sentences]
+    letters = [letter for sentence in split for letter in sentence]
+    lengths = np.array([len(sentence) for sentence in split], dtype=np.int64)
+    total = len(letters)
+
+    codes = np.fromiter((layouts.code(letter) for letter in letters), np.int64, total)
+    # The first letter of a sentence is its own previous letter.
+    previous = np.roll(codes, 1)
+    starts = np.cumsum(lengths) - lengths
+    previous[starts] = codes[starts]
+
+    tables = _tables(profile.layout)
+    typo_count = tables["typo_count"][codes]
+    ranges = list(_RANGES)
+    ranges[_TYPO_PERCENT] = profile.typo_percent
+    ranges[_PAUSE_PERCENT] = profile.pause_percent
+    lows = np.array([low for low, _ in ranges], dtype=np.int64)[:, None]
+    highs = np.repeat(
+        np.array([high for _, high in ranges], dtype=np.int64)[:, None], total, 1
+    )
+    highs[_TYPO_PICK] = np.maximum(typo_count - 1, 0)
+    draws = rng.integers(lows, highs, endpoint=True)
+
+    bigram_class = tables["bigram_class"]
+    is_space = codes == _SPACE
+
+    # Delay before each letter.
+    delay = draws[_DELAY] - draws[_FASTER] * bigram_class[previous, codes]
+    pause = np.where(
+        draws[_PAUSE_ROLL] <= draws[_PAUSE_PERCENT], draws[_PAUSE_MS], 0
+    )
+    scale = profile.delay_scale
+    before = np.where(is_space, pause / profile.speed, delay * scale) / 1000
+
+    # Typos, with the backspace and the correction.
+    typo = (draws[_TYPO_ROLL] <= draws[_TYPO_PERCENT]) & (typo_count > 0)
+    typo_codes = tables["typo_choices"][codes, draws[_TYPO_PICK]]
+    backspace = (
+        draws[_BACKSPACE_DELAY]
+        - draws[_BACKSPACE_FASTER] * bigram_class[typo_codes, _BACKSPACE]
+    )
+    fix = draws[_FIX_DELAY] - draws[_FIX_FASTER] * bigram_class[typo_codes, codes]
+
+    counts = 1 + 2 * typo
+    event_starts = np.cumsum(counts) - counts
+    increments = np.zeros(int(counts.sum()))
+    increments[event_starts] = before
+    increments[event_starts[typo] + 1] = backspace[typo] * scale / 1000
+    increments[event_starts[typo] + 2] = fix[typo] * scale / 1000
+
+    # Offsets restart at 0 for each sentence.
+    sentence_events = np.add.reduceat(counts, starts)
+    bounds = np.concatenate(([0], np.cumsum(sentence_events)))
+
+    timelines: List[Timeline] = []
+    for index, sentence in enumerate(split):
+        first, last = bounds[index], bounds[index + 1]
+        offsets = np.cumsum(increments[first:last])
+        chunks: List[bytes] = []
+        sentence_start = starts[index]
+        for position, letter in enumerate(sentence):
+            letter_index = sentence_start + position
+            if typo[letter_index]:
+                chunks.append(chr(typo_codes[letter_index]).encode())
+                chunks.append(b"\b")
+            chunks.append(letter.encode())
+        timelines.append(Timeline.from_events(offsets.tolist(), chunks))
+
+    return timelines
+
+
+def plan_sentence(
+    sentence: str, rng: Any = None, profile: Optional[TypingProfile] = None
+) -> Timeline:
+    """Plans how a full sentence will be typed.
+
+    Same as `human_typing.plan_sentence()`, but uses ``numpy`` to draw
+    the random numbers when it is available.
+
+    Args:
+        sentence (str): What will be typed.
+        rng (numpy.random.Generator/random.Random/int, optional): The
+            random number generator to use, or the seed of a new one. See
+            `plan_script()`.
+        profile (TypingProfile, optional): The typing model's
+            parameters. Defaults to `DEFAULT_PROFILE`.
+
+    Raises:
+        TypeError: If `sentence` is not of type `str`.
+
+    Returns:
+        Timeline: Every keystroke required to type `sentence`, typos
+            included.
+    """
+    return plan_script([sentence], rng, profile)[0]
@@ -0,0 +1,36 @@
+"""Stand-ins shared by the tests."""
+from runner import classmodule
+from runner.clock import REAL_CLOCK
+
+
+class RecordingChild:
+    """Stands in for a `pexpect` child. Keeps what it is sent and when.
+
+    Args:
+        clock: Used to stamp every send.
+    """
+
+    encoding = "utf-8"
+
+    def __init__(self, clock=REAL_CLOCK):
+        self.clock = clock
+        self.sent = []
+        self.stamps = []
+
+    def send(self, data):
+        self.stamps.append(self.clock.now())
+        self.sent.append(data)
+
+
+class ListSink(classmodule.OutputSink):
+    """Keeps everything written to it, and counts flushes."""
+
+    def __init__(self):
+        self.written = []
+        self.flushes = 0
+
+    def write(self, data):
+        self.written.append(data)
+
+    def flush(self):
+        self.flushes += 1
@@ -0,0 +1,46 @@
+import pathlib
+
+import pytest
+from runner import batch
+
+CONFIGPATH = pathlib.Path("./tests/examples")
+
+
+def test_expand_paths(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("a.yaml", "b.yml", "sub/c.yaml", "notes.txt"):
+        (tmp_path / name).write_text("")
+
+    found = batch.expand_paths([str(tmp_path), str(tmp_path / "*.yaml")])
+
+    assert found == [tmp_path / "a.yaml", tmp_path / "sub/c.yaml", tmp_path / "b.yml"]
+
+
+def test_expand_paths_raises_on_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        batch.expand_paths([str(tmp_path / "missing.yaml")])
+
+
+def test_log_paths_are_unique(tmp_path):
+    scripts = [pathlib.Path("a/demo.yaml"), pathlib.Path("b/demo.yaml")]
+    assert batch.log_paths(scripts, tmp_path) == [
+        tmp_path / "demo.log",
+        tmp_path / "demo-1.log",
+    ]
+
+
+def test_run_batch(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    good = tmp_path / "good.yaml"
+    good.write_text("commands:\n  - 'true'\nexpect:\n  - prompt\nseed: 1\n")
+    scripts = [good, CONFIGPATH / "bad_conf_type.yaml"]
+
+    results = batch.run_batch(
+        scripts, jobs=2, log_dir=tmp_path / "logs", cache_dir=tmp_path / "cache"
+    )
+
+    assert [result.path for result in results] == scripts
+    assert results[0].ok
+    assert not results[1].ok and "TypeError" in results[1].error
+    assert "TypeError" in results[1].log_path.read_text()
+    assert "1 failed" in batch.format_summary(results)
@@ -0,0 +1,35 @@
+import json
+
+from benchmarks import run
+from benchmarks.fake_child import FakeCommands
+from runner import classmodule
+from runner.clock import VirtualClock
+
+
+def test_fake_child_records_sends():
+    commands = FakeCommands(
+        ["echo hello", "ls"],
+        ["prompt", "prompt"],
+        sink=classmodule.NullSink(),
+        clock=VirtualClock(),
+    )
+    commands.run()
+
+    typed = "".join(data for _, data in commands.child.sends)
+    # Typos are corrected, so there can be more keystrokes than letters.
+    assert typed.count("\n") == 2
+    assert len(typed) >= len("echo hello\nls\n")
+    times = [sent for sent, _ in commands.child.sends]
+    assert times == sorted(times)
+    assert not commands.child.isalive()
+
+
+def test_patched_benchmarks(tmp_path, capsys):
+    output = tmp_path / "results.jsonl"
+    run.main(["--mode", "patched", "--size", "2", "--output", str(output)])
+    run.main(["--mode", "patched", "--size", "2", "--output", str(output)])
+
+    runs = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [entry["mode"] for entry in runs] == ["patched", "patched"]
+    assert runs[0]["results"]["type_sentence_keystrokes_per_second"] > 0
+    assert "%)" in capsys.readouterr().out
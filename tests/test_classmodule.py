@@ -0,0 +1,258 @@
+import asyncio
+import threading
+
+import pexpect
+import pytest
+from hypothesis import given, strategies as st
+
+from runner import classmodule
+from runner.clock import VirtualClock
+from runner.typing_profile import TypingProfile
+from tests.fakes import ListSink
+
+
+def test_get_pattern():
+    todo = classmodule.Commands([], [])
+    assert todo.get_pattern("prompt") == classmodule.PROMPT_PATTERN
+    assert todo.get_pattern("assword") == "assword"
+
+
+def test_run_concurrently(monkeypatch, capsys, tmp_path):
+    # Skipping the user's rc files keeps shells fast to start.
+    monkeypatch.setenv("HOME", str(tmp_path))
+    sessions = [
+        classmodule.Commands(
+            [f"echo session-{index}"],
+            ["prompt"],
+            typing_profile=TypingProfile(fast=True),
+        )
+        for index in range(3)
+    ]
+
+    asyncio.run(classmodule.run_concurrently(sessions, limit=2))
+
+    output = capsys.readouterr().out
+    for index in range(3):
+        assert f"session-{index}" in output
+
+
+def test_batching_sink_size_threshold():
+    target = ListSink()
+    sink = classmodule.BatchingSink(target, max_chars=4, max_delay=60)
+
+    for letter in "abc":
+        sink.write(letter)
+        sink.flush()
+    assert target.written == []
+
+    sink.write("d")
+    sink.flush()
+    assert target.written == ["abcd"]
+
+    sink.write("e")
+    sink.close()
+    assert target.written == ["abcd", "e"]
+
+
+def test_batching_sink_delay_threshold(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(classmodule.time, "monotonic", lambda: now[0])
+    target = ListSink()
+    sink = classmodule.BatchingSink(target, max_chars=1000, max_delay=0.1)
+
+    sink.write("a")
+    sink.flush()
+    now[0] = 0.2
+    sink.write("b")
+    sink.flush()
+
+    assert target.written == ["ab"]
+
+
+def test_file_sink(tmp_path):
+    sink = classmodule.FileSink(tmp_path / "out.log")
+    sink.write("héllo\n")
+    sink.close()
+    assert (tmp_path / "out.log").read_text(encoding="utf-8") == "héllo\n"
+
+
+def test_secret_switches_sink_back_on_error():
+    target = ListSink()
+    todo = classmodule.Commands([], [], sink=target)
+
+    class BrokenChild:
+        def send(self, data):
+            todo.sink.write(data)
+            raise OSError("closed")
+
+    try:
+        todo.fake_typing_secret(BrokenChild(), "hunter2")
+    except OSError:
+        pass
+
+    assert todo.sink.target is target
+    assert target.written == []
+
+
+@given(st.text(), st.integers(min_value=4, max_value=64))
+def test_paste_chunks(text, size):
+    chunks = classmodule.paste_chunks(text, size)
+
+    assert "".join(chunks) == text
+    assert all(len(chunk.encode()) <= size for chunk in chunks)
+
+
+def test_paste(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    lines = "\n".join(f"line {index}" for index in range(2000))
+    heredoc = f"cat > {tmp_path / 'pasted.txt'} <<'EOF'\n{lines}\nEOF"
+    todo = classmodule.Commands(
+        [{"command": heredoc, "paste": True}], ["prompt"], sink=ListSink()
+    )
+
+    todo.run()
+
+    assert (tmp_path / "pasted.txt").read_text() == lines + "\n"
+
+
+def test_drained_output_is_in_before():
+    child = pexpect.spawn("cat", encoding="utf-8", echo=False)
+    todo = classmodule.Commands([], [])
+
+    child.send("first\n")
+    todo.drain(child)
+    child.send("second\n")
+    child.expect("second")
+
+    assert child.before == "first\r\n"
+    child.close()
+
+
+def test_prompt_is_detected_with_the_sentinel(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    sink = ListSink()
+    # Output that looks like a prompt must not end the wait.
+    todo = classmodule.Commands(
+        [
+            {
+                "command": f"echo '100% $ #'; sleep 0.2; touch {tmp_path / 'done'}",
+                "paste": True,
+            },
+            {"command": "false", "paste": True},
+        ],
+        ["prompt", "prompt"],
+        sink=sink,
+    )
+
+    todo.run()
+
+    assert (tmp_path / "done").exists()
+    assert todo.statuses == [0, 1]
+
+
+@pytest.mark.parametrize("backend", ["pexpect", "pty"])
+def test_prompts_are_written_before_commands(monkeypatch, tmp_path, backend):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / ".bashrc").write_text("PS1='my-prompt> '\n")
+    sink = ListSink()
+    todo = classmodule.Commands(
+        ["echo one", "echo two"],
+        ["prompt", "prompt"],
+        sink=sink,
+        typing_profile=TypingProfile(fast=True),
+        backend=backend,
+    )
+
+    todo.run()
+
+    output = "".join(sink.written)
+    assert output.count("my-prompt> ") == 3
+    assert output.index("my-prompt> ") < output.index("echo one")
+    second = output.index("my-prompt> ", output.index("one\r\n"))
+    assert second < output.index("echo two")
+
+
+def test_wait_for_prompt_without_sentinel():
+    child = classmodule.pexpect.spawn(
+        "bash", ["--norc"], echo=False, encoding="utf-8"
+    )
+    assert classmodule.wait_for_prompt(child) is None
+    child.close()
+
+
+def test_failed_runs_close_the_shell(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("GOOD_BOT_UNSET", raising=False)
+    spawned = []
+    spawn_shell = classmodule.spawn_shell
+
+    def recorded_shell(**kwargs):
+        spawned.append(spawn_shell(**kwargs))
+        return spawned[-1]
+
+    monkeypatch.setattr(classmodule, "spawn_shell", recorded_shell)
+    todo = classmodule.Commands(
+        [{"command": "true", "paste": True}, {"password": "GOOD_BOT_UNSET"}],
+        ["prompt", "prompt"],
+        sink=ListSink(),
+        background_reader=True,
+    )
+
+    with pytest.raises(ValueError):
+        todo.run()
+    with pytest.raises(ValueError):
+        asyncio.run(todo.run_async())
+
+    assert len(spawned) == 2
+    assert not any(child.isalive() for child in spawned)
+    assert todo.reader is None
+
+
+def test_run_async_does_not_block_on_paste_or_secrets(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("GOOD_BOT_SECRET", "hunter2")
+    lines = "\n".join(f"line {index}" for index in range(2000))
+    heredoc = f"cat > {tmp_path / 'pasted.txt'} <<'EOF'\n{lines}\nEOF"
+    todo = classmodule.Commands(
+        [
+            {"command": heredoc, "paste": True},
+            "read -s secret",
+            {"password": "GOOD_BOT_SECRET"},
+        ],
+        # The shell waits for the secret without printing anything.
+        ["prompt", "", "prompt"],
+        sink=ListSink(),
+        typing_profile=TypingProfile(fast=True),
+    )
+    threads = set()
+    drain = todo.drain
+
+    def recorded_drain(child):
+        threads.add(threading.current_thread())
+        drain(child)
+
+    todo.drain = recorded_drain
+
+    asyncio.run(todo.run_async())
+
+    assert (tmp_path / "pasted.txt").read_text() == lines + "\n"
+    assert todo.statuses == [0, None, 0]
+    assert threads and threading.main_thread() not in threads
+    assert not any("hunter2" in data for data in todo.sink.target.written)
+
+
+def test_secrets_wait_in_real_time(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(classmodule.time, "sleep", sleeps.append)
+    todo = classmodule.Commands([], [], sink=ListSink(), clock=VirtualClock())
+
+    class Child:
+        def send(self, data):
+            self.sent = data
+
+    child = Child()
+    todo.fake_typing_secret(child, "hunter2")
+
+    # Skipping it could send the secret before echo is turned off.
+    assert sleeps == [classmodule.DELAY_BEFORE_SEND]
+    assert child.sent == "hunter2\n"
@@ -0,0 +1,103 @@
+import asyncio
+
+from runner import human_typing
+from runner.clock import Clock, VirtualClock
+from runner.recording import TypescriptRecorder
+from tests.fakes import RecordingChild
+
+
+def test_virtual_clock_skips_sleeps():
+    clock = VirtualClock()
+    start = clock.now()
+
+    clock.sleep(300)
+    asyncio.run(clock.sleep_async(60))
+
+    assert 360 <= clock.now() - start < 361
+
+
+def test_play_timeline_with_virtual_clock():
+    """Keystrokes are stamped with the planned offsets."""
+    clock = VirtualClock()
+    child = RecordingChild(clock)
+    timeline = human_typing.plan_sentence("echo 'hello world'")
+    start = clock.now()
+
+    human_typing.play_timeline(child, timeline, clock)
+
+    stamps = [stamp - start for stamp in child.stamps]
+    offsets = [offset for offset, _ in timeline.bursts()]
+    assert len(stamps) == len(offsets)
+    for stamp, offset in zip(stamps, offsets):
+        assert offset <= stamp < offset + 0.5
+
+
+class OvershootingClock(VirtualClock):
+    """Wakes up 10 ms late, like a real clock on a very busy machine."""
+
+    def sleep_until(self, deadline):
+        self.sleep(deadline - self.now() + 0.01)
+
+
+def test_sleep_until_is_never_early():
+    clock = Clock()
+    for _ in range(20):
+        deadline = clock.now() + 0.003
+        clock.sleep_until(deadline)
+        assert deadline <= clock.now() < deadline + 0.05
+
+
+def test_sleep_until_async_does_not_poll(monkeypatch):
+    clock = Clock()
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def recording_sleep(seconds):
+        sleeps.append(seconds)
+        await real_sleep(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", recording_sleep)
+    deadline = clock.now() + 0.01
+    asyncio.run(clock.sleep_until_async(deadline))
+
+    assert len(sleeps) == 1 and sleeps[0] > 0.005
+    assert clock.now() >= deadline - 0.001
+
+
+def test_virtual_sleep_until():
+    clock = VirtualClock()
+    deadline = clock.now() + 300
+    clock.sleep_until(deadline)
+    asyncio.run(clock.sleep_until_async(deadline + 60))
+    clock.sleep_until(deadline)
+
+    assert deadline + 60 <= clock.now() < deadline + 61
+
+
+def test_play_timeline_does_not_drift():
+    """Being late for a keystroke does not delay the following ones."""
+    clock = OvershootingClock()
+    child = RecordingChild(clock)
+    timeline = human_typing.plan_sentence("echo 'hello world'" * 5)
+    start = clock.now()
+
+    human_typing.play_timeline(child, timeline, clock)
+
+    offsets = [offset for offset, _ in timeline.bursts()]
+    for stamp, offset in zip(child.stamps, offsets):
+        assert offset + 0.01 <= stamp - start < offset + 0.02
+
+
+def test_typescript_recorder(tmp_path):
+    clock = VirtualClock()
+    recorder = TypescriptRecorder(tmp_path / "demo", clock=clock)
+    recorder.write("ls\n")
+    clock.sleep(1.5)
+    recorder.write("é")
+    recorder.close()
+
+    assert (tmp_path / "demo").read_bytes().split(b"\n", 1)[1] == "ls\né".encode()
+    timing = (tmp_path / "demo.timing").read_text()
+    delays = [line.split() for line in timing.splitlines()]
+    assert [int(size) for _, size in delays] == [3, 2]
+    assert 1.5 <= float(delays[1][0]) < 1.6
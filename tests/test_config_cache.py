@@ -0,0 +1,118 @@
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from runner import cli, funcmodule
+from runner import config_cache
+from runner.config_cache import ConfigCache
+
+SCRIPT = "commands:\n  - ls\nexpect:\n  - prompt\nseed: 3\n"
+
+
+def test_cache_round_trip(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT)
+    cache = ConfigCache(tmp_path / "cache")
+
+    assert cache.get(script) is None
+    cache.put(script, script.stat(), {"commands": ["ls"]})
+    assert cache.get(script) == {"commands": ["ls"]}
+
+
+def test_failed_writes_leave_nothing(tmp_path, monkeypatch):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT)
+    cache = ConfigCache(tmp_path / "cache")
+
+    def replace(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(config_cache.os, "replace", replace)
+    cache.put(script, script.stat(), {"commands": ["ls"]})
+
+    assert cache.get(script) is None
+    cached = tmp_path / "cache"
+    assert not [path for path in cached.rglob("*") if path.is_file()]
+
+
+def test_changed_files_are_not_loaded_from_the_cache(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT)
+    cache = ConfigCache(tmp_path / "cache")
+    cache.put(script, script.stat(), {"commands": ["ls"]})
+
+    stat = script.stat()
+    os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.get(script) is None
+
+
+def test_values_marshal_cannot_store_are_not_cached(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT)
+    cache = ConfigCache(tmp_path / "cache")
+
+    cache.put(script, script.stat(), {"commands": [object()]})
+    assert cache.get(script) is None
+
+
+def test_load_config_skips_parsing(tmp_path, monkeypatch):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT)
+    cache = ConfigCache(tmp_path / "cache")
+
+    parsed = funcmodule.load_config(script, cache)
+    assert parsed == funcmodule.parse_config(script)
+
+    def fail(*args):
+        raise AssertionError("The script was parsed again.")
+
+    monkeypatch.setattr(funcmodule, "parse_config", fail)
+    assert funcmodule.load_config(script, cache) == parsed
+
+
+def test_load_config_does_not_cache_invalid_scripts(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT + "unknown: 1\n")
+    cache = ConfigCache(tmp_path / "cache")
+
+    with pytest.raises(KeyError):
+        funcmodule.load_config(script, cache)
+    assert cache.get(script) is None
+
+
+def test_run_confirms_unusual_values_every_time(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    script = tmp_path / "script.yaml"
+    script.write_text("commands:\n  - 42\nexpect:\n  - prompt\n")
+    options = [str(script), "--no-docker", "--no-prespawn"]
+    options += ["--cache-dir", str(tmp_path / "cache")]
+
+    first = CliRunner().invoke(cli.gb_run, options, input="yes\n")
+    # The script is cached now, but the answer is not.
+    second = CliRunner().invoke(cli.gb_run, options, input="no\n")
+
+    assert "Quitting..." not in first.output
+    assert "Quitting..." in second.output
+
+
+def test_run_rejects_mismatched_lengths(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text("commands:\n  - ls\n  - ls\nexpect:\n  - prompt\n")
+
+    result = CliRunner().invoke(
+        cli.gb_run, [str(script), "--no-docker", "--no-prespawn", "--no-cache"]
+    )
+
+    assert isinstance(result.exception, ValueError)
+
+
+def test_entries_of_other_versions_are_not_loaded(monkeypatch, tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT)
+    cache = ConfigCache(tmp_path / "cache")
+    monkeypatch.setattr(config_cache, "CONFIG_CACHE_VERSION", 1)
+    cache.put(script, script.stat(), {"commands": ["ls"]})
+
+    monkeypatch.undo()
+    assert cache.get(script) is None
@@ -23,6 +23,15 @@ class TestConfigTest(unittest.TestCase):
         with self.assertRaises(KeyError):
             funcmodule.check_config(bad_key)
 
+    def test_accepts_seed(self):
+        seeded = {"commands": ["ls"], "expect": ["prompt"], "seed": 42}
+        funcmodule.check_config(seeded)
+
+    def test_raises_bad_seed(self):
+        bad_seed = {"commands": ["ls"], "expect": ["prompt"], "seed": "42"}
+        with self.assertRaises(TypeError):
+            funcmodule.check_config(bad_seed)
+
 
 class TestParsing(unittest.TestCase):
     def test_returns_dict(self):
@@ -80,6 +89,15 @@ class TestNoInteractionChecker(unittest.TestCase):
                 CONFIGPATH / "bad_conf_key_names.yaml"
             )
 
+    def test_raises_length_mismatch(self):
+        """
+        Every command needs something to expect after it.
+        """
+        with self.assertRaises(ValueError):
+            funcmodule.check_config_no_interaction(
+                {"commands": ["ls", "pwd"], "expect": ["prompt"]}
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
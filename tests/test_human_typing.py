@@ -1,5 +1,6 @@
 from hypothesis import given, strategies as st
-from runner import human_typing
+from runner import human_typing, layouts
+from tests.fakes import RecordingChild
 
 
 def test_pause_time():
@@ -18,16 +19,18 @@ def test_pause_time():
 def test_pick_typo(character):
     """Making sure that it only returns defined typos.
 
-    Typos are defined in the `PLAUSIBLE_TYPOS` variable.
+    Typos are the neighbours of the key on the layout, in the same
+    shift state.
     """
     typo = human_typing.pick_typo(character)
-    if character not in list(human_typing.PLAUSIBLE_TYPOS.keys()):
+    plausible = layouts.QWERTY.typos_for(character)
+    if not plausible:
         # There shouldn't be a typo since none is defined.
         assert not typo
     else:
         if typo:
             # There isn't necessarily a typo each time.
-            assert typo in human_typing.PLAUSIBLE_TYPOS[character]
+            assert typo in plausible
         else:
             assert typo == None
 
@@ -49,3 +52,41 @@ def test_get_delay(previous, to_send):
     delay = human_typing.get_delay(previous, to_send)
     assert delay > 0
     assert 0.06 <= delay <= 0.170  # Since delay is in seconds.
+
+
+def replay(events):
+    """Applies backspaces to a list of keystrokes."""
+    typed = []
+    for data in events:
+        if data == "\b":
+            typed.pop()
+        else:
+            typed.append(data)
+    return "".join(typed)
+
+
+@given(
+    st.text(
+        alphabet=st.characters(blacklist_categories=("Cs",), blacklist_characters="\b")
+    )
+)
+def test_plan_sentence(sentence):
+    """Once typos are corrected, a plan types exactly the sentence."""
+    timeline = human_typing.plan_sentence(sentence)
+    events = [data.decode() for _, data in timeline]
+    expected = sentence if sentence.endswith("\n") else sentence + "\n"
+
+    assert replay(events) == expected
+    assert list(timeline.offsets) == sorted(timeline.offsets)
+
+
+def test_type_sentence_plays_plan(monkeypatch):
+    """`type_sentence()` sends every planned keystroke, in order."""
+    deadlines = []
+    monkeypatch.setattr(human_typing.REAL_CLOCK, "sleep_until", deadlines.append)
+    child = RecordingChild()
+
+    human_typing.type_sentence(child, "ls -a")
+
+    assert replay(child.sent) == "ls -a\n"
+    assert deadlines == sorted(deadlines) and deadlines[0] < deadlines[-1]
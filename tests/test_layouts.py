@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from runner import human_typing, layouts, validation
+from runner.typing_profile import DEFAULT_PROFILE, TypingProfile
+
+COLEMAK = {
+    "name": "colemak",
+    "rows": ["`1234567890-=", "qwfpgjluy;[]\\", "arstdhneio'", "zxcvbkm,./"],
+    "shifted": ["~!@#$%^&*()_+", "QWFPGJLUY:{}|", 'ARSTDHNEIO"', "ZXCVBKM<>?"],
+}
+
+
+def test_typos_cover_shell_characters():
+    assert layouts.QWERTY.typos_for("a") == "qwsz"
+    # Uppercase letters and symbols stay shifted.
+    assert layouts.QWERTY.typos_for("A") == "QWSZ"
+    assert layouts.QWERTY.typos_for("|") == "}"
+    assert set(layouts.QWERTY.typos_for("1")) == {"`", "2", "q"}
+    assert layouts.QWERTY.typos_for(" ") == ""
+    assert layouts.QWERTY.typos_for("\n") == ""
+    assert layouts.QWERTY.typos_for("ł") == ""
+
+
+def test_hands_and_bigram_classes():
+    qwerty = layouts.QWERTY
+
+    assert qwerty.hand("a") == qwerty.hand("G") == layouts.LEFT_HAND
+    assert qwerty.hand("6") == qwerty.hand("\n") == layouts.RIGHT_HAND
+    assert qwerty.hand(" ") == layouts.NO_HAND
+    assert qwerty.bigram_class("a", "l") == layouts.ALTERNATION
+    assert qwerty.bigram_class("a", "s") == layouts.SAME_HAND
+    assert qwerty.bigram_class("a", " ") == layouts.SAME_HAND
+    # "th" alternates on QWERTY, not on Dvorak.
+    assert qwerty.bigram_class("t", "h") == layouts.ALTERNATION
+    assert layouts.DVORAK.bigram_class("t", "h") == layouts.SAME_HAND
+
+
+def test_distance():
+    assert layouts.QWERTY.distance("f", "f") == 0
+    assert layouts.QWERTY.distance("f", "g") == 1
+    assert layouts.QWERTY.distance("f", "t") == pytest.approx(1.25)
+    assert layouts.QWERTY.distance("a", "é") == float("inf")
+    assert layouts.AZERTY.distance("a", "é") < layouts.NEIGHBOUR_DISTANCE
+
+
+def test_from_options():
+    colemak = layouts.from_options(COLEMAK)
+
+    assert colemak.name == "colemak"
+    assert colemak.typos_for("t") == "pgsdcv"
+    assert layouts.from_options("azerty") is layouts.AZERTY
+
+
+@pytest.mark.parametrize(
+    "options, error",
+    [
+        ("bepo", ValueError),
+        (3, TypeError),
+        ({**COLEMAK, "rows": "qwerty"}, TypeError),
+        ({**COLEMAK, "rows": [1, 2, 3, 4]}, TypeError),
+        ({**COLEMAK, "rows": COLEMAK["rows"][:3]}, ValueError),
+        ({**COLEMAK, "shifted": ["~"] * 4}, ValueError),
+        ({**COLEMAK, "colour": "red"}, ValueError),
+        ({"rows": COLEMAK["rows"], "shifted": COLEMAK["shifted"]}, ValueError),
+    ],
+)
+def test_from_options_errors(options, error):
+    with pytest.raises(error):
+        layouts.from_options(options)
+
+
+def test_profile_layout():
+    profile = DEFAULT_PROFILE.updated({"layout": "azerty", "typo_rate": 1})
+
+    assert profile.layout is layouts.AZERTY
+    assert DEFAULT_PROFILE.updated({"layout": "qwerty"}) == DEFAULT_PROFILE
+    assert layouts.AZERTY.typos_for("a") == "&ézq"
+    assert human_typing.pick_typo("a", random.Random(0), profile) in "&ézq"
+    assert repr(DEFAULT_PROFILE.updated({"layout": COLEMAK})) != repr(DEFAULT_PROFILE)
+
+
+def test_layouts_change_plans():
+    sentence = "echo 'hello world' && ls -la /home/someone/projects"
+    qwerty = human_typing.plan_sentence(sentence, random.Random(1))
+    dvorak = human_typing.plan_sentence(
+        sentence, random.Random(1), TypingProfile(layout=layouts.DVORAK)
+    )
+
+    assert qwerty != dvorak
+
+
+def test_validation():
+    conf = {
+        "commands": ["ls"],
+        "expect": ["prompt"],
+        "typing": {"layout": "bepo"},
+    }
+
+    assert [problem.location for problem in validation.validate(conf)] == [
+        "typing.layout"
+    ]
@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+import pexpect
+import pytest
+
+from runner import classmodule, human_typing
+from runner.clock import VirtualClock
+from runner.metrics import NULL_METRICS, Histogram, Metrics
+from tests.fakes import RecordingChild
+
+
+def test_histogram_buckets():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert list(histogram.cumulative()) == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(5.65)
+
+
+def test_span_records_even_on_errors():
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        with metrics.span("failing"):
+            raise ValueError()
+    assert metrics.histograms["failing"].count == 1
+
+
+def test_formats():
+    metrics = Metrics()
+    metrics.observe("expect", 0.2)
+    metrics.increment("timeouts")
+
+    report = json.loads(metrics.to_json())
+    assert report["histograms"]["expect"]["count"] == 1
+    assert report["histograms"]["expect"]["buckets"][-1] == ["+Inf", 1]
+    assert report["counters"] == {"timeouts": 1}
+
+    text = metrics.to_prometheus()
+    assert "# TYPE runner_expect_seconds histogram" in text
+    assert 'runner_expect_seconds_bucket{le="+Inf"} 1' in text
+    assert "runner_expect_seconds_count 1" in text
+    assert "runner_timeouts_total 1" in text
+
+
+def test_null_metrics_record_nothing():
+    NULL_METRICS.observe("expect", 1.0)
+    NULL_METRICS.increment("timeouts")
+    with NULL_METRICS.span("spawn"):
+        pass
+    assert not NULL_METRICS.enabled
+    assert NULL_METRICS.histograms == {} and NULL_METRICS.counters == {}
+
+
+def test_play_timeline_records_keystrokes():
+    metrics = Metrics()
+    timeline = human_typing.plan_sentence("ls -a")
+
+    human_typing.play_timeline(RecordingChild(), timeline, VirtualClock(), metrics)
+
+    assert metrics.histograms["keystroke_send"].count == len(list(timeline.bursts()))
+    assert metrics.histograms["typing_lag"].count == 1
+
+
+def test_commands_record_steps(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    metrics = Metrics()
+    todo = classmodule.Commands(
+        [{"command": "true", "paste": True}, {"command": "sleep 5", "paste": True}],
+        ["prompt", "never printed"],
+        sink=classmodule.NullSink(),
+        metrics=metrics,
+    )
+    spawn_shell = classmodule.spawn_shell
+
+    def impatient_shell(**kwargs):
+        child = spawn_shell(**kwargs)
+        child.timeout = 0.5
+        return child
+
+    monkeypatch.setattr(classmodule, "spawn_shell", impatient_shell)
+
+    with pytest.raises(pexpect.TIMEOUT):
+        todo.run()
+
+    assert metrics.histograms["spawn"].count == 1
+    assert metrics.histograms["prompt"].count == 1
+    assert metrics.histograms["typing"].count == 2
+    assert metrics.histograms["expect"].count == 2
+    assert metrics.counters["timeouts"] == 1
+
+
+def test_run_async_times_the_prompt(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    metrics = Metrics()
+    todo = classmodule.Commands(
+        [{"command": "true", "paste": True}],
+        ["prompt"],
+        sink=classmodule.NullSink(),
+        metrics=metrics,
+    )
+
+    asyncio.run(todo.run_async())
+
+    assert metrics.histograms["spawn"].count == 1
+    assert metrics.histograms["prompt"].count == 1
@@ -0,0 +1,44 @@
+import pstats
+import tracemalloc
+
+from runner import batch
+from runner.profiling import Profiler
+
+
+def busy():
+    return [str(number) for number in range(10000)]
+
+
+def test_profiler_writes_reports(tmp_path):
+    with Profiler(tmp_path / "demo.cast", memory=True) as profiler:
+        kept = busy()
+
+    assert profiler.stats_path == tmp_path / "demo.pstats"
+    functions = pstats.Stats(str(profiler.stats_path)).stats
+    assert any(name == "busy" for _, _, name in functions)
+
+    report = (tmp_path / "demo.allocations.txt").read_text()
+    assert report.startswith("Peak traced memory")
+    assert "test_profiling.py" in report
+    assert not tracemalloc.is_tracing()
+    assert kept
+
+
+def test_profiler_without_memory(tmp_path):
+    with Profiler(tmp_path / "demo.log"):
+        busy()
+    assert (tmp_path / "demo.pstats").exists()
+    assert not (tmp_path / "demo.allocations.txt").exists()
+
+
+def test_batch_profiles_scripts(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    script = tmp_path / "good.yaml"
+    script.write_text("commands:\n  - 'true'\nexpect:\n  - prompt\n")
+
+    result = batch.run_script(
+        script, tmp_path / "logs" / "good.log", use_cache=False, profile=True
+    )
+
+    assert result.ok
+    assert (tmp_path / "logs" / "good.pstats").exists()
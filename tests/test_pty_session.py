@@ -0,0 +1,138 @@
+import asyncio
+import io
+import time
+
+import pexpect
+import pytest
+
+from runner import classmodule
+from runner.pty_session import PtySession
+from runner.reader import ChildReader
+from runner.streaming import expect_bounded
+from runner.typing_profile import TypingProfile
+
+LINES = 20000
+SCRIPT = f"for i in $(seq {LINES}); do echo line; done; echo END"
+
+
+def test_send_and_expect():
+    child = PtySession("cat", echo=False)
+    child.logfile = io.StringIO()
+
+    child.send(b"h\xc3\xa9llo ")
+    child.sendline("world")
+    child.expect(r"w\w+")
+    assert child.before == "héllo "
+    assert child.after == "world"
+    assert child.match.group() == b"world"
+
+    child.sendline("a.b")
+    child.expect_exact(".")
+    assert child.before == "\r\na"
+    # What was sent, then what was read.
+    assert child.logfile.getvalue().startswith("héllo world\n")
+    child.close()
+    assert not child.isalive()
+
+
+def test_output_is_kept_as_read():
+    child = PtySession("printf", ["\\377ok"])
+
+    child.expect("ok")
+
+    # Not replaced by U+FFFD, as it would be if it was decoded.
+    assert bytes(child.match.string).startswith(b"\xffok")
+    assert child.before == "\ufffd"
+    child.close()
+
+
+def test_sessions_must_implement_every_method():
+    class Partial(classmodule.Session):
+        def send(self, data):
+            return len(data)
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_timeout_and_eof():
+    child = PtySession("sh", ["-c", "sleep 0.2; echo done; exit 3"])
+
+    with pytest.raises(pexpect.TIMEOUT):
+        child.expect("done", timeout=0.05)
+    child.expect(pexpect.EOF)
+    assert child.before == "done\r\n"
+    with pytest.raises(pexpect.EOF):
+        child.expect("more")
+
+    child.close()
+    assert child.exitstatus == 3
+
+
+def test_close_does_not_wait():
+    child = PtySession("sleep", ["10"])
+    start = time.monotonic()
+    child.close()
+    assert time.monotonic() - start < 1
+    assert not child.isalive()
+
+
+def test_expect_bounded():
+    child = PtySession("bash", ["-c", SCRIPT])
+    spill = io.StringIO()
+
+    expect_bounded(child, "E[N]D", window=100, spill=spill)
+
+    # Trimming is lazy: at most two windows are kept.
+    assert len(child.before) <= 2 * 100
+    assert spill.getvalue() + child.before == "line\r\n" * LINES
+    child.close()
+
+
+def test_expect_bounded_async():
+    child = PtySession("bash", ["-c", SCRIPT])
+    spill = io.StringIO()
+
+    asyncio.run(expect_bounded(child, "END", 100, spill, exact=True, async_=True))
+
+    assert spill.getvalue() + child.before == "line\r\n" * LINES
+    child.close()
+
+
+def test_child_reader():
+    child = PtySession("bash", ["-c", f"seq {LINES}; read line; echo got $line"])
+
+    with ChildReader(child):
+        child.expect(f"\r\n{LINES}\r\n")
+        child.sendline("hello")
+        child.expect("got hello")
+    child.expect(pexpect.EOF)
+    child.close()
+
+
+def test_commands(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    stream = io.StringIO()
+    todo = classmodule.Commands(
+        ["echo héllo", "false", {"command": "seq 3", "paste": True}],
+        ["prompt", "prompt", "prompt"],
+        sink=classmodule.StreamSink(stream),
+        typing_profile=TypingProfile(fast=True),
+        backend="pty",
+    )
+
+    todo.run()
+
+    assert todo.statuses == [0, 1, 0]
+    assert "héllo\r\n" in stream.getvalue()
+    assert "1\r\n2\r\n3\r\n" in stream.getvalue()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        classmodule.spawn_shell(backend="telnet")
+
+
+def test_missing_program():
+    with pytest.raises(FileNotFoundError):
+        PtySession("no-such-program-anywhere")
@@ -0,0 +1,117 @@
+import io
+import threading
+import time
+
+import pexpect
+
+from runner import classmodule
+from runner.reader import ChildReader
+from runner.typing_profile import TypingProfile
+
+LINES = 50000
+SCRIPT = f"seq {LINES}; echo END; read line; echo got $line"
+
+
+class ThreadRecordingStream(io.StringIO):
+    """Records writes, and which thread made them."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def write(self, data):
+        self.threads.add(threading.current_thread().name)
+        return super().write(data)
+
+
+def spawn():
+    child = pexpect.spawn("bash", ["-c", SCRIPT], encoding="utf-8", echo=False)
+    child.logfile_read = ThreadRecordingStream()
+    return child
+
+
+def wait_until(condition, timeout=10):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "Timed out."
+        time.sleep(0.01)
+
+
+def test_output_is_read_without_expecting():
+    child = spawn()
+
+    with ChildReader(child) as reader:
+        # Nothing but the reader reads while this thread waits.
+        wait_until(lambda: "END" in child.logfile_read.getvalue())
+        assert child.logfile_read.threads == {"runner-child-reader"}
+
+        child.expect("END")
+        assert child.before.endswith(f"{LINES}\r\n")
+        child.sendline("hello")
+        child.expect("got hello")
+
+    child.expect(pexpect.EOF)
+    child.close()
+
+
+def test_buffer_is_bounded():
+    child = spawn()
+
+    with ChildReader(child, limit=100) as reader:
+        wait_until(lambda: reader.size >= 100)
+        time.sleep(0.1)
+        # The reader waits for the buffer to be consumed.
+        assert reader.size < 100 + child.maxread
+        assert "END" not in child.logfile_read.getvalue()
+        child.expect("END")
+        # Nothing was dropped.
+        assert child.before.startswith("1\r\n2\r\n")
+        assert child.before.endswith(f"{LINES}\r\n")
+
+    child.sendline("hello")
+    child.expect(pexpect.EOF)
+    child.close()
+
+
+def test_stop_gives_back_unsearched_output():
+    child = spawn()
+    reader = ChildReader(child)
+    reader.start()
+    wait_until(lambda: "END" in child.logfile_read.getvalue())
+    reader.stop()
+
+    assert "read_nonblocking" not in vars(child)
+    child.expect("END")
+    assert child.before.startswith("1\r\n")
+    child.sendline("bye")
+    child.expect("got bye")
+    child.close()
+
+
+def test_eof():
+    child = pexpect.spawn("bash", ["-c", "echo done"], encoding="utf-8")
+
+    with ChildReader(child):
+        child.expect(pexpect.EOF)
+        assert child.before == "done\r\n"
+    child.close()
+
+
+def test_commands(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    stream = ThreadRecordingStream()
+    # Output printed in the background while the next command is typed.
+    todo = classmodule.Commands(
+        ["(sleep 0.1; seq 20000) &", "wait; echo waited", "false"],
+        ["prompt", "prompt", "prompt"],
+        sink=classmodule.StreamSink(stream),
+        typing_profile=TypingProfile(fast=True),
+        background_reader=True,
+    )
+
+    todo.run()
+
+    assert todo.statuses == [0, 0, 1]
+    assert todo.reader is None
+    assert "20000\r\n" in stream.getvalue()
+    assert "runner-child-reader" in stream.threads
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from runner import classmodule
+from runner.clock import VirtualClock
+from runner.recording import AsciicastRecorder
+
+
+class LoggingChild:
+    """Stands in for a `pexpect` child. Logs sends like `pexpect` does."""
+
+    encoding = "utf-8"
+
+    def __init__(self, logfile):
+        self.logfile = logfile
+
+    def send(self, data):
+        if self.logfile is not None:
+            self.logfile.write(data)
+            self.logfile.flush()
+
+
+def read_cast(path):
+    header, *events = path.read_text().splitlines()
+    return json.loads(header), [json.loads(event) for event in events]
+
+
+def test_asciicast_idle_time_limit(tmp_path):
+    clock = VirtualClock()
+    recorder = AsciicastRecorder(tmp_path / "demo.cast", idle_time_limit=2, clock=clock)
+    recorder.write("ls\r\n")
+    clock.sleep(60)
+    recorder.write(b"done\r\n")
+    recorder.close()
+
+    header, events = read_cast(tmp_path / "demo.cast")
+    assert header["version"] == 2 and header["idle_time_limit"] == 2
+    assert [data for _, _, data in events] == ["ls\r\n", "done\r\n"]
+    assert events[1][0] - events[0][0] == pytest.approx(2, abs=1e-5)
+
+
+def test_asciicast_split_characters(tmp_path):
+    recorder = AsciicastRecorder(tmp_path / "demo.cast")
+    encoded = "héllo".encode()
+    recorder.write(encoded[:2])
+    recorder.write(encoded[2:])
+    recorder.write(b"\xc3")
+    recorder.close()
+
+    _, events = read_cast(tmp_path / "demo.cast")
+    assert [data for _, _, data in events] == ["h", "éllo", "\ufffd"]
+
+
+def test_secrets_are_not_recorded(tmp_path):
+    recorder = AsciicastRecorder(tmp_path / "demo.cast")
+    todo = classmodule.Commands([], [], sink=recorder)
+    child = LoggingChild(todo.sink)
+
+    child.send("sudo ls\n")
+    todo.fake_typing_secret(child, "hunter2")
+    child.send("ls\n")
+    recorder.close()
+
+    _, events = read_cast(tmp_path / "demo.cast")
+    assert [data for _, _, data in events] == ["sudo ls\n", "ls\n"]
@@ -0,0 +1,103 @@
+import io
+
+import pexpect
+import pytest
+from click.testing import CliRunner
+
+from runner import classmodule, cli
+from runner.clock import VirtualClock
+from runner.replay import ReplaySession, Transcript, TranscriptRecorder
+from runner.typing_profile import TypingProfile
+
+COMMANDS = [
+    "touch marker; echo made",
+    "sleep 0.2; false",
+    {"command": "printf 'a\\nb\\n'", "paste": True},
+]
+EXPECT = ["made", "prompt", "prompt"]
+
+
+def run(path, **options):
+    stream = io.StringIO()
+    todo = classmodule.Commands(
+        COMMANDS,
+        EXPECT,
+        sink=classmodule.StreamSink(stream),
+        typing_profile=TypingProfile(fast=True),
+        **options,
+    )
+    todo.run()
+    return todo, stream.getvalue()
+
+
+@pytest.fixture
+def transcript(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "demo.transcript"
+    recorder = TranscriptRecorder(path)
+    todo, output = run(path, recorder=recorder)
+    recorder.close()
+    (tmp_path / "marker").unlink()
+    return path, todo.statuses, output
+
+
+def test_replay(transcript, tmp_path):
+    path, statuses, output = transcript
+
+    todo, replayed = run(path, replay=Transcript.load(path))
+
+    assert todo.statuses == statuses
+    assert replayed == output
+    # Nothing was run again.
+    assert not (tmp_path / "marker").exists()
+
+
+def test_replay_keeps_timing(transcript):
+    path, _, _ = transcript
+    clock = VirtualClock()
+    start = clock.now()
+
+    run(path, replay=Transcript.load(path), clock=clock)
+
+    # `sleep 0.2` took as long, in virtual time.
+    assert clock.now() - start >= 0.2
+
+
+def test_replay_does_not_wait(transcript):
+    path, _, _ = transcript
+    child = ReplaySession(Transcript.load(path))
+    child.next_step()
+
+    with pytest.raises(pexpect.TIMEOUT):
+        child.expect("not recorded", timeout=10)
+    for _ in range(3):
+        child.next_step()
+    with pytest.raises(pexpect.EOF):
+        child.expect("not recorded")
+
+
+def test_load_checks_the_version(tmp_path):
+    path = tmp_path / "old.transcript"
+    path.write_text('{"version": 0}\n')
+    with pytest.raises(ValueError):
+        Transcript.load(path)
+
+
+def test_cli(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    script = tmp_path / "script.yaml"
+    script.write_text("commands: ['echo recorded']\nexpect: [prompt]\n")
+    path = tmp_path / "script.transcript"
+    options = [str(script), "--no-docker", "--no-cache", "--virtual-time"]
+
+    recorded = CliRunner().invoke(cli.gb_run, options + ["--record", str(path)])
+    replayed = CliRunner().invoke(cli.gb_run, options + ["--replay", str(path)])
+    both = CliRunner().invoke(
+        cli.gb_run, options + ["--record", str(path), "--replay", str(path)]
+    )
+
+    assert recorded.exit_code == replayed.exit_code == 0
+    assert "\nrecorded\n" in replayed.output
+    assert both.exit_code == 2
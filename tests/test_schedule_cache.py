@@ -0,0 +1,82 @@
+import random
+
+import pytest
+from runner import classmodule, human_typing, schedule_cache, vectorized
+from runner.schedule_cache import ScheduleCache
+from runner.timeline import Timeline
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ScheduleCache(tmp_path)
+    timeline = human_typing.plan_sentence("ls -a")
+
+    assert cache.get("ls -a", 1) is None
+    cache.put("ls -a", 1, timeline)
+    assert cache.get("ls -a", 1) == timeline
+    assert cache.get("ls -a", 2) is None
+    assert cache.get("ls", 1) is None
+
+
+def test_failed_writes_leave_nothing(tmp_path, monkeypatch):
+    cache = ScheduleCache(tmp_path)
+
+    def replace(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(schedule_cache.os, "replace", replace)
+    cache.put("ls -a", 1, human_typing.plan_sentence("ls -a"))
+
+    assert cache.get("ls -a", 1) is None
+    assert not [path for path in tmp_path.rglob("*") if path.is_file()]
+
+
+def test_key_depends_on_model_version(tmp_path, monkeypatch):
+    cache = ScheduleCache(tmp_path)
+    key = cache.key("ls", 1)
+    monkeypatch.setattr(human_typing, "TYPING_MODEL_VERSION", -1)
+    assert cache.key("ls", 1) != key
+
+
+def test_seeded_commands_are_reproducible():
+    commands = ["echo 'hello world'", "ls -a", "echo 'hello world'"]
+
+    first = classmodule.Commands(commands, ["prompt"] * 3, seed=7)
+    second = classmodule.Commands(commands, ["prompt"] * 3, seed=7)
+    plans = [first.plan(command) for command in commands]
+
+    assert plans == [second.plan(command) for command in commands]
+
+
+def test_seeded_commands_use_cache(tmp_path):
+    cache = ScheduleCache(tmp_path)
+    command_seed = random.Random(7).getrandbits(64)
+    cached = Timeline()
+    cached.append(0.0, b"cached\n")
+    cache.put("ls", command_seed, cached)
+
+    commands = classmodule.Commands(["ls"], ["prompt"], seed=7, cache=cache)
+
+    assert commands.plan("ls") == cached
+
+
+def test_vectorized_commands(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    cache = ScheduleCache(tmp_path)
+    command_seed = random.Random(7).getrandbits(64)
+
+    commands = classmodule.Commands(
+        ["ls"], ["prompt"], seed=7, cache=cache, vectorized=True
+    )
+    timeline = commands.plan("ls")
+
+    assert timeline == vectorized.plan_sentence("ls", command_seed)
+    # Plans of both planners are cached apart.
+    assert cache.get("ls", command_seed) is None
+    assert cache.get("ls", command_seed, planner="numpy") == timeline
+
+    # Without numpy, the flag is ignored.
+    monkeypatch.setattr(vectorized, "np", None)
+    commands = classmodule.Commands(["ls"], ["prompt"], seed=7, vectorized=True)
+    assert commands.plan("ls") == human_typing.plan_sentence(
+        "ls", random.Random(command_seed)
+    )
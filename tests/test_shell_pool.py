@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from runner import classmodule
+from runner.shell_pool import DISCARD, RECYCLE, RESET, ShellPool
+from runner.typing_profile import TypingProfile
+from tests.fakes import ListSink
+
+
+@pytest.fixture
+def home(monkeypatch, tmp_path):
+    # Loading the real rc files is slow.
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        ShellPool(0, policy="keep")
+
+
+def test_acquire_gives_a_shell_at_its_prompt(home):
+    with ShellPool(1) as pool:
+        child = pool.acquire(timeout=10)
+        assert child.isalive()
+        assert child.startup_output
+        child.sendline("echo ready")
+        child.expect("ready")
+        pool.release(child)
+
+
+def test_recycle_replaces_shells(home):
+    with ShellPool(1, policy=RECYCLE) as pool:
+        first = pool.acquire(timeout=10)
+        pool.release(first)
+        assert not first.isalive()
+        second = pool.acquire(timeout=10)
+        assert second is not first
+        pool.release(second)
+
+
+def test_reset_reuses_shells(home):
+    with ShellPool(1, policy=RESET) as pool:
+        first = pool.acquire(timeout=10)
+        first.sendline(f"cd {home}")
+        first.expect(classmodule.PROMPT_PATTERN)
+        pool.release(first)
+
+        second = pool.acquire(timeout=10)
+        assert second is first
+        second.sendline("pwd")
+        second.expect(classmodule.PROMPT_PATTERN)
+        assert str(home) not in second.before
+        pool.release(second)
+
+
+def test_reset_quotes_the_directory(home, monkeypatch):
+    start = home / "it's $HOME \"here\""
+    start.mkdir()
+    monkeypatch.chdir(start)
+    with ShellPool(1, policy=RESET) as pool:
+        child = pool.acquire(timeout=10)
+        child.sendline("cd /")
+        child.expect(classmodule.PROMPT_PATTERN)
+        pool.release(child)
+
+        child = pool.acquire(timeout=10)
+        child.sendline("pwd")
+        child.expect_exact(str(start), timeout=5)
+        pool.release(child)
+
+
+def test_reset_skips_prompts_that_were_not_waited_for(home):
+    with ShellPool(1, policy=RESET) as pool:
+        # Its prompt is never waited for.
+        classmodule.Commands(
+            ["echo first-done"],
+            ["first-done"],
+            sink=ListSink(),
+            pool=pool,
+            typing_profile=TypingProfile(fast=True),
+        ).run()
+
+        todo = classmodule.Commands(
+            [f"sleep 0.5; touch {home / 'done'}; false"],
+            ["prompt"],
+            sink=ListSink(),
+            pool=pool,
+            typing_profile=TypingProfile(fast=True),
+        )
+        todo.run()
+
+        assert (home / "done").exists()
+        assert todo.statuses == [1]
+
+
+def test_discard_starts_shells_on_demand(home):
+    with ShellPool(1, policy=DISCARD) as pool:
+        pool.release(pool.acquire(timeout=10))
+        assert pool.ready.empty()
+        pool.release(pool.acquire(timeout=10))
+
+
+def test_spawn_errors_are_raised_by_acquire():
+    def spawn():
+        raise OSError("no shell")
+
+    with ShellPool(1, spawn=spawn) as pool:
+        with pytest.raises(OSError):
+            pool.acquire(timeout=10)
+
+
+def test_any_error_is_raised_by_acquire():
+    def spawn():
+        raise ValueError("not a shell")
+
+    with ShellPool(1, spawn=spawn) as pool:
+        with pytest.raises(ValueError):
+            pool.acquire(timeout=10)
+
+
+def test_commands_use_the_pool(home):
+    with ShellPool(2) as pool:
+        for word in ("first", "second"):
+            sink = ListSink()
+            todo = classmodule.Commands(
+                [{"command": f"echo {word}", "paste": True}],
+                ["prompt"],
+                sink=sink,
+                pool=pool,
+            )
+            todo.run()
+            output = "".join(sink.written)
+            # The startup output, up to the prompt, is still recorded.
+            assert classmodule.SENTINEL_START in sink.written[0]
+            assert word in output
+
+
+def test_commands_use_the_pool_async(home):
+    sink = ListSink()
+    with ShellPool(1) as pool:
+        todo = classmodule.Commands(
+            [{"command": "echo async", "paste": True}],
+            ["prompt"],
+            sink=sink,
+            pool=pool,
+        )
+        asyncio.run(todo.run_async())
+    assert "async" in "".join(sink.written)
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+# Modules that only some commands need, and that are slow to import.
+HEAVY_MODULES = ("pexpect", "yaml", "asyncio", "concurrent.futures.process")
+
+
+def test_cli_imports_are_lazy():
+    program = (
+        "import sys, runner.cli; "
+        f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", program], capture_output=True, text=True, check=True
+    )
+    assert output.stdout.split() == []
+
+
+def test_docker_flags_skip_detection(monkeypatch):
+    from runner import cli, funcmodule
+
+    def in_docker():
+        raise AssertionError("The environment was checked.")
+
+    monkeypatch.setattr(funcmodule, "in_docker", in_docker)
+    assert str(cli.get_data_dir(False, True)) == "."
+    assert str(cli.get_data_dir(True, False)) == "/project"
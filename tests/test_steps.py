@@ -0,0 +1,78 @@
+import pytest
+
+from runner import classmodule
+from runner.steps import StepStream
+
+SCRIPT = """\
+seed: 4
+commands:
+  - echo one
+  - echo two
+expect:
+  - prompt
+  - prompt
+---
+commands:
+  - command: echo three
+    paste: true
+expect:
+  - prompt
+"""
+
+
+def test_steps_are_read_in_order(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT)
+
+    stream = StepStream(script)
+
+    assert stream.seed == 4
+    assert list(stream) == [
+        ("echo one", "prompt"),
+        ("echo two", "prompt"),
+        ({"command": "echo three", "paste": True}, "prompt"),
+    ]
+    assert stream.stream.closed
+
+
+def test_documents_are_read_lazily(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT + "---\ncommands: [\n")
+
+    steps = iter(StepStream(script))
+
+    assert next(steps) == ("echo one", "prompt")
+    with pytest.raises(Exception):
+        list(steps)
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [
+        "---\ncommands: [ls]\nexpect: []\n",
+        "---\nseed: 1\ncommands: []\nexpect: []\n",
+        "---\ntyping: {fast: true}\ncommands: []\nexpect: []\n",
+        "---\nunknown: 1\n",
+        "---\n",
+    ],
+)
+def test_invalid_documents(tmp_path, extra):
+    script = tmp_path / "script.yaml"
+    script.write_text(SCRIPT + extra)
+
+    with pytest.raises((TypeError, KeyError, ValueError)):
+        list(StepStream(script))
+
+
+def test_commands_run_steps(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    steps = [
+        ({"command": f"touch {tmp_path / name}", "paste": True}, "prompt")
+        for name in ("first", "second")
+    ]
+    todo = classmodule.Commands([], [], sink=classmodule.NullSink(), steps=steps)
+
+    todo.run()
+
+    assert (tmp_path / "first").exists() and (tmp_path / "second").exists()
+    assert todo.statuses == [0, 0]
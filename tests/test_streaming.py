@@ -0,0 +1,67 @@
+import asyncio
+import io
+
+import pexpect
+import pytest
+
+from runner import classmodule
+from runner.streaming import expect_bounded
+
+LINES = 20000
+SCRIPT = f"for i in $(seq {LINES}); do echo line; done; echo END"
+
+
+def spawn():
+    return pexpect.spawn("bash", ["-c", SCRIPT], encoding="utf-8")
+
+
+def test_expect_bounded():
+    child = spawn()
+    spill = io.StringIO()
+
+    expect_bounded(child, "E[N]D", window=100, spill=spill)
+
+    # Trimming is lazy: at most two windows are kept.
+    assert len(child.before) <= 2 * 100
+    assert spill.getvalue() + child.before == "line\r\n" * LINES
+    child.close()
+
+
+def test_expect_bounded_async():
+    child = spawn()
+    spill = io.StringIO()
+
+    asyncio.run(expect_bounded(child, "END", 100, spill, exact=True, async_=True))
+
+    # Trimming is lazy: at most two windows are kept.
+    assert len(child.before) <= 2 * 100
+    assert spill.getvalue() + child.before == "line\r\n" * LINES
+    child.close()
+
+
+def test_expect_bounded_without_window():
+    child = spawn()
+    expect_bounded(child, "END", None)
+    assert child.before == "line\r\n" * LINES
+    child.close()
+
+
+def test_expect_bounded_needs_a_window():
+    with pytest.raises(ValueError):
+        expect_bounded(None, "END", 0)
+
+
+def test_commands_with_a_search_window(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    spill = io.StringIO()
+    todo = classmodule.Commands(
+        [{"command": "seq 100000", "paste": True, "searchwindowsize": 256}],
+        ["prompt"],
+        sink=classmodule.NullSink(),
+        spill=spill,
+    )
+
+    todo.run()
+
+    assert todo.statuses == [0]
+    assert "\r\n50000\r\n" in spill.getvalue()
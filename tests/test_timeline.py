@@ -0,0 +1,57 @@
+import pytest
+from runner.timeline import Timeline
+
+
+def test_events_round_trip():
+    timeline = Timeline()
+    timeline.append(0.1, b"l")
+    timeline.append(0.25, "é".encode())
+    timeline.append(0.25, b"\n")
+
+    assert list(timeline) == [(0.1, b"l"), (0.25, "é".encode()), (0.25, b"\n")]
+    assert timeline[-1] == (0.25, b"\n")
+    assert len(timeline) == 3
+    assert timeline.duration == 0.25
+
+
+def test_rejects_out_of_order_events():
+    timeline = Timeline()
+    timeline.append(0.5, b"a")
+    with pytest.raises(ValueError):
+        timeline.append(0.4, b"b")
+
+
+def test_empty_timeline():
+    timeline = Timeline()
+    assert len(timeline) == 0
+    assert timeline.duration == 0.0
+    with pytest.raises(IndexError):
+        timeline[0]
+
+
+def test_serialization_round_trip():
+    timeline = Timeline()
+    timeline.append(0.12, b"l")
+    timeline.append(0.3, "é".encode())
+
+    assert Timeline.from_bytes(timeline.to_bytes()) == timeline
+    assert Timeline.from_bytes(Timeline().to_bytes()) == Timeline()
+
+
+def test_rejects_bad_serialization():
+    with pytest.raises(ValueError):
+        Timeline.from_bytes(b"not a timeline")
+    with pytest.raises(ValueError):
+        timeline = Timeline()
+        timeline.append(0.1, b"abc")
+        Timeline.from_bytes(timeline.to_bytes()[:-1])
+
+
+def test_bursts_merge_simultaneous_events():
+    timeline = Timeline()
+    for offset, data in [(0.1, b"l"), (0.1, b"s"), (0.2, b" "), (0.3, b"\n")]:
+        timeline.append(offset, data)
+    timeline.append(0.3, b"")
+
+    assert list(timeline.bursts()) == [(0.1, b"ls"), (0.2, b" "), (0.3, b"\n")]
+    assert list(Timeline().bursts()) == []
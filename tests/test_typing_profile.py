@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from runner import classmodule, human_typing, validation
+from runner.schedule_cache import ScheduleCache
+from runner.typing_profile import DEFAULT_PROFILE, TypingProfile, check_typing
+
+SENTENCE = "echo 'hello world' && ls -la /home/someone/projects"
+
+
+def test_default_profile_does_not_change_plans():
+    for seed in range(5):
+        assert human_typing.plan_sentence(
+            SENTENCE, random.Random(seed), DEFAULT_PROFILE
+        ) == human_typing.plan_sentence(SENTENCE, random.Random(seed))
+
+
+def test_updated():
+    profile = DEFAULT_PROFILE.updated({"wpm": 120, "typo_rate": 0.02, "fast": True})
+
+    assert profile.wpm == 120
+    assert profile.typo_percent == (2, 2)
+    assert profile.fast
+    assert profile.pause_percent == DEFAULT_PROFILE.pause_percent
+
+
+@pytest.mark.parametrize(
+    "options, error",
+    [
+        ([], TypeError),
+        ({"speed": "fast"}, TypeError),
+        ({"fast": 1}, TypeError),
+        ({"wpm": True}, TypeError),
+        ({"wpm": 0}, ValueError),
+        ({"typo_rate": 1.5}, ValueError),
+        ({"colour": "red"}, ValueError),
+    ],
+)
+def test_check_typing(options, error):
+    with pytest.raises(error):
+        check_typing(options)
+
+
+def test_speed_and_wpm():
+    reference = human_typing.plan_sentence(SENTENCE, random.Random(1))
+    faster = human_typing.plan_sentence(
+        SENTENCE, random.Random(1), TypingProfile(speed=2)
+    )
+    twice_the_wpm = TypingProfile(wpm=DEFAULT_PROFILE.wpm * 2)
+
+    assert faster.duration == pytest.approx(reference.duration / 2)
+    assert human_typing.get_delay("a", "b", random.Random(1), twice_the_wpm) == (
+        pytest.approx(human_typing.get_delay("a", "b", random.Random(1)) / 2)
+    )
+
+
+def test_rates():
+    careful = DEFAULT_PROFILE.updated({"typo_rate": 0, "pause_rate": 0})
+    timeline = human_typing.plan_sentence(SENTENCE * 20, profile=careful)
+
+    assert all(data != b"\b" for _, data in timeline)
+    assert not human_typing.is_pause(profile=careful)
+    assert human_typing.is_typo(profile=DEFAULT_PROFILE.updated({"typo_rate": 1}))
+
+
+def test_fast():
+    timeline = human_typing.plan_sentence(SENTENCE, profile=TypingProfile(fast=True))
+
+    assert list(timeline.bursts()) == [(0.0, (SENTENCE + "\n").encode())]
+
+
+def test_commands_profiles():
+    commands = classmodule.Commands(
+        [], [], typing_profile=DEFAULT_PROFILE.updated({"speed": 3})
+    )
+
+    assert commands.get_profile("ls").speed == 3
+    assert commands.get_profile({"command": "ls", "fast": True}).fast
+    command = {"command": "ls", "typing": {"speed": 1, "typo_rate": 0}}
+    assert commands.get_profile(command).speed == 1
+    assert commands.get_profile(command).typo_percent == (0, 0)
+
+
+def test_cache_key_depends_on_profile(tmp_path):
+    cache = ScheduleCache(tmp_path)
+
+    assert cache.key("ls", 1, DEFAULT_PROFILE) == cache.key("ls", 1)
+    assert cache.key("ls", 1, TypingProfile(speed=2)) != cache.key("ls", 1)
+
+
+def test_validation():
+    conf = {
+        "commands": [{"command": "ls", "fast": True, "typing": {"wpm": -1}}],
+        "expect": ["prompt"],
+        "typing": {"speed": 2, "typo_rate": "low"},
+    }
+
+    problems = [problem.location for problem in validation.validate(conf)]
+
+    assert problems == ["commands[0].typing.wpm", "typing.typo_rate"]
@@ -0,0 +1,116 @@
+import json
+import pathlib
+
+from click.testing import CliRunner
+
+from runner import cli, validation
+
+CONFIGPATH = pathlib.Path("./tests/examples/")
+
+
+def locations(problems):
+    return [(problem.location, problem.message) for problem in problems]
+
+
+def test_valid_file():
+    assert validation.validate_file(CONFIGPATH / "test_conf.yaml") == []
+
+
+def test_every_problem_is_reported():
+    conf = {
+        "commands": ["ls", 3, {"command": "cat", "paste": "yes", "speed": 2}],
+        "expect": ["prompt", "prompt"],
+        "seed": True,
+        "read": "Hello",
+    }
+
+    problems = locations(validation.validate(conf))
+
+    assert ("commands[1]", "must be a string or a mapping, not int") in problems
+    assert ("commands[2].paste", "must be a bool, not str") in problems
+    assert ("commands[2].speed", "unknown option") in problems
+    assert ("read", "unknown key") in problems
+    assert ("", "3 commands but 2 `expect` items") in problems
+    assert any(location == "seed" for location, _ in problems)
+
+
+def test_passwords():
+    conf = {"commands": [{"password": "TOKEN"}, {"password": 1}], "expect": ["a", "b"]}
+    assert locations(validation.validate(conf)) == [
+        ("commands[1]", "a password must only name an environment variable")
+    ]
+
+
+def test_missing_keys_and_wrong_types():
+    assert locations(validation.validate({"commands": "ls"})) == [
+        ("", "missing the `expect` key"),
+        ("commands", "must be a list, not str"),
+    ]
+    assert locations(validation.validate(["ls"])) == [
+        ("", "must be a mapping, not list")
+    ]
+
+
+def test_invalid_yaml(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text("commands: [\n")
+
+    (problem,) = validation.validate_file(script)
+
+    assert problem.path == str(script)
+    assert problem.message.startswith("invalid YAML")
+
+
+def test_documents(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text(
+        "commands: [ls]\nexpect: [prompt]\n---\nseed: 1\ncommands: []\nexpect: []\n"
+    )
+
+    assert locations(validation.validate_file(script, stream=True)) == [
+        ("document 2: seed", "only allowed in the first document")
+    ]
+    # `runner` only reads many documents with `--stream`.
+    assert locations(validation.validate_file(script))[0] == (
+        "",
+        "2 YAML documents, which are only run with --stream",
+    )
+
+
+def test_validate_files_in_parallel(tmp_path):
+    paths = []
+    for index in range(8):
+        path = tmp_path / f"{index}.yaml"
+        expect = "[prompt]" if index % 2 else "[]"
+        path.write_text(f"commands: [ls]\nexpect: {expect}\n")
+        paths.append(path)
+
+    problems = validation.validate_files(paths, jobs=2)
+
+    assert [problem.path for problem in problems] == [str(p) for p in paths[::2]]
+
+
+def test_check_config_command(tmp_path):
+    bad = tmp_path / "bad.yaml"
+    bad.write_text("commands: [ls]\nexpect: []\n")
+
+    result = CliRunner().invoke(
+        cli.check_config,
+        [str(CONFIGPATH / "test_conf.yaml"), str(bad), "--format", "json"],
+    )
+
+    assert result.exit_code == 1
+    report = json.loads(result.output)
+    assert report["checked"] == 2 and not report["valid"]
+    assert [problem["path"] for problem in report["problems"]] == [str(bad)]
+
+
+def test_check_config_command_stream(tmp_path):
+    script = tmp_path / "script.yaml"
+    script.write_text(
+        "commands: [ls]\nexpect: [prompt]\n---\ncommands: []\nexpect: []\n"
+    )
+
+    assert CliRunner().invoke(cli.check_config, [str(script)]).exit_code == 1
+    streamed = CliRunner().invoke(cli.check_config, [str(script), "--stream"])
+    assert streamed.exit_code == 0
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+from hypothesis import given, strategies as st
+from runner import human_typing, vectorized
+from runner.typing_profile import TypingProfile
+
+numpy = pytest.importorskip("numpy")
+
+
+def typed(timeline):
+    """Applies backspaces to the keystrokes of a timeline."""
+    result = []
+    for _, data in timeline:
+        if data == b"\b":
+            result.pop()
+        else:
+            result.append(data.decode())
+    return "".join(result)
+
+
+LETTERS = st.characters(blacklist_categories=("Cs",), blacklist_characters="\b")
+
+
+@given(st.lists(st.text(alphabet=LETTERS)))
+def test_plan_script(sentences):
+    """Every sentence is typed exactly, once typos are corrected."""
+    timelines = vectorized.plan_script(sentences)
+
+    assert len(timelines) == len(sentences)
+    for sentence, timeline in zip(sentences, timelines):
+        expected = sentence if sentence.endswith("\n") else sentence + "\n"
+        assert typed(timeline) == expected
+        assert list(timeline.offsets) == sorted(timeline.offsets)
+
+
+def test_same_distributions():
+    """Both planners type at the same speed and make as many typos."""
+    sentence = "echo 'hello world' && ls -la /home/someone/projects\n" * 200
+    reference = human_typing.plan_sentence(sentence, random.Random(0))
+    batched = vectorized.plan_sentence(sentence, numpy.random.default_rng(0))
+
+    assert batched.duration == pytest.approx(reference.duration, rel=0.05)
+    assert len(batched) == pytest.approx(len(reference), rel=0.02)
+
+
+def test_fallback_without_numpy(monkeypatch):
+    """The pure-Python planner is used when numpy is missing."""
+    monkeypatch.setattr(vectorized, "np", None)
+
+    assert not vectorized.available()
+    assert typed(vectorized.plan_sentence("ls")) == "ls\n"
+
+
+def test_profile():
+    """Profiles change the numpy planner like the pure-Python one."""
+    sentence = "echo 'hello world' && ls -la /home/someone/projects\n" * 50
+    reference = vectorized.plan_sentence(sentence, numpy.random.default_rng(0))
+    faster = vectorized.plan_sentence(
+        sentence, numpy.random.default_rng(0), TypingProfile(speed=2)
+    )
+    fast = vectorized.plan_sentence(sentence, profile=TypingProfile(fast=True))
+
+    assert faster.duration == pytest.approx(reference.duration / 2)
+    assert fast.duration == 0
+
+
+def test_fallback_honors_the_seed(monkeypatch):
+    """Seeded plans are reproducible without numpy too."""
+    sentence = "echo 'hello world'"
+    monkeypatch.setattr(vectorized, "np", None)
+
+    assert vectorized.plan_sentence(sentence, 3) == vectorized.plan_sentence(
+        sentence, 3
+    )
+    assert vectorized.plan_sentence(
+        sentence, random.Random(3)
+    ) == human_typing.plan_sentence(sentence, random.Random(3))
+
+
+def test_seed():
+    sentence = "echo 'hello world'"
+    assert vectorized.plan_sentence(sentence, 3) == vectorized.plan_sentence(
+        sentence, numpy.random.default_rng(3)
+    )